@@ -0,0 +1,575 @@
+'''
+This file contains the benchmark suite for retrieve_data. It replays a recorded
+HTTP archive (see HTTP_ARCHIVE_MODE in main.py) so that every run sees exactly
+the same pages, and measures get_meet_and_session_data and each stage of the
+call chain with cold and warm caches, as well as the meet name matcher over
+the full LiveTiming archive page, parsing the large pages in and out of the
+parse pool, saving and loading the session files, the import time of the
+main.py commands (with python -X importtime), and the clicks of ui/script.js
+on a large generated page (with node benchmark/ui_benchmark.js, if Node.js is
+installed).
+
+The baseline is kept per machine in benchmark/baseline.json, which is not
+committed: timings from another machine say nothing about this one. The
+timings are also compared relative to a fixed pure-Python reference workload
+measured in the same run, so a machine that is slower or busier as a whole
+than when the baseline was saved does not show up as regressions.
+
+The stages are benchmarked with the arguments they were called with during the
+full run, so the fixture only has to contain the pages of one session. The
+committed fixture, benchmark/fixtures/session.zip, is a recording of a
+retrieval of the emulated session (see emulator/), with the URLs of the real
+sites. Replace it with a recording of a real session, or make it again with
+--make-fixture, and run from the repository root:
+
+    python -m benchmark.benchmark                  compare against the baseline
+    python -m benchmark.benchmark --save           save the results as the
+                                                   baseline of this machine
+    python -m benchmark.benchmark --make-fixture   record the fixture from the
+                                                   emulator
+
+Any timing (scaled by the reference workload) or peak memory that is worse
+than the baseline by more than TOLERANCE (and by more than the absolute slack)
+is reported as a regression and makes the script exit with status 1.
+'''
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import retrieve_data.retrieve_data as retrieve_data_module
+from retrieve_data.meet_matcher import (meet_names_match,
+                                        build_meet_index,
+                                        find_meet,
+                                        get_clean_meet_name,
+                                        get_meet_signature)
+from retrieve_data.page_parsers import (start_parse_pool,
+                                        stop_parse_pool,
+                                        run_parser,
+                                        parse_archive_rows,
+                                        parse_meet_results_rows,
+                                        parse_meet_index)
+import retrieve_data.http_archive as http_archive_module
+from retrieve_data.http_archive import (start_recording,
+                                        start_replaying,
+                                        stop_http_archive,
+                                        load_http_archive,
+                                        save_http_archive)
+from retrieve_data.site_urls import (LIVETIMING_BASE_URL,
+                                     TEMPUS_BASE_URL,
+                                     set_base_urls)
+from session_model.session_model import Session
+from session_model.serialization import (save_session,
+                                         load_session,
+                                         export_session_json,
+                                         import_session_json)
+import cache.swimmer_id_cache as swimmer_id_cache_module
+import cache.meet_id_cache as meet_id_cache_module
+import cache.meet_results_cache as meet_results_cache_module
+import cache.start_list_cache as start_list_cache_module
+import cache.meet_program_cache as meet_program_cache_module
+from cache.cache_paths import set_cache_directory
+
+FIXTURE_ARCHIVE = 'benchmark/fixtures/session.zip'
+BASELINE_FILE = 'benchmark/baseline.json'
+
+NUM_HEATS = 100
+
+# Size, seed and port of the emulated session the fixture is recorded from.
+FIXTURE_SCALE = 0.25
+FIXTURE_SEED = 1
+FIXTURE_PORT = 8899
+
+# Number of timed repetitions, the fastest one is reported.
+REPEATS = 3
+
+# Allowed relative slowdown or memory growth before a result is a regression.
+TOLERANCE = 0.25
+# Differences below these are never regressions (timer and allocator noise).
+SLACK_SECONDS = 0.005
+SLACK_BYTES = 64 * 1024
+
+# Name of the reference workload in the results, and its number of rows.
+REFERENCE = 'reference'
+REFERENCE_ROWS = 100000
+
+# The stages from the call chain in retrieve_data.py that are benchmarked on
+# their own.
+STAGES = [
+    'get_swimmer_id',
+    'get_meet_id_and_location',
+    'get_meet_results',
+    'get_event_results',
+    'get_splits_from_meet',
+    'get_best_swims_for_event'
+]
+
+# Number of worker processes of the parse pool benchmarks.
+PARSE_WORKERS = 4
+
+# The modules each command of main.py imports, for measuring its startup.
+COMMAND_IMPORTS = {
+    'render': ['main', 'session_model.serialization',
+               'populate_html.populate_html', 'ui_server.build_ui'],
+    'cache_stats': ['main', 'cache.cache_maintenance'],
+    'retrieve': ['main', 'retrieve_data.retrieve_data',
+                 'retrieve_data.http_archive', 'session_model.serialization',
+                 'populate_html.populate_html', 'ui_server.build_ui']
+}
+
+###############################################################################
+# Helper functions
+###############################################################################
+
+def clear_caches() -> None:
+    '''
+    Empties the in-memory caches, including the per-run state of
+    retrieve_data. The cache files are never read or written by the benchmark.
+    '''
+    retrieve_data_module.meet_index = None
+    retrieve_data_module.bulk_resolved_clubs.clear()
+    meet_program_cache_module.meet_program_cache = dict()
+    start_list_cache_module.start_list_cache = dict()
+    swimmer_id_cache_module.swimmer_id_cache = dict()
+    meet_id_cache_module.meet_id_and_location_cache = dict()
+    meet_results_cache_module.meet_results_cache = dict()
+
+def get_session_url() -> str:
+    '''
+    Returns the session program URL of the fixture archive.
+    '''
+    for url in http_archive_module.http_archive:
+        if 'program.php' in url:
+            return url
+    sys.exit(f'No session program page in {FIXTURE_ARCHIVE}.')
+
+def capture_stage_calls(session_url: str) -> dict[str, list[tuple]]:
+    '''
+    Runs get_meet_and_session_data once with cold caches and records the
+    arguments of every call to the benchmarked stages.
+    '''
+    stage_calls = {stage: [] for stage in STAGES}
+    originals = {stage: getattr(retrieve_data_module, stage)
+                 for stage in STAGES}
+    def make_wrapper(stage):
+        def wrapper(*args):
+            stage_calls[stage].append(args)
+            return originals[stage](*args)
+        return wrapper
+    for stage in STAGES:
+        setattr(retrieve_data_module, stage, make_wrapper(stage))
+    try:
+        clear_caches()
+        with contextlib.redirect_stdout(io.StringIO()):
+            retrieve_data_module.get_meet_and_session_data(session_url,
+                                                           NUM_HEATS)
+    finally:
+        for stage in STAGES:
+            setattr(retrieve_data_module, stage, originals[stage])
+    return stage_calls
+
+def measure(run, warm: bool) -> dict[str, float]:
+    '''
+    Measures the fastest of REPEATS runs and the peak traced memory of one
+    extra run. With cold caches, the caches are emptied before each run. With
+    warm caches, they are filled by an untimed run first.
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):
+        if warm:
+            clear_caches()
+            run()
+        times = []
+        for _ in range(REPEATS):
+            if not warm:
+                clear_caches()
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        if not warm:
+            clear_caches()
+        tracemalloc.start()
+        run()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {'seconds': min(times), 'peak_bytes': peak_bytes}
+
+def run_reference_workload() -> None:
+    '''
+    A fixed pure-Python workload of building, sorting and serializing rows,
+    whose time tracks the speed of the machine during the run.
+    '''
+    rows = [(f'Meet {i % 997}', i * 7919 % 100003)
+            for i in range(REFERENCE_ROWS)]
+    rows.sort(key=lambda row: (row[1], row[0]))
+    json.loads(json.dumps(rows))
+
+def clear_matcher_caches() -> None:
+    '''
+    Clears the memoized meet name normalizations, so that every matcher run
+    starts from scratch.
+    '''
+    get_clean_meet_name.cache_clear()
+    get_meet_signature.cache_clear()
+
+def benchmark_meet_matcher(stage_calls: dict[str, list[tuple]]
+                           ) -> dict[str, dict[str, float]]:
+    '''
+    Benchmarks matching meet names against the full archive page of the
+    fixture: a linear scan with meet_names_match (how meets used to be looked
+    up), building the index, and find_meet on the index. The queries are the
+    meets looked up during the full run plus every archive meet with its last
+    word dropped, which exercises the near-match path.
+    '''
+    archive_url = next((url for url in http_archive_module.http_archive
+                        if 'archive.php' in url), None)
+    if archive_url is None:
+        return dict()
+    archive_rows = parse_archive_rows(
+        http_archive_module.http_archive[archive_url]['body'])
+    queries = list(stage_calls['get_meet_id_and_location'])
+    queries += [(' '.join(name.split(' ')[:-1]), date)
+                for name, date, _, _ in archive_rows if ' ' in name]
+    def linear_scan():
+        clear_matcher_caches()
+        for name, date in queries:
+            for row in archive_rows:
+                if meet_names_match(name, date, row[0], row[1]):
+                    break
+    index = build_meet_index(archive_rows)
+    def build_index():
+        clear_matcher_caches()
+        build_meet_index(archive_rows)
+    def find_meets():
+        clear_matcher_caches()
+        build_meet_index(archive_rows)
+        for name, date in queries:
+            find_meet(index, name, date)
+    results = {
+        'matcher/linear_scan': measure(linear_scan, False),
+        'matcher/build_index': measure(build_index, False),
+        'matcher/build_index_and_find_meet': measure(find_meets, False)
+    }
+    matched = sum(1 for name, date in queries
+                  if find_meet(index, name, date) is not None)
+    for name in ('matcher/linear_scan', 'matcher/build_index_and_find_meet'):
+        results[name]['calls'] = len(queries)
+    results['matcher/build_index']['calls'] = len(archive_rows)
+    print(f'Meet matcher: {matched} of {len(queries)} queries matched over '
+          f'{len(archive_rows)} archive meets.')
+    return results
+
+def benchmark_page_parsing() -> dict[str, dict[str, float]]:
+    '''
+    Benchmarks parsing every meet results page and the archive page of the
+    fixture, one after another in this process (also in the low-memory mode
+    used near the memory budget) and concurrently from threads through the
+    parse pool, which is how a concurrent retrieval parses them.
+    '''
+    pages = [(parse_meet_results_rows, entry['body'])
+             for url, entry in http_archive_module.http_archive.items()
+             if 'results.php' in url]
+    pages += [(parse_meet_index, entry['body'])
+              for url, entry in http_archive_module.http_archive.items()
+              if 'archive.php' in url]
+    if not pages:
+        return dict()
+    def parse_in_process():
+        for parser, content in pages:
+            parser(content)
+    def parse_low_memory():
+        for parser, content in pages:
+            parser(content, True)
+    def parse_in_pool():
+        with ThreadPoolExecutor(max_workers=PARSE_WORKERS) as executor:
+            list(executor.map(lambda page: run_parser(*page), pages))
+    results = {'parse/in_process': measure(parse_in_process, False),
+               'parse/low_memory': measure(parse_low_memory, False)}
+    start_parse_pool(PARSE_WORKERS)
+    try:
+        # start the worker processes before timing
+        run_parser(parse_meet_results_rows, b'')
+        results['parse/pool'] = measure(parse_in_pool, False)
+    finally:
+        stop_parse_pool()
+    for result in results.values():
+        result['calls'] = len(pages)
+    return results
+
+def benchmark_session_files(session: Session) -> dict[str, dict[str, float]]:
+    '''
+    Benchmarks saving and loading the session of the fixture in the binary
+    format and as JSON. Loading the binary file only decodes the header, so it
+    is also measured with every event decoded, which is what rendering does.
+    '''
+    with tempfile.TemporaryDirectory() as directory:
+        binary_path = os.path.join(directory, 'session_data.bin')
+        json_path = os.path.join(directory, 'session_data.json')
+        def load_all_events():
+            for event in load_session(binary_path).events:
+                event.heats
+        results = {
+            'session/save_binary': measure(
+                lambda: save_session(session, binary_path), False),
+            'session/export_json': measure(
+                lambda: export_session_json(session, json_path), False),
+            'session/load_binary': measure(
+                lambda: load_session(binary_path), False),
+            'session/load_binary_all_events': measure(load_all_events, False),
+            'session/import_json': measure(
+                lambda: import_session_json(json_path), False)
+        }
+        print(f'Session files: {os.path.getsize(binary_path)} bytes binary, '
+              f'{os.path.getsize(json_path)} bytes JSON.')
+    return results
+
+def measure_import_seconds(modules: list[str]) -> float | None:
+    '''
+    Imports the modules in a new interpreter with -X importtime and returns
+    the sum of their cumulative import times, the fastest of REPEATS runs.
+    Returns None if the import fails (e.g. a missing dependency).
+    '''
+    times = []
+    for _ in range(REPEATS):
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             f'import {", ".join(modules)}'],
+            capture_output=True, text=True)
+        if process.returncode != 0:
+            return None
+        microseconds = 0
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            _, cumulative, name = line.split('|')
+            # top-level imports are not indented
+            if name[1:] in modules:
+                microseconds += int(cumulative)
+        times.append(microseconds / 1e6)
+    return min(times)
+
+def benchmark_startup() -> dict[str, dict[str, float]]:
+    '''
+    Benchmarks the import time of the modules each command of main.py needs.
+    '''
+    results = dict()
+    for command, modules in COMMAND_IMPORTS.items():
+        seconds = measure_import_seconds(modules)
+        if seconds is None:
+            print(f'Could not import the modules of {command}.')
+            continue
+        results[f'startup/{command}'] = {'seconds': seconds, 
+                                         'peak_bytes': 0}
+    return results
+
+UI_BENCHMARK_SCRIPT = 'benchmark/ui_benchmark.js'
+
+def benchmark_ui() -> dict[str, dict[str, float]]:
+    '''
+    Benchmarks the click handlers of ui/script.js with the Node.js harness,
+    if Node.js is installed.
+    '''
+    node = shutil.which('node')
+    if node is None:
+        print('Node.js not found, skipping the UI benchmark.')
+        return dict()
+    process = subprocess.run([node, UI_BENCHMARK_SCRIPT],
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        print(f'UI benchmark failed: {process.stderr.strip()}')
+        return dict()
+    results = dict()
+    for kind, clicks in json.loads(process.stdout)['clicks'].items():
+        results[f'ui/{kind}_click'] = {
+            'seconds': clicks['seconds_per_click'],
+            'peak_bytes': 0,
+            'visited': clicks['visited_per_click'],
+            'forced_layouts': clicks['forced_layouts_per_click']
+        }
+    return results
+
+def run_benchmarks() -> dict[str, dict[str, float]]:
+    '''
+    Runs the full benchmark suite and returns the results by benchmark name.
+    '''
+    session_url = get_session_url()
+    stage_calls = capture_stage_calls(session_url)
+    results = {REFERENCE: measure(run_reference_workload, False)}
+    for warm in (False, True):
+        caches = 'warm' if warm else 'cold'
+        results[f'{caches}/get_meet_and_session_data'] = measure(
+            lambda: retrieve_data_module.get_meet_and_session_data(
+                session_url, NUM_HEATS), warm)
+        for stage in STAGES:
+            function = getattr(retrieve_data_module, stage)
+            calls = stage_calls[stage]
+            def run_stage():
+                for args in calls:
+                    function(*args)
+            result = measure(run_stage, warm)
+            result['calls'] = len(calls)
+            results[f'{caches}/{stage}'] = result
+    results.update(benchmark_meet_matcher(stage_calls))
+    results.update(benchmark_page_parsing())
+    with contextlib.redirect_stdout(io.StringIO()):
+        session = retrieve_data_module.get_meet_and_session_data(session_url,
+                                                                NUM_HEATS)
+    if session is not None:
+        results.update(benchmark_session_files(session))
+    results.update(benchmark_startup())
+    results.update(benchmark_ui())
+    return results
+
+def scale_baseline(results: dict, baseline: dict) -> dict:
+    '''
+    Returns the baseline with its timings scaled by how much slower or faster
+    the reference workload ran in the results than in the baseline, except
+    for the reference workload itself. The baseline is returned as is if
+    either has no reference workload.
+    '''
+    if REFERENCE not in results or REFERENCE not in baseline \
+            or baseline[REFERENCE]['seconds'] <= 0:
+        return baseline
+    speed = (results[REFERENCE]['seconds']
+             / baseline[REFERENCE]['seconds'])
+    return {name: (result if name == REFERENCE
+                   else dict(result, seconds=result['seconds'] * speed))
+            for name, result in baseline.items()}
+
+def compare_to_baseline(results: dict, baseline: dict) -> list[str]:
+    '''
+    Returns a description of every result that regressed compared to the
+    baseline, with the timings relative to the reference workload.
+    '''
+    baseline = scale_baseline(results, baseline)
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline or name == REFERENCE:
+            continue
+        for metric, slack in (('seconds', SLACK_SECONDS),
+                              ('peak_bytes', SLACK_BYTES)):
+            old, new = baseline[name][metric], result[metric]
+            if new > old * (1 + TOLERANCE) and new - old > slack:
+                regressions.append(f'{name} {metric}: {old:.4g} -> {new:.4g}')
+    return regressions
+
+def print_results(results: dict, baseline: dict) -> None:
+    '''
+    Prints the results as a table, with the change from the baseline if there
+    is one. The timing changes are relative to the reference workload.
+    '''
+    baseline = scale_baseline(results, baseline)
+    print(f'{"benchmark":<40}{"calls":>7}{"seconds":>11}{"change":>9}'
+          f'{"peak KiB":>11}{"change":>9}')
+    for name, result in results.items():
+        changes = []
+        for metric in ('seconds', 'peak_bytes'):
+            if name in baseline and baseline[name][metric] > 0:
+                old = baseline[name][metric]
+                changes.append(f'{100 * (result[metric] - old) / old:+.0f}%')
+            else:
+                changes.append('')
+        print(f'{name:<40}{result.get("calls", 1):>7}'
+              f'{result["seconds"]:>11.4f}{changes[0]:>9}'
+              f'{result["peak_bytes"] / 1024:>11.0f}{changes[1]:>9}')
+
+###############################################################################
+
+def run_benchmark_suite(save: bool) -> bool:
+    '''
+    Runs the benchmarks, prints the results and either saves them as the
+    baseline of this machine or compares them to it. Returns False if there
+    are regressions. Called by main and by the bench command of main.py.
+    '''
+    start_replaying(FIXTURE_ARCHIVE)
+    try:
+        results = run_benchmarks()
+    finally:
+        stop_http_archive()
+
+    try:
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = dict()
+        print(f'No baseline in {BASELINE_FILE} yet, save one with --save.')
+    print_results(results, baseline)
+
+    if save:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=4)
+        print(f'Saved baseline to {BASELINE_FILE}.')
+        return True
+    regressions = compare_to_baseline(results, baseline)
+    if regressions:
+        print('\nREGRESSIONS:')
+        for regression in regressions:
+            print(f'  {regression}')
+        return False
+    return True
+
+def make_fixture() -> None:
+    '''
+    Records a retrieval of the emulated session to FIXTURE_ARCHIVE, with a
+    cold temporary cache, and gives the recorded URLs the base URLs of the
+    real sites so that the replay finds them. The emulator serves both sites,
+    Tempus under /index.php.
+    '''
+    from emulator.emulator_server import (configure_emulator,
+                                          start_emulator_server)
+    from emulator.synthetic_sites import EMULATED_MEET_ID
+    configure_emulator(0, 0, 0, 0, 0, None)
+    server = start_emulator_server(FIXTURE_PORT, FIXTURE_SCALE, FIXTURE_SEED,
+                                   None)
+    base_url = f'http://localhost:{FIXTURE_PORT}'
+    os.makedirs(os.path.dirname(FIXTURE_ARCHIVE), exist_ok=True)
+    start_recording(FIXTURE_ARCHIVE)
+    try:
+        with tempfile.TemporaryDirectory() as cache_directory:
+            set_cache_directory(cache_directory)
+            set_base_urls(base_url, base_url)
+            with contextlib.redirect_stdout(io.StringIO()):
+                retrieve_data_module.get_meet_and_session_data(
+                    f'{base_url}/program.php?cid={EMULATED_MEET_ID}&session=1',
+                    NUM_HEATS)
+    finally:
+        set_base_urls(None, None)
+        server.shutdown()
+        stop_http_archive()
+    fixture = dict()
+    for url, response in load_http_archive(FIXTURE_ARCHIVE).items():
+        path = url[len(base_url):]
+        site = (TEMPUS_BASE_URL if path.startswith('/index.php')
+                else LIVETIMING_BASE_URL)
+        fixture[site + path] = response
+    save_http_archive(FIXTURE_ARCHIVE, fixture)
+    print(f'Recorded {len(fixture)} responses to {FIXTURE_ARCHIVE}.')
+
+def main() -> None:
+    '''
+    Parses the command line arguments and runs the benchmark suite. Exits with
+    status 1 if there are regressions.
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--save', action='store_true',
+                        help='save the results as the baseline of this '
+                             'machine')
+    parser.add_argument('--make-fixture', action='store_true',
+                        help='record the fixture from the emulator')
+    args = parser.parse_args()
+    if args.make_fixture:
+        make_fixture()
+        return
+    if not run_benchmark_suite(args.save):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
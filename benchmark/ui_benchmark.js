@@ -0,0 +1,366 @@
+// Browser-free timing harness for ui/script.js. Builds a large generated page
+// in a minimal fake DOM, loads script.js into it and replays clicks on events,
+// heats and swimmers. For each kind of click it reports the time per click
+// (including the animation frame the click schedules), the number of elements
+// visited by selector queries and getElementById, the number of forced
+// layouts (a layout read after a class or style change) and the number of
+// scans of the style sheet rules.
+//
+// Run from the repository root, optionally with another version of script.js
+// to compare against:
+//
+//     node benchmark/ui_benchmark.js [path/to/script.js] [--events N]
+//         [--heats N] [--lanes N] [--clicks N]
+//
+// The results are printed as JSON, which benchmark.py reads.
+
+'use strict';
+
+const fs = require('fs');
+const vm = require('vm');
+
+const options = {events: 60, heats: 30, lanes: 8, clicks: 200};
+let scriptPath = 'ui/script.js';
+const args = process.argv.slice(2);
+for (let i = 0; i < args.length; i++) {
+    if (args[i].startsWith('--')) {
+        options[args[i].slice(2)] = parseInt(args[++i]);
+    } else {
+        scriptPath = args[i];
+    }
+}
+
+const counters = {visited: 0, forcedLayouts: 0, cssRuleScans: 0};
+let layoutDirty = false;
+// getElementById is a lookup in browsers, not a walk of the page
+const elementsById = new Map();
+
+///////////////////////////////////////////////////////////////////////////////
+// Fake DOM
+///////////////////////////////////////////////////////////////////////////////
+
+class FakeClassList {
+    constructor(names) {
+        this.names = new Set(names);
+    }
+    contains(name) {
+        return this.names.has(name);
+    }
+    add(name) {
+        if (!this.names.has(name)) {
+            this.names.add(name);
+            layoutDirty = true;
+        }
+    }
+    remove(name) {
+        if (this.names.delete(name)) {
+            layoutDirty = true;
+        }
+    }
+}
+
+function makeStyle() {
+    return new Proxy({}, {
+        set(target, property, value) {
+            target[property] = value;
+            layoutDirty = true;
+            return true;
+        }
+    });
+}
+
+// a compound selector: '#id', '.class.class', '.class[data-name="value"]'
+function parseCompound(text) {
+    const compound = {id: null, classes: [], data: []};
+    const pattern = /#([\w-]+)|\.([\w-]+)|\[data-([\w-]+)="([^"]*)"\]/g;
+    let match;
+    while ((match = pattern.exec(text)) !== null) {
+        if (match[1]) {
+            compound.id = match[1];
+        } else if (match[2]) {
+            compound.classes.push(match[2]);
+        } else {
+            compound.data.push([match[3], match[4]]);
+        }
+    }
+    return compound;
+}
+
+function parseSelector(selector) {
+    return selector.trim().split(/\s+/).map(parseCompound);
+}
+
+class FakeElement {
+    constructor(classes = [], attributes = {}) {
+        this.classList = new FakeClassList(classes);
+        this.id = attributes.id || '';
+        if (this.id) {
+            elementsById.set(this.id, this);
+        }
+        this.dataset = attributes.dataset || {};
+        this.style = makeStyle();
+        this.children = [];
+        this.parentNode = null;
+        this.contentHeight = attributes.height || 20;
+    }
+    appendChild(child) {
+        child.parentNode = this;
+        this.children.push(child);
+        layoutDirty = true;
+        return child;
+    }
+    remove() {
+        if (this.parentNode) {
+            const siblings = this.parentNode.children;
+            siblings.splice(siblings.indexOf(this), 1);
+            this.parentNode = null;
+            layoutDirty = true;
+        }
+    }
+    replaceWith(element) {
+        const siblings = this.parentNode.children;
+        siblings[siblings.indexOf(this)] = element;
+        element.parentNode = this.parentNode;
+        this.parentNode = null;
+        layoutDirty = true;
+    }
+    get isConnected() {
+        let element = this;
+        while (element.parentNode) {
+            element = element.parentNode;
+        }
+        return element === document.documentElement;
+    }
+    get scrollHeight() {
+        if (layoutDirty) {
+            counters.forcedLayouts++;
+            layoutDirty = false;
+        }
+        return this.contentHeight;
+    }
+    scrollIntoView() {
+        this.scrollHeight;
+    }
+    matchesCompound(compound) {
+        if (compound.id !== null && this.id !== compound.id) {
+            return false;
+        }
+        return compound.classes.every(name => this.classList.contains(name)) &&
+               compound.data.every(([name, value]) =>
+                   this.dataset[name.replace(/-(\w)/g,
+                       (_, letter) => letter.toUpperCase())] === value);
+    }
+    matches(compounds) {
+        // the last compound matches this element, the others its ancestors
+        if (!this.matchesCompound(compounds[compounds.length - 1])) {
+            return false;
+        }
+        let index = compounds.length - 2;
+        let ancestor = this.parentNode;
+        while (index >= 0 && ancestor) {
+            if (ancestor.matchesCompound(compounds[index])) {
+                index--;
+            }
+            ancestor = ancestor.parentNode;
+        }
+        return index < 0;
+    }
+    *descendants() {
+        for (const child of this.children) {
+            counters.visited++;
+            yield child;
+            yield* child.descendants();
+        }
+    }
+    querySelector(selector) {
+        const compounds = parseSelector(selector);
+        for (const element of this.descendants()) {
+            if (element.matches(compounds)) {
+                return element;
+            }
+        }
+        return null;
+    }
+    querySelectorAll(selector) {
+        const compounds = parseSelector(selector);
+        return [...this.descendants()]
+            .filter(element => element.matches(compounds));
+    }
+    closest(selector) {
+        const compounds = parseSelector(selector);
+        let element = this;
+        while (element) {
+            counters.visited++;
+            if (element.matchesCompound && element.matches(compounds)) {
+                return element;
+            }
+            element = element.parentNode;
+        }
+        return null;
+    }
+    contains(element) {
+        while (element) {
+            if (element === this) {
+                return true;
+            }
+            element = element.parentNode;
+        }
+        return false;
+    }
+}
+
+const cssRules = [
+    {selectorText: '.event-item', style: {}},
+    {selectorText: '.heat-content',
+     style: {paddingTop: '21px', paddingBottom: '21px'}},
+    {selectorText: '.swimmer-content',
+     style: {paddingTop: '6px', paddingBottom: '12px'}},
+];
+
+const document = {
+    documentElement: new FakeElement(),
+    styleSheets: [{
+        get cssRules() {
+            counters.cssRuleScans++;
+            return cssRules;
+        }
+    }],
+    querySelector(selector) {
+        return this.documentElement.querySelector(selector);
+    },
+    querySelectorAll(selector) {
+        return this.documentElement.querySelectorAll(selector);
+    },
+    getElementById(id) {
+        counters.visited++;
+        const element = elementsById.get(id);
+        return element && element.isConnected ? element : null;
+    }
+};
+
+///////////////////////////////////////////////////////////////////////////////
+// Generated page
+///////////////////////////////////////////////////////////////////////////////
+
+function buildPage() {
+    const body = document.documentElement;
+    const twoColumns = body.appendChild(new FakeElement(['two-columns']));
+    const leftColumn = twoColumns.appendChild(new FakeElement(['left-column']));
+    const eventMenu = leftColumn.appendChild(new FakeElement(['event-menu']));
+    const page = [];
+    for (let event = 1; event <= options.events; event++) {
+        const eventItem = eventMenu.appendChild(new FakeElement(
+            ['event-item'], {id: `event-item-${event}`}));
+        const rightColumn = twoColumns.appendChild(new FakeElement(
+            ['right-column', 'hidden'], {id: `right-column-${event}`}));
+        const heatList = rightColumn.appendChild(new FakeElement(
+            ['heat-list']));
+        const heats = [];
+        for (let heat = 1; heat <= options.heats; heat++) {
+            const heatContainer = heatList.appendChild(new FakeElement(
+                ['heat-container'], {dataset: {heat: String(heat)}}));
+            heatContainer.appendChild(new FakeElement(['heat-item']));
+            const heatContent = heatContainer.appendChild(new FakeElement(
+                ['heat-content', 'hidden'],
+                {height: 40 + 34 * options.lanes}));
+            const swimmerList = heatContent.appendChild(new FakeElement(
+                ['swimmer-list']));
+            const swimmers = [];
+            for (let lane = 1; lane <= options.lanes; lane++) {
+                const swimmerContainer = swimmerList.appendChild(
+                    new FakeElement(['swimmer-container'],
+                                    {dataset: {lane: String(lane)}}));
+                swimmerContainer.appendChild(new FakeElement(['swimmer-item']));
+                swimmerContainer.appendChild(new FakeElement(
+                    ['swimmer-content', 'hidden'], {height: 120}));
+                swimmers.push(swimmerContainer);
+            }
+            heats.push({heatContainer, swimmers});
+        }
+        page.push({eventItem, heats});
+    }
+    return page;
+}
+
+///////////////////////////////////////////////////////////////////////////////
+// Replay
+///////////////////////////////////////////////////////////////////////////////
+
+const page = buildPage();
+let clickListener = null;
+let frameCallbacks = [];
+const context = vm.createContext({
+    window: {
+        addEventListener(type, listener) {
+            if (type === 'click') {
+                clickListener = listener;
+            }
+        }
+    },
+    document,
+    location: {protocol: 'file:'},
+    requestAnimationFrame(callback) {
+        frameCallbacks.push(callback);
+        return frameCallbacks.length;
+    },
+    console: {log() {}},
+    Map, Set, Array, JSON, Object, String, parseInt, Proxy
+});
+vm.runInContext(fs.readFileSync(scriptPath, 'utf8'), context);
+
+function runFrame() {
+    const callbacks = frameCallbacks;
+    frameCallbacks = [];
+    callbacks.forEach(callback => callback());
+}
+
+// seeded, so that every run clicks the same elements
+let seed = 1;
+function random(n) {
+    seed = (seed * 1103515245 + 12345) % 2147483648;
+    return seed % n;
+}
+
+const results = {};
+
+function click(kind, element) {
+    const before = {...counters};
+    const start = process.hrtime.bigint();
+    clickListener({target: element});
+    runFrame();
+    const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+    const result = results[kind] ||= {clicks: 0, seconds: 0, visited: 0,
+                                      forced_layouts: 0, css_rule_scans: 0};
+    result.clicks++;
+    result.seconds += seconds;
+    result.visited += counters.visited - before.visited;
+    result.forced_layouts += counters.forcedLayouts - before.forcedLayouts;
+    result.css_rule_scans += counters.cssRuleScans - before.cssRuleScans;
+    // layout happens after the frame
+    layoutDirty = false;
+}
+
+for (let i = 0; i < options.clicks; i++) {
+    const event = page[random(page.length)];
+    click('event', event.eventItem);
+    const heat = event.heats[random(event.heats.length)];
+    click('heat', heat.heatContainer);
+    click('swimmer', heat.swimmers[random(heat.swimmers.length)]);
+    click('heat', heat.heatContainer);
+}
+
+const report = {};
+for (const [kind, result] of Object.entries(results)) {
+    report[kind] = {
+        clicks: result.clicks,
+        seconds_per_click: result.seconds / result.clicks,
+        visited_per_click: result.visited / result.clicks,
+        forced_layouts_per_click: result.forced_layouts / result.clicks,
+        css_rule_scans_per_click: result.css_rule_scans / result.clicks
+    };
+}
+console.log(JSON.stringify({
+    page: {events: options.events, heats: options.heats, lanes: options.lanes,
+           elements: [...document.documentElement.descendants()].length},
+    clicks: report
+}, null, 4));
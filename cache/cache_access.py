@@ -0,0 +1,61 @@
+'''
+This file contains the access times of the cache entries, which the cache
+maintenance (cache_maintenance.py) prunes by. Each cache keeps its access
+times in a file next to its own:
+
+{ 'key' : [stored_at, accessed_at] }
+
+with the times in seconds since the epoch. Entries stored before the access
+times were kept have none, and count as stored and accessed when the cache
+maintenance first sees them.
+'''
+import json
+import time
+
+from cache.cache_paths import get_cache_path, make_cache_directory
+
+def get_access_file_name(cache_file_name: str) -> str:
+    '''
+    Returns the name of the access times file of a cache file.
+    '''
+    return cache_file_name.removesuffix('.json') + '_access.json'
+
+def load_access_times(cache_file_name: str) -> dict[str, list[float]]:
+    '''
+    Loads the access times of a cache. Returns an empty dict if there are
+    none.
+    '''
+    try:
+        with open(get_cache_path(get_access_file_name(cache_file_name)),
+                  'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        return dict()
+
+def save_access_times(cache_file_name: str,
+                      access_times: dict[str, list[float]]) -> None:
+    '''
+    Saves the access times of a cache.
+    '''
+    make_cache_directory()
+    with open(get_cache_path(get_access_file_name(cache_file_name)),
+              'w') as file:
+        json.dump(access_times, file)
+
+def mark_stored(access_times: dict[str, list[float]], key: str) -> None:
+    '''
+    Records that an entry was stored (or replaced) now.
+    '''
+    now = time.time()
+    access_times[key] = [now, now]
+
+def mark_accessed(access_times: dict[str, list[float]], key: str) -> None:
+    '''
+    Records that an entry was read now.
+    '''
+    now = time.time()
+    times = access_times.get(key)
+    if times is None:
+        access_times[key] = [now, now]
+    else:
+        times[1] = now
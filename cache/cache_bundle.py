@@ -0,0 +1,183 @@
+'''
+This file contains the export and import of cache bundles, so that a cache
+built on one machine can warm up the cache of another. A bundle covers the
+swimmer ID, meet ID and location, meet results and meet program caches (the
+HTTP cache is left out, since its bodies are large and quickly stale).
+
+A bundle is a zip file with a manifest.json and one compressed member per
+cache. The manifest maps every key of every cache to the content hash of its
+entry:
+
+{ 'format_version': 1,
+  'caches': { 'cache_name' : { 'key' : 'hash' } } }
+
+and the member of a cache maps the hashes to the entries:
+
+{ 'hash' : ['key', value] }
+
+Importing a bundle only reads the entries whose hashes are not in the local
+cache, and only writes the caches that got new entries. An entry whose key is
+already in the local cache with other content is kept as it is locally. To
+transfer only what another machine is missing, export with the manifest of
+that machine (write_cache_manifest) or one of its bundles as exclude_path.
+'''
+import hashlib
+import json
+import zipfile
+
+import cache.swimmer_id_cache as swimmer_id_cache_module
+import cache.meet_id_cache as meet_id_cache_module
+import cache.meet_results_cache as meet_results_cache_module
+import cache.meet_program_cache as meet_program_cache_module
+from cache.cache_access import mark_stored
+
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_MEMBER = 'manifest.json'
+
+# (cache name, load function, save function, module, name of the cache dict)
+BUNDLED_CACHES = [
+    ('swimmer_id',
+     swimmer_id_cache_module.load_stored_swimmer_id_cache,
+     swimmer_id_cache_module.save_swimmer_id_cache,
+     swimmer_id_cache_module, 'swimmer_id_cache'),
+    ('meet_id_and_location',
+     meet_id_cache_module.load_stored_meet_id_and_location_cache,
+     meet_id_cache_module.save_meet_id_and_location_cache,
+     meet_id_cache_module, 'meet_id_and_location_cache'),
+    ('meet_results',
+     meet_results_cache_module.load_stored_meet_results_cache,
+     meet_results_cache_module.save_meet_results_cache,
+     meet_results_cache_module, 'meet_results_cache'),
+    ('meet_program',
+     meet_program_cache_module.load_stored_meet_program_cache,
+     meet_program_cache_module.save_meet_program_cache,
+     meet_program_cache_module, 'meet_program_cache'),
+]
+
+def get_entry_hash(key: str, value) -> str:
+    '''
+    Returns the content hash of a cache entry. Tuples hash like the lists they
+    are stored as.
+    '''
+    content = json.dumps([key, value], sort_keys=True, separators=(',', ':'),
+                         ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+
+def get_cache_manifest() -> dict[str, dict[str, str]]:
+    '''
+    Loads the bundled caches and returns { 'cache_name' : { 'key' : 'hash' } }.
+    '''
+    manifest = dict()
+    for cache_name, load, _, module, dict_name in BUNDLED_CACHES:
+        load()
+        manifest[cache_name] = {
+            key: get_entry_hash(key, value)
+            for key, value in getattr(module, dict_name).items()
+        }
+    return manifest
+
+def write_cache_manifest(path: str) -> None:
+    '''
+    Writes the manifest of the local caches to a JSON file, which another
+    machine can export a bundle against.
+    '''
+    with open(path, 'w') as file:
+        json.dump({'format_version': BUNDLE_FORMAT_VERSION,
+                   'caches': get_cache_manifest()}, file)
+
+def read_manifest(path: str) -> dict[str, dict[str, str]] | None:
+    '''
+    Reads the cache hashes from a manifest file or a bundle. Returns None if
+    the file is neither, or of another format version.
+    '''
+    try:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path, 'r') as file:
+                manifest = json.loads(file.read(MANIFEST_MEMBER))
+        else:
+            with open(path, 'r') as file:
+                manifest = json.load(file)
+    except (FileNotFoundError, KeyError, json.decoder.JSONDecodeError):
+        return None
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        return None
+    return manifest['caches']
+
+###############################################################################
+# Export and import
+###############################################################################
+
+def export_cache_bundle(path: str, exclude_path: str | None = None
+                        ) -> dict[str, int] | None:
+    '''
+    Writes the bundled caches to a bundle at path. Entries whose hashes are in
+    the manifest or bundle at exclude_path are left out. Returns the number of
+    exported entries of each cache, or None if exclude_path could not be read.
+    '''
+    excluded = dict()
+    if exclude_path is not None:
+        excluded = read_manifest(exclude_path)
+        if excluded is None:
+            return None
+    excluded_hashes = {entry_hash for hashes in excluded.values()
+                       for entry_hash in hashes.values()}
+    manifest = dict()
+    counts = dict()
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED,
+                         compresslevel=9) as file:
+        for cache_name, load, _, module, dict_name in BUNDLED_CACHES:
+            load()
+            hashes = dict()
+            entries = dict()
+            for key, value in getattr(module, dict_name).items():
+                entry_hash = get_entry_hash(key, value)
+                if entry_hash in excluded_hashes:
+                    continue
+                hashes[key] = entry_hash
+                entries[entry_hash] = [key, value]
+            manifest[cache_name] = hashes
+            counts[cache_name] = len(entries)
+            file.writestr(f'{cache_name}.json', json.dumps(
+                entries, separators=(',', ':'), ensure_ascii=False))
+        file.writestr(MANIFEST_MEMBER, json.dumps(
+            {'format_version': BUNDLE_FORMAT_VERSION, 'caches': manifest}))
+    return counts
+
+def import_cache_bundle(path: str) -> dict[str, dict[str, int]] | None:
+    '''
+    Merges a bundle into the local caches. Returns the number of 'added',
+    'unchanged' and 'conflicting' (kept local) entries of each cache, or None
+    if the file is not a bundle of this format version.
+    '''
+    manifest = read_manifest(path)
+    if manifest is None or not zipfile.is_zipfile(path):
+        return None
+    counts = dict()
+    with zipfile.ZipFile(path, 'r') as file:
+        for cache_name, load, save, module, dict_name in BUNDLED_CACHES:
+            bundle_hashes = manifest.get(cache_name, dict())
+            load()
+            local_cache = getattr(module, dict_name)
+            missing_keys = []
+            unchanged = conflicting = 0
+            for key, entry_hash in bundle_hashes.items():
+                if key not in local_cache:
+                    missing_keys.append(key)
+                elif get_entry_hash(key, local_cache[key]) == entry_hash:
+                    unchanged += 1
+                else:
+                    conflicting += 1
+            # the member is only read when it has something new
+            if missing_keys:
+                entries = json.loads(file.read(f'{cache_name}.json'))
+                access_times = getattr(module, dict_name + '_access')
+                for key in missing_keys:
+                    local_cache[key] = entries[bundle_hashes[key]][1]
+                    mark_stored(access_times, key)
+                save()
+            counts[cache_name] = {
+                'added': len(missing_keys),
+                'unchanged': unchanged,
+                'conflicting': conflicting
+            }
+    return counts
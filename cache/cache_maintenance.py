@@ -0,0 +1,430 @@
+'''
+This file contains the maintenance functions for the caches, used by the
+'cache' command of main.py. They only need the cache files, so they start
+without importing the retrieval code.
+
+    stats      entries, file and memory sizes of every cache, and the hit
+               rates of the last run from its run report
+    validate   entries that can no longer be parsed, and duplicates (the same
+               value under several keys, such as a meet under two spellings)
+    compact    removes the invalid entries, the duplicates (keeping the most
+               recently used key), the meet results of meets no meet ID
+               refers to, and the HTTP bodies no entry refers to
+    prune      removes the entries stored too long ago or not used for too
+               long, and the least recently used entries above a size budget
+
+The JSON caches are pruned by the access times of their entries (see
+cache_access.py), and the HTTP cache by the times in its entries.
+'''
+import json
+import os
+import sys
+import time
+
+import cache.swimmer_id_cache as swimmer_id_cache_module
+import cache.meet_id_cache as meet_id_cache_module
+import cache.meet_results_cache as meet_results_cache_module
+import cache.start_list_cache as start_list_cache_module
+import cache.meet_program_cache as meet_program_cache_module
+import cache.http_cache as http_cache_module
+from cache.cache_paths import get_cache_path
+
+# (cache name, file name, load function, save function, module, name of the
+# cache dict)
+CACHES = [
+    ('swimmer_id', 'swimmer_id_cache.json',
+     swimmer_id_cache_module.load_stored_swimmer_id_cache,
+     swimmer_id_cache_module.save_swimmer_id_cache,
+     swimmer_id_cache_module, 'swimmer_id_cache'),
+    ('meet_id_and_location', 'meet_id_cache.json',
+     meet_id_cache_module.load_stored_meet_id_and_location_cache,
+     meet_id_cache_module.save_meet_id_and_location_cache,
+     meet_id_cache_module, 'meet_id_and_location_cache'),
+    ('meet_results', 'meet_results_cache.json',
+     meet_results_cache_module.load_stored_meet_results_cache,
+     meet_results_cache_module.save_meet_results_cache,
+     meet_results_cache_module, 'meet_results_cache'),
+    ('start_list', 'start_list_cache.json',
+     start_list_cache_module.load_stored_start_list_cache,
+     start_list_cache_module.save_start_list_cache,
+     start_list_cache_module, 'start_list_cache'),
+    ('meet_program', 'meet_program_cache.json',
+     meet_program_cache_module.load_stored_meet_program_cache,
+     meet_program_cache_module.save_meet_program_cache,
+     meet_program_cache_module, 'meet_program_cache'),
+    ('http', 'http_cache.json',
+     http_cache_module.load_stored_http_cache,
+     http_cache_module.save_http_cache,
+     http_cache_module, 'http_cache'),
+]
+
+# The caches whose duplicates (equal values under several keys) are removed.
+DEDUPLICATED_CACHES = ('swimmer_id', 'meet_id_and_location')
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+###############################################################################
+# Helper functions
+###############################################################################
+
+def load_caches() -> dict[str, dict]:
+    '''
+    Loads every cache and returns { 'cache_name' : cache dict }.
+    '''
+    caches = dict()
+    for cache_name, _, load, _, module, dict_name in CACHES:
+        load()
+        caches[cache_name] = getattr(module, dict_name)
+    return caches
+
+def save_caches() -> None:
+    '''
+    Saves every cache.
+    '''
+    for _, _, _, save, _, _ in CACHES:
+        save()
+
+def get_access_times(cache_name: str) -> dict[str, list[float]] | None:
+    '''
+    Returns the access times of a JSON cache, or None for the HTTP cache,
+    whose entries hold their own times.
+    '''
+    for name, _, _, _, module, dict_name in CACHES:
+        if name == cache_name and name != 'http':
+            return getattr(module, dict_name + '_access')
+    return None
+
+def get_entry_times(cache_name: str, key: str) -> tuple[float, float]:
+    '''
+    Returns when an entry was stored and last used. Entries without access
+    times count as stored and used now, and get them.
+    '''
+    if cache_name == 'http':
+        entry = http_cache_module.http_cache[key]
+        return entry['stored_at'], entry['accessed_at']
+    access_times = get_access_times(cache_name)
+    if key not in access_times:
+        now = time.time()
+        access_times[key] = [now, now]
+    stored_at, accessed_at = access_times[key]
+    return stored_at, accessed_at
+
+def get_entry_size(cache_name: str, key: str, value) -> int:
+    '''
+    Returns the number of bytes an entry takes on disk, roughly for the JSON
+    caches.
+    '''
+    if cache_name == 'http':
+        return value['size']
+    return len(json.dumps({key: value}))
+
+def remove_entry(caches: dict[str, dict], cache_name: str, key: str) -> None:
+    '''
+    Removes an entry with its access times, and the body file of an HTTP cache
+    entry.
+    '''
+    value = caches[cache_name].pop(key)
+    if cache_name == 'http':
+        try:
+            os.remove(http_cache_module.get_http_body_path(value['file']))
+        except FileNotFoundError:
+            pass
+        return
+    get_access_times(cache_name).pop(key, None)
+
+def get_file_size(path: str) -> int:
+    '''
+    Returns the size of a file in bytes, or 0 if it does not exist.
+    '''
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+def get_memory_size(value) -> int:
+    '''
+    Returns the number of bytes a loaded cache takes in memory, including the
+    objects it contains.
+    '''
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += get_memory_size(key) + get_memory_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += get_memory_size(item)
+    return size
+
+###############################################################################
+# Stats
+###############################################################################
+
+def load_last_run_cache_lookups(report_path: str) -> dict[str, dict]:
+    '''
+    Returns the cache hits and misses of the run report at report_path (see
+    metrics.py), or an empty dict if there is no report.
+    '''
+    try:
+        with open(report_path, 'r', encoding='utf-8') as file:
+            return json.load(file).get('caches', dict())
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        return dict()
+
+def get_cache_stats(report_path: str | None = None
+                    ) -> dict[str, dict[str, int]]:
+    '''
+    Loads every cache and returns its number of entries, the size of its file
+    and its size in memory. The HTTP cache also has the total size of the
+    stored bodies. With a report_path, the hits and misses of the last run are
+    added from its run report.
+    '''
+    caches = load_caches()
+    lookups = (load_last_run_cache_lookups(report_path)
+               if report_path is not None else dict())
+    stats = dict()
+    for cache_name, file_name, _, _, _, _ in CACHES:
+        stats[cache_name] = {
+            'entries': len(caches[cache_name]),
+            'file_bytes': get_file_size(get_cache_path(file_name)),
+            'memory_bytes': get_memory_size(caches[cache_name])
+        }
+        if cache_name in lookups:
+            stats[cache_name]['hits'] = lookups[cache_name]['hits']
+            stats[cache_name]['misses'] = lookups[cache_name]['misses']
+    stats['http']['body_bytes'] = sum(
+        entry['size'] for entry in caches['http'].values())
+    return stats
+
+def print_cache_stats(report_path: str | None = None) -> None:
+    '''
+    Prints the number of entries, sizes and last run hit rates of every cache.
+    '''
+    print(f'{"cache":<24}{"entries":>9}{"file KiB":>11}{"memory KiB":>12}'
+          f'{"bodies KiB":>12}{"hit rate":>10}')
+    for cache_name, stats in get_cache_stats(report_path).items():
+        body_kib = (f'{stats["body_bytes"] / 1024:.0f}'
+                    if 'body_bytes' in stats else '')
+        lookups = stats.get('hits', 0) + stats.get('misses', 0)
+        hit_rate = (f'{stats["hits"] / lookups:.0%}' if lookups > 0 else '')
+        print(f'{cache_name:<24}{stats["entries"]:>9}'
+              f'{stats["file_bytes"] / 1024:>11.0f}'
+              f'{stats["memory_bytes"] / 1024:>12.0f}{body_kib:>12}'
+              f'{hit_rate:>10}')
+
+###############################################################################
+# Validation
+###############################################################################
+
+def is_valid_swimmer_id_entry(key: str, value) -> bool:
+    '''
+    A swimmer ID entry has a 'name, born, club' key and a numeric ID.
+    '''
+    return (isinstance(value, str) and value.isdigit() and
+            len(key.split(', ')) >= 3)
+
+def is_valid_meet_id_entry(key: str, value) -> bool:
+    '''
+    A meet ID entry has a numeric ID and a location.
+    '''
+    return (isinstance(value, (list, tuple)) and len(value) == 2 and
+            isinstance(value[0], str) and value[0].isdigit() and
+            isinstance(value[1], str))
+
+def is_valid_meet_results_entry(key: str, value) -> bool:
+    '''
+    A meet results entry has a numeric meet ID, possibly with an event name,
+    and a list of row texts.
+    '''
+    return (meet_results_cache_module.get_meet_id_of_key(key).isdigit() and
+            isinstance(value, list) and
+            all(isinstance(row_text, str) for row_text in value))
+
+def is_valid_start_list_entry(key: str, value) -> bool:
+    '''
+    A start list entry has a content hash and an event name, pool, number of
+    heats and list of heats.
+    '''
+    return (isinstance(value, (list, tuple)) and len(value) == 2 and
+            isinstance(value[0], str) and
+            isinstance(value[1], (list, tuple)) and len(value[1]) == 4 and
+            isinstance(value[1][3], (list, tuple)))
+
+def is_valid_meet_program_entry(key: str, value) -> bool:
+    '''
+    A meet program entry has a numeric meet ID and a list of program rows,
+    each with a session number, an event number and the texts of its cells.
+    '''
+    return (key.isdigit() and isinstance(value, list) and
+            all(isinstance(row, (list, tuple)) and len(row) == 3 and
+                isinstance(row[0], int) and isinstance(row[2], list)
+                for row in value))
+
+def is_valid_http_entry(key: str, value) -> bool:
+    '''
+    An HTTP cache entry has its times and a body file of the stored size.
+    '''
+    if not isinstance(value, dict):
+        return False
+    if not all(field in value for field in ('stored_at', 'accessed_at',
+                                            'file', 'size')):
+        return False
+    body_path = http_cache_module.get_http_body_path(value['file'])
+    try:
+        return os.path.getsize(body_path) == value['size']
+    except FileNotFoundError:
+        return False
+
+ENTRY_VALIDATORS = {
+    'swimmer_id': is_valid_swimmer_id_entry,
+    'meet_id_and_location': is_valid_meet_id_entry,
+    'meet_results': is_valid_meet_results_entry,
+    'start_list': is_valid_start_list_entry,
+    'meet_program': is_valid_meet_program_entry,
+    'http': is_valid_http_entry
+}
+
+def get_invalid_keys(caches: dict[str, dict]) -> dict[str, list[str]]:
+    '''
+    Returns the keys of the entries of each cache that can not be parsed.
+    '''
+    return {
+        cache_name: [key for key, value in caches[cache_name].items()
+                     if not ENTRY_VALIDATORS[cache_name](key, value)]
+        for cache_name in caches
+    }
+
+def get_duplicate_keys(caches: dict[str, dict]) -> dict[str, list[list[str]]]:
+    '''
+    Returns the groups of keys with equal values in the DEDUPLICATED_CACHES,
+    such as the same meet cached under two spellings.
+    '''
+    duplicates = dict()
+    for cache_name in DEDUPLICATED_CACHES:
+        keys_by_value = dict()
+        for key, value in caches[cache_name].items():
+            keys_by_value.setdefault(json.dumps(value), []).append(key)
+        duplicates[cache_name] = [keys for keys in keys_by_value.values()
+                                  if len(keys) > 1]
+    return duplicates
+
+def get_unreferenced_meet_results(caches: dict[str, dict]) -> list[str]:
+    '''
+    Returns the keys of the meet results whose meet no meet ID entry refers
+    to.
+    '''
+    referenced_ids = {value[0] for value in
+                      caches['meet_id_and_location'].values()
+                      if is_valid_meet_id_entry('', value)}
+    return [key for key in caches['meet_results']
+            if meet_results_cache_module.get_meet_id_of_key(key)
+            not in referenced_ids]
+
+def get_orphaned_http_bodies(caches: dict[str, dict]) -> list[str]:
+    '''
+    Returns the paths of the stored HTTP bodies that no entry refers to.
+    '''
+    body_directory = http_cache_module.get_http_body_path('')
+    try:
+        file_names = os.listdir(body_directory)
+    except FileNotFoundError:
+        return []
+    referenced_files = {entry.get('file') for entry in caches['http'].values()
+                        if isinstance(entry, dict)}
+    return [os.path.join(body_directory, file_name)
+            for file_name in file_names if file_name not in referenced_files]
+
+def print_validation() -> None:
+    '''
+    Prints the invalid and duplicate entries of every cache, the unreferenced
+    meet results and the orphaned HTTP bodies.
+    '''
+    caches = load_caches()
+    for cache_name, keys in get_invalid_keys(caches).items():
+        print(f'{cache_name}: {len(keys)} invalid entries')
+        for key in keys:
+            print(f'    {key}')
+    for cache_name, groups in get_duplicate_keys(caches).items():
+        print(f'{cache_name}: {len(groups)} duplicated values')
+        for keys in groups:
+            print(f'    {" | ".join(keys)}')
+    print(f'meet_results: {len(get_unreferenced_meet_results(caches))} '
+          'unreferenced entries')
+    print(f'http: {len(get_orphaned_http_bodies(caches))} orphaned bodies')
+
+###############################################################################
+# Compaction and pruning
+###############################################################################
+
+def compact_caches() -> dict[str, int]:
+    '''
+    Removes the invalid entries, the duplicates (keeping the most recently
+    used key of each), the unreferenced meet results and the orphaned HTTP
+    bodies, and saves the caches. Returns the number of each removed.
+    '''
+    caches = load_caches()
+    removed = {'invalid': 0, 'duplicate': 0, 'unreferenced': 0,
+               'orphaned_bodies': 0}
+    for cache_name, keys in get_invalid_keys(caches).items():
+        for key in keys:
+            remove_entry(caches, cache_name, key)
+            removed['invalid'] += 1
+    for cache_name, groups in get_duplicate_keys(caches).items():
+        for keys in groups:
+            keys.sort(key=lambda key: get_entry_times(cache_name, key)[1])
+            for key in keys[:-1]:
+                remove_entry(caches, cache_name, key)
+                removed['duplicate'] += 1
+    for key in get_unreferenced_meet_results(caches):
+        remove_entry(caches, 'meet_results', key)
+        removed['unreferenced'] += 1
+    for path in get_orphaned_http_bodies(caches):
+        os.remove(path)
+        removed['orphaned_bodies'] += 1
+    # access times of entries that are gone
+    for cache_name in caches:
+        access_times = get_access_times(cache_name)
+        if access_times is None:
+            continue
+        for key in [key for key in access_times
+                    if key not in caches[cache_name]]:
+            del access_times[key]
+    save_caches()
+    return removed
+
+def prune_caches(max_age_days: float | None = None,
+                 max_idle_days: float | None = None,
+                 max_bytes: int | None = None) -> dict[str, int]:
+    '''
+    Removes the entries stored more than max_age_days ago and the entries not
+    used for more than max_idle_days, then the least recently used entries
+    until all caches together take at most max_bytes. Saves the caches and
+    returns the number of removed entries of each cache.
+    '''
+    caches = load_caches()
+    now = time.time()
+    removed = {cache_name: 0 for cache_name in caches}
+    # (accessed_at, cache name, key, size) of every kept entry
+    kept_entries = []
+    for cache_name, cache in caches.items():
+        for key in list(cache):
+            stored_at, accessed_at = get_entry_times(cache_name, key)
+            if ((max_age_days is not None and
+                 now - stored_at > max_age_days * SECONDS_PER_DAY) or
+                (max_idle_days is not None and
+                 now - accessed_at > max_idle_days * SECONDS_PER_DAY)):
+                remove_entry(caches, cache_name, key)
+                removed[cache_name] += 1
+                continue
+            kept_entries.append((accessed_at, cache_name, key,
+                                 get_entry_size(cache_name, key, cache[key])))
+    if max_bytes is not None:
+        total_size = sum(entry[3] for entry in kept_entries)
+        kept_entries.sort()
+        for _, cache_name, key, size in kept_entries:
+            if total_size <= max_bytes:
+                break
+            remove_entry(caches, cache_name, key)
+            removed[cache_name] += 1
+            total_size -= size
+    save_caches()
+    return removed
@@ -0,0 +1,28 @@
+'''
+This file contains the directory the caches are stored in. Every cache module
+builds the paths of its files with get_cache_path, so that the whole cache can
+be moved (e.g. with the --cache-dir option of main.py) by calling
+set_cache_directory before the caches are loaded.
+'''
+import os
+
+cache_directory = 'cache'
+
+def set_cache_directory(path: str) -> None:
+    '''
+    Sets the directory the caches are loaded from and saved to.
+    '''
+    global cache_directory
+    cache_directory = path
+
+def get_cache_path(file_name: str) -> str:
+    '''
+    Returns the path of a cache file in the cache directory.
+    '''
+    return os.path.join(cache_directory, file_name)
+
+def make_cache_directory() -> None:
+    '''
+    Creates the cache directory if it does not exist, before a cache is saved.
+    '''
+    os.makedirs(cache_directory, exist_ok=True)
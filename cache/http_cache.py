@@ -0,0 +1,181 @@
+'''
+This file contains an on-disk cache for HTTP responses. The keys are the URLs
+of the requests, and the values are dictionaries with the validators (ETag and
+Last-Modified) of the stored responses, when they were stored and last used,
+and the name of the file in the HTTP_CACHE_DIR directory of the cache
+directory (see cache_paths.py) that holds the response body.
+
+A stored response is served without any request while it is fresh according to
+HTTP_CACHE_FRESHNESS_RULES. After that, GET sends a conditional request with
+the stored validators and serves the stored body if LiveTiming or Tempus
+answers 304 Not Modified.
+'''
+import hashlib
+import json
+import os
+import re
+import time
+
+from cache.cache_paths import get_cache_path, make_cache_directory
+
+# Set HTTP_CACHE_ENABLED to False to always download full responses.
+HTTP_CACHE_ENABLED = True
+
+HTTP_CACHE_DIR = 'http'
+
+# Upper bound for the total size of the stored response bodies. The least
+# recently used responses are evicted first.
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# (URL pattern, seconds a stored response is fresh without revalidation). The
+# first matching pattern is used. URLs without a matching pattern, such as the
+# heat lists, are always revalidated with a conditional request.
+HTTP_CACHE_FRESHNESS_RULES = [
+    # session programs change during a meet
+    (re.compile(r'livetiming\.se/program\.php'), 0),
+    # new meets are added to the archive, but rarely during a run
+    (re.compile(r'livetiming\.se/archive\.php'), 60 * 60),
+    (re.compile(r'livetiming\.se/results\.php'), 24 * 60 * 60),
+    # personal bests only change when a swimmer has swum a new meet
+    (re.compile(r'tempusopen\.se/index\.php\?r=swimmer/distance'),
+     12 * 60 * 60),
+    (re.compile(r'tempusopen\.se/index\.php\?r=swimmer%2Findex'),
+     7 * 24 * 60 * 60),
+]
+
+# { 'url' : { 'etag': str | None, 'last_modified': str | None,
+#             'content_type': str | None, 'stored_at': float,
+#             'accessed_at': float, 'file': str, 'size': int } }
+http_cache: dict[str, dict] = dict()
+
+def get_http_body_path(file_name: str) -> str:
+    '''
+    Returns the path of a stored response body.
+    '''
+    return os.path.join(get_cache_path(HTTP_CACHE_DIR), file_name)
+
+def load_stored_http_cache() -> None:
+    '''
+    Loads the stored cache index from a file.
+    '''
+    global http_cache
+    try:
+        with open(get_cache_path('http_cache.json'), 'r') as file:
+            http_cache = json.load(file)
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        pass
+
+def save_http_cache() -> None:
+    '''
+    Evicts responses until the cache is within HTTP_CACHE_MAX_BYTES and saves
+    the cache index to a file.
+    '''
+    enforce_http_cache_size()
+    make_cache_directory()
+    with open(get_cache_path('http_cache.json'), 'w') as file:
+        json.dump(http_cache, file, indent=4)
+
+def get_cached_http_response(url: str) -> dict | None:
+    '''
+    Gets the cache entry of a URL. Returns None if the URL is not in the cache
+    or if the cache is disabled.
+    '''
+    if not HTTP_CACHE_ENABLED:
+        return None
+    return http_cache.get(url)
+
+def get_freshness_lifetime(url: str) -> int:
+    '''
+    Returns the number of seconds a stored response for the URL is fresh
+    according to HTTP_CACHE_FRESHNESS_RULES. URLs without a matching rule are
+    always revalidated.
+    '''
+    for pattern, seconds in HTTP_CACHE_FRESHNESS_RULES:
+        if pattern.search(url):
+            return seconds
+    return 0
+
+def is_http_response_fresh(url: str, entry: dict) -> bool:
+    '''
+    Returns True if the stored response can be served without revalidation.
+    '''
+    return time.time() - entry['stored_at'] < get_freshness_lifetime(url)
+
+def get_conditional_headers(entry: dict) -> dict[str, str]:
+    '''
+    Returns the If-None-Match and If-Modified-Since headers for a conditional
+    request based on the validators of the stored response.
+    '''
+    headers = dict()
+    if entry['etag'] is not None:
+        headers['If-None-Match'] = entry['etag']
+    if entry['last_modified'] is not None:
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+def read_cached_http_body(url: str, entry: dict) -> bytes | None:
+    '''
+    Reads the stored body of a response and marks the response as used.
+    Returns None, and removes the entry, if the body file is missing.
+    '''
+    try:
+        with open(get_http_body_path(entry['file']), 'rb') as file:
+            body = file.read()
+    except FileNotFoundError:
+        http_cache.pop(url, None)
+        return None
+    entry['accessed_at'] = time.time()
+    return body
+
+def mark_http_response_revalidated(url: str) -> None:
+    '''
+    Restarts the freshness lifetime of a stored response after a 304 Not
+    Modified answer.
+    '''
+    entry = http_cache[url]
+    entry['stored_at'] = entry['accessed_at'] = time.time()
+
+def add_http_response_to_cache(url: str, headers, body: bytes) -> None:
+    '''
+    Stores the body and the validators of a response. Responses without an
+    ETag or Last-Modified header are stored too, since they can still be
+    served while they are fresh. Responses marked no-store are not stored.
+    '''
+    if not HTTP_CACHE_ENABLED:
+        return
+    if 'no-store' in headers.get('Cache-Control', ''):
+        return
+    file_name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    os.makedirs(get_cache_path(HTTP_CACHE_DIR), exist_ok=True)
+    with open(get_http_body_path(file_name), 'wb') as file:
+        file.write(body)
+    now = time.time()
+    http_cache[url] = {
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'content_type': headers.get('Content-Type'),
+        'stored_at': now,
+        'accessed_at': now,
+        'file': file_name,
+        'size': len(body)
+    }
+
+def enforce_http_cache_size() -> None:
+    '''
+    Removes the least recently used responses until the total size of the
+    stored bodies is at most HTTP_CACHE_MAX_BYTES.
+    '''
+    total_size = sum(entry['size'] for entry in http_cache.values())
+    if total_size <= HTTP_CACHE_MAX_BYTES:
+        return
+    by_last_access = sorted(http_cache.items(),
+                            key=lambda url_entry: url_entry[1]['accessed_at'])
+    for url, entry in by_last_access:
+        if total_size <= HTTP_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(get_http_body_path(entry['file']))
+        except FileNotFoundError:
+            pass
+        total_size -= entry['size']
+        del http_cache[url]
@@ -5,33 +5,47 @@ the meets.
 '''
 import json
 
+from cache.cache_paths import get_cache_path, make_cache_directory
+from cache.cache_access import (load_access_times,
+                                save_access_times,
+                                mark_stored,
+                                mark_accessed)
+
 # { 'meet_name' : ('id', 'location') }
 meet_id_and_location_cache: dict[str, tuple[str, str]] = dict()
+# { 'key' : [stored_at, accessed_at] } (see cache_access.py)
+meet_id_and_location_cache_access: dict[str, list[float]] = dict()
 
 def load_stored_meet_id_and_location_cache() -> None:
     '''
-    Loads the stored cache from a file.
+    Loads the stored cache and the access times of its entries from files.
     '''
-    global meet_id_and_location_cache
+    global meet_id_and_location_cache, meet_id_and_location_cache_access
     try:
-        with open('cache/meet_id_cache.json', 'r') as file:
+        with open(get_cache_path('meet_id_cache.json'), 'r') as file:
             meet_id_and_location_cache = json.load(file)
-    except json.decoder.JSONDecodeError: 
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
         pass
+    meet_id_and_location_cache_access = load_access_times('meet_id_cache.json')
 
 def save_meet_id_and_location_cache() -> None:
     '''
-    Saves the cache to a file.
+    Saves the cache and the access times of its entries to files.
     '''
-    with open('cache/meet_id_cache.json', 'w') as file:
+    make_cache_directory()
+    with open(get_cache_path('meet_id_cache.json'), 'w') as file:
         json.dump(meet_id_and_location_cache, file, indent=4)
+    save_access_times('meet_id_cache.json', meet_id_and_location_cache_access)
 
 def get_cached_meet_id_and_location(meet_name: str) -> str | None:
     '''
     Gets the ID and location of a meet from the cache. Returns None if the meet 
     is not in the cache.
     '''
-    return meet_id_and_location_cache.get(meet_name)
+    id_and_location = meet_id_and_location_cache.get(meet_name)
+    if id_and_location is not None:
+        mark_accessed(meet_id_and_location_cache_access, meet_name)
+    return id_and_location
 
 def add_meet_id_and_location_to_cache(meet_name: str, id: str, 
                                       location: str) -> None:
@@ -39,3 +53,4 @@ def add_meet_id_and_location_to_cache(meet_name: str, id: str,
     Adds a meet's ID and location to the cache.
     '''
     meet_id_and_location_cache[meet_name] = (id, location)
+    mark_stored(meet_id_and_location_cache_access, meet_name)
@@ -0,0 +1,61 @@
+'''
+This file contains a cache for the session programs of past meets, which
+get_event_results uses to find the results pages of an event (see
+get_meet_program in retrieve_data.py). The keys are the LiveTiming meet IDs,
+and the values are the rows of all session programs of the meets. A meet is
+only looked up once it is in Tempus, after which its program no longer
+changes.
+'''
+import json
+
+from cache.cache_paths import get_cache_path, make_cache_directory
+from cache.cache_access import (load_access_times,
+                                save_access_times,
+                                mark_stored,
+                                mark_accessed)
+
+# { 'meet id' : [(session, 'event number', ['td text', ...]), ...] }
+meet_program_cache: dict[str, list[tuple[int, str, list[str]]]] = dict()
+# { 'key' : [stored_at, accessed_at] } (see cache_access.py)
+meet_program_cache_access: dict[str, list[float]] = dict()
+
+def load_stored_meet_program_cache() -> None:
+    '''
+    Loads the stored cache and the access times of its entries from files.
+    '''
+    global meet_program_cache, meet_program_cache_access
+    try:
+        with open(get_cache_path('meet_program_cache.json'), 'r') as file:
+            meet_program_cache = json.load(file)
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        pass
+    meet_program_cache_access = load_access_times('meet_program_cache.json')
+
+def save_meet_program_cache() -> None:
+    '''
+    Saves the cache and the access times of its entries to files.
+    '''
+    make_cache_directory()
+    with open(get_cache_path('meet_program_cache.json'), 'w') as file:
+        json.dump(meet_program_cache, file)
+    save_access_times('meet_program_cache.json', meet_program_cache_access)
+
+def get_cached_meet_program(meet_id: str
+                            ) -> list[tuple[int, str, list[str]]] | None:
+    '''
+    Gets the program of a meet from the cache. Returns None if the meet is not
+    in the cache.
+    '''
+    program = meet_program_cache.get(meet_id)
+    if program is not None:
+        mark_accessed(meet_program_cache_access, meet_id)
+    return program
+
+def add_meet_program_to_cache(meet_id: str,
+                              program: list[tuple[int, str, list[str]]]
+                              ) -> None:
+    '''
+    Adds the program of a meet to the cache.
+    '''
+    meet_program_cache[meet_id] = program
+    mark_stored(meet_program_cache_access, meet_id)
@@ -1,39 +1,144 @@
 '''
 This file contains a cache for meet results. The keys are the IDs of the meets,
-and the values are lists of the table row texts of the meet results.
+and the values are lists of the table row texts of the meet results. The
+results of a single event of a meet, fetched without the rest of the meet, are
+stored under a 'meet id/event name' key (see get_event_results_key).
+
+The whole cache is held in memory. When the retrieval nears its memory budget
+(see retrieve_data/memory_budget.py), the least recently used entries are
+evicted to a spill file next to the cache file. Evicted entries are read back
+from the spill file when they are looked up, by seeking to the offset they
+were written at, and save_meet_results_cache writes them together with the
+entries in memory.
 '''
 import json
+import os
+
+from cache.cache_paths import get_cache_path, make_cache_directory
+from cache.cache_access import (load_access_times,
+                                save_access_times,
+                                mark_stored,
+                                mark_accessed)
 
 # { 'id' : ['row_text', 'row_text', ...] }
 meet_results_cache: dict[str, list[str]] = dict()
+# { 'key' : [stored_at, accessed_at] } (see cache_access.py)
+meet_results_cache_access: dict[str, list[float]] = dict()
+# { 'id' : byte offset of its line in the spill file } for the meets evicted
+# to the spill file
+evicted_meet_offsets: dict[str, int] = dict()
+
+SPILL_FILE_NAME = 'meet_results_cache_evicted.jsonl'
+
+def remove_spill_file() -> None:
+    '''
+    Forgets the evicted entries and removes the spill file.
+    '''
+    evicted_meet_offsets.clear()
+    try:
+        os.remove(get_cache_path(SPILL_FILE_NAME))
+    except FileNotFoundError:
+        pass
+
+def read_spilled_meet_results_at(offset: int) -> list:
+    '''
+    Returns [meet ID, row texts] of the entry at the given byte offset of the
+    spill file.
+    '''
+    with open(get_cache_path(SPILL_FILE_NAME), 'rb') as file:
+        file.seek(offset)
+        return json.loads(file.readline())
+
+def get_event_results_key(meet_id: str, event_name: str) -> str:
+    '''
+    Returns the key of the results of an event of a meet, e.g.
+    '7082/100m frisim'.
+    '''
+    return f'{meet_id}/{event_name}'
+
+def get_meet_id_of_key(key: str) -> str:
+    '''
+    Returns the meet ID of a key of the whole meet or of one of its events.
+    '''
+    return key.split('/')[0]
 
 def load_stored_meet_results_cache() -> None:
     '''
-    Loads the stored cache from a file.
+    Loads the stored cache and the access times of its entries from files.
     '''
-    global meet_results_cache
+    global meet_results_cache, meet_results_cache_access
     try:
-        with open('cache/meet_results_cache.json', 'r') as file:
+        with open(get_cache_path('meet_results_cache.json'), 'r') as file:
             meet_results_cache = json.load(file)
-    except json.decoder.JSONDecodeError: 
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
         pass
+    meet_results_cache_access = load_access_times('meet_results_cache.json')
+    remove_spill_file()
 
 def save_meet_results_cache() -> None:
     '''
-    Saves the cache to a file.
+    Saves the cache and the access times of its entries to files. Evicted
+    entries are copied from the spill file one at a time, so that they are
+    not loaded back into memory.
     '''
-    with open('cache/meet_results_cache.json', 'w') as file:
-        json.dump(meet_results_cache, file, indent=4)
+    make_cache_directory()
+    with open(get_cache_path('meet_results_cache.json'), 'w') as file:
+        if not evicted_meet_offsets:
+            json.dump(meet_results_cache, file, indent=4)
+        else:
+            file.write('{')
+            separator = '\n'
+            for meet_id, row_texts in meet_results_cache.items():
+                file.write(f'{separator}    {json.dumps(meet_id)}: '
+                           f'{json.dumps(row_texts)}')
+                separator = ',\n'
+            # entries may have been fetched again since they were evicted
+            for meet_id, offset in evicted_meet_offsets.items():
+                if meet_id not in meet_results_cache:
+                    _, row_texts = read_spilled_meet_results_at(offset)
+                    file.write(f'{separator}    {json.dumps(meet_id)}: '
+                               f'{json.dumps(row_texts)}')
+                    separator = ',\n'
+            file.write('\n}')
+    save_access_times('meet_results_cache.json', meet_results_cache_access)
 
 def get_cached_meet_results(meet_id: str) -> list[str] | None:
     '''
     Gets the results of a meet from the cache. Returns None if the meet is not
-    in the cache.
+    in the cache. An evicted meet is read from the spill file, and stays
+    there.
     '''
-    return meet_results_cache.get(meet_id)
+    row_texts = meet_results_cache.get(meet_id)
+    if row_texts is None and meet_id in evicted_meet_offsets:
+        _, row_texts = read_spilled_meet_results_at(
+            evicted_meet_offsets[meet_id])
+    if row_texts is not None:
+        mark_accessed(meet_results_cache_access, meet_id)
+    return row_texts
 
 def add_meet_results_to_cache(meet_id: str, row_texts: list[str]) -> None:
     '''
     Adds the results of a meet to the cache.
     '''
     meet_results_cache[meet_id] = row_texts
+    mark_stored(meet_results_cache_access, meet_id)
+
+def evict_meet_results(fraction: float) -> int:
+    '''
+    Moves the given fraction of the entries in memory, least recently used
+    first, to the spill file. Returns the number of entries evicted.
+    '''
+    meet_ids = sorted(list(meet_results_cache), key=lambda meet_id: 
+                      meet_results_cache_access.get(meet_id, [0.0, 0.0])[1])
+    meet_ids = meet_ids[:int(len(meet_ids) * fraction)]
+    if not meet_ids:
+        return 0
+    make_cache_directory()
+    with open(get_cache_path(SPILL_FILE_NAME), 'ab') as file:
+        for meet_id in meet_ids:
+            row_texts = meet_results_cache.pop(meet_id, None)
+            if row_texts is not None:
+                evicted_meet_offsets[meet_id] = file.tell()
+                file.write(json.dumps([meet_id, row_texts]).encode('utf-8')
+                           + b'\n')
+    return len(meet_ids)
@@ -0,0 +1,71 @@
+'''
+This file contains a cache for parsed start lists. The keys are the URLs of
+the heat lists, and the values are the hashes of the heat list pages the start
+lists were parsed from, with the start lists as nested lists (see
+StartList.to_tuple in heat_list.py). A start list is only used while its heat
+list page has the same content hash.
+'''
+import json
+
+from cache.cache_paths import get_cache_path, make_cache_directory
+from cache.cache_access import (load_access_times,
+                                save_access_times,
+                                mark_stored,
+                                mark_accessed)
+
+# { 'url' : ('content hash', start list) }
+start_list_cache: dict[str, tuple[str, list]] = dict()
+# { 'key' : [stored_at, accessed_at] } (see cache_access.py)
+start_list_cache_access: dict[str, list[float]] = dict()
+
+def load_stored_start_list_cache() -> None:
+    '''
+    Loads the stored cache and the access times of its entries from files.
+    '''
+    global start_list_cache, start_list_cache_access
+    try:
+        with open(get_cache_path('start_list_cache.json'), 'r') as file:
+            start_list_cache = json.load(file)
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        pass
+    start_list_cache_access = load_access_times('start_list_cache.json')
+
+def save_start_list_cache() -> None:
+    '''
+    Saves the cache and the access times of its entries to files.
+    '''
+    make_cache_directory()
+    with open(get_cache_path('start_list_cache.json'), 'w') as file:
+        json.dump(start_list_cache, file)
+    save_access_times('start_list_cache.json', start_list_cache_access)
+
+def get_cached_start_list(url: str, content_hash: str) -> list | None:
+    '''
+    Gets the start list of a heat list from the cache. Returns None if the
+    heat list is not in the cache, or if its page has changed since.
+    '''
+    entry = start_list_cache.get(url)
+    if entry is None or entry[0] != content_hash:
+        return None
+    mark_accessed(start_list_cache_access, url)
+    return entry[1]
+
+def add_start_list_to_cache(url: str, content_hash: str,
+                            start_list: list) -> None:
+    '''
+    Adds the start list of a heat list to the cache, replacing the start list
+    of an earlier version of the page.
+    '''
+    start_list_cache[url] = (content_hash, start_list)
+    mark_stored(start_list_cache_access, url)
+
+def get_last_cached_start_list(url: str) -> list | None:
+    '''
+    Gets the start list last parsed from a heat list, whatever the content of
+    its page is now. Returns None if the heat list is not in the cache.
+    '''
+    entry = start_list_cache.get(url)
+    if entry is None:
+        return None
+    mark_accessed(start_list_cache_access, url)
+    return entry[1]
@@ -5,8 +5,16 @@ in Tempus.
 '''
 import json
 
+from cache.cache_paths import get_cache_path, make_cache_directory
+from cache.cache_access import (load_access_times,
+                                save_access_times,
+                                mark_stored,
+                                mark_accessed)
+
 # { 'name, born, club' : 'id' }
 swimmer_id_cache: dict[tuple[str, str, str], str] = dict()
+# { 'key' : [stored_at, accessed_at] } (see cache_access.py)
+swimmer_id_cache_access: dict[str, list[float]] = dict()
 
 # Local helper function
 def get_swimmer_id_cache_key(swimmer_data: dict[str, str]) -> str:
@@ -19,21 +27,24 @@ def get_swimmer_id_cache_key(swimmer_data: dict[str, str]) -> str:
 
 def load_stored_swimmer_id_cache() -> None:
     '''
-    Loads the stored cache from a file.
+    Loads the stored cache and the access times of its entries from files.
     '''
-    global swimmer_id_cache
+    global swimmer_id_cache, swimmer_id_cache_access
     try:
-        with open('cache/swimmer_id_cache.json', 'r') as file:
+        with open(get_cache_path('swimmer_id_cache.json'), 'r') as file:
             swimmer_id_cache = json.load(file)
-    except json.decoder.JSONDecodeError: 
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
         pass
+    swimmer_id_cache_access = load_access_times('swimmer_id_cache.json')
 
 def save_swimmer_id_cache() -> None:
     '''
-    Saves the cache to a file.
+    Saves the cache and the access times of its entries to files.
     '''
-    with open('cache/swimmer_id_cache.json', 'w') as file:
+    make_cache_directory()
+    with open(get_cache_path('swimmer_id_cache.json'), 'w') as file:
         json.dump(swimmer_id_cache, file, indent=4)
+    save_access_times('swimmer_id_cache.json', swimmer_id_cache_access)
 
 def get_cached_swimmer_id(swimmer_data: dict[str, str]) -> str | None:
     '''
@@ -41,7 +52,10 @@ def get_cached_swimmer_id(swimmer_data: dict[str, str]) -> str | None:
     in the cache.
     '''
     key = get_swimmer_id_cache_key(swimmer_data)
-    return swimmer_id_cache.get(key)
+    id = swimmer_id_cache.get(key)
+    if id is not None:
+        mark_accessed(swimmer_id_cache_access, key)
+    return id
 
 def add_swimmer_id_to_cache(swimmer_data: dict[str, str], id: str) -> None:
     '''
@@ -49,4 +63,5 @@ def add_swimmer_id_to_cache(swimmer_data: dict[str, str], id: str) -> None:
     '''
     key = get_swimmer_id_cache_key(swimmer_data)
     swimmer_id_cache[key] = id
+    mark_stored(swimmer_id_cache_access, key)
    
\ No newline at end of file
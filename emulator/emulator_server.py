@@ -0,0 +1,201 @@
+'''
+This file contains a local HTTP server that stands in for LiveTiming and
+Tempus, so that the retrieval can be load tested without sending traffic to
+the real sites. Point the retrieval at it with --livetiming-base-url and
+--tempus-base-url (see site_urls.py).
+
+The pages come from synthetic_sites.py, or from an HTTP archive recorded with
+'retrieve --record' (see http_archive.py), whose responses are served by their path
+and query. Every response is delayed by a lognormal latency, with a fraction
+of slow responses on top, and a fraction of the requests fail with
+503 Service Unavailable. With a request rate limit set, requests above it are
+answered with 429 Too Many Requests and a Retry-After header.
+
+Both sites are served on the same port, so the circuit breakers and the
+hedged requests of the retrieval see them as one host.
+'''
+
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from emulator.synthetic_sites import (EMULATED_MEET_ID,
+                                      get_synthetic_page,
+                                      set_scale)
+from retrieve_data.http_archive import load_http_archive
+from ui_server.ui_server import wait_for_interrupt
+
+_lock = threading.Lock()
+
+# median latency of a response in seconds
+latency_seconds: float = 0.15
+# sigma of the lognormal latency distribution
+latency_sigma: float = 0.5
+# fraction of responses delayed by slow_seconds more
+slow_fraction: float = 0.0
+slow_seconds: float = 0.0
+# fraction of requests answered with 503
+error_rate: float = 0.0
+# None for no rate limit
+max_requests_per_second: float | None = None
+# tokens of the request rate limit, refilled at max_requests_per_second
+rate_limit_tokens: float = 0.0
+rate_limit_refilled_at: float = 0.0
+
+# { 'path?query' : { 'status': int, 'headers': dict, 'body': bytes } }
+recorded_responses: dict[str, dict] | None = None
+
+def configure_emulator(latency_ms: float, sigma: float, slow_rate: float,
+                       slow_ms: float, errors: float,
+                       requests_per_second: float | None) -> None:
+    '''
+    Sets the latency distribution, the error rate and the request rate limit
+    of the emulator.
+    '''
+    assert latency_ms >= 0 and slow_ms >= 0, 'Latencies must not be negative.'
+    assert 0 <= slow_rate <= 1 and 0 <= errors <= 1, \
+        'Rates must be between 0 and 1.'
+    assert requests_per_second is None or requests_per_second > 0, \
+        'Request rate limit must be greater than 0.'
+    global latency_seconds, latency_sigma, slow_fraction, slow_seconds
+    global error_rate, max_requests_per_second
+    global rate_limit_tokens, rate_limit_refilled_at
+    latency_seconds = latency_ms / 1000
+    latency_sigma = sigma
+    slow_fraction = slow_rate
+    slow_seconds = slow_ms / 1000
+    error_rate = errors
+    max_requests_per_second = requests_per_second
+    with _lock:
+        rate_limit_tokens = requests_per_second or 0.0
+        rate_limit_refilled_at = time.monotonic()
+
+def load_recorded_responses(path: str | None) -> None:
+    '''
+    Serves the responses of an HTTP archive instead of the synthetic sites.
+    None goes back to the synthetic sites.
+    '''
+    global recorded_responses
+    if path is None:
+        recorded_responses = None
+        return
+    responses = dict()
+    for url, response in load_http_archive(path).items():
+        parts = urlsplit(url)
+        responses[f'{parts.path}?{parts.query}'] = response
+    recorded_responses = responses
+
+def take_rate_limit_token() -> bool:
+    '''
+    Returns True if a request fits in the request rate limit, and counts it.
+    The limit allows bursts of one second's worth of requests.
+    '''
+    global rate_limit_tokens, rate_limit_refilled_at
+    if max_requests_per_second is None:
+        return True
+    with _lock:
+        now = time.monotonic()
+        rate_limit_tokens = min(
+            max_requests_per_second,
+            rate_limit_tokens
+            + (now - rate_limit_refilled_at) * max_requests_per_second)
+        rate_limit_refilled_at = now
+        if rate_limit_tokens < 1:
+            return False
+        rate_limit_tokens -= 1
+        return True
+
+def get_latency() -> float:
+    '''
+    Returns the latency of a response in seconds.
+    '''
+    if latency_seconds <= 0:
+        latency = 0.0
+    else:
+        latency = random.lognormvariate(math.log(latency_seconds),
+                                        latency_sigma)
+    if random.random() < slow_fraction:
+        latency += slow_seconds
+    return latency
+
+def get_response(path: str, query: str) -> dict | None:
+    '''
+    Returns the response to a request, from the HTTP archive if one is loaded
+    and from the synthetic sites otherwise. Returns None if there is no such
+    page.
+    '''
+    if recorded_responses is not None:
+        return recorded_responses.get(f'{path}?{query}')
+    body = get_synthetic_page(path, query)
+    if body is None:
+        return None
+    return {'status': 200,
+            'headers': {'Content-Type': 'text/html; charset=utf-8'},
+            'body': body}
+
+class EmulatorRequestHandler(BaseHTTPRequestHandler):
+    '''
+    Serves the pages of LiveTiming and Tempus with the configured latency,
+    errors and rate limit.
+    '''
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        if not take_rate_limit_token():
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        time.sleep(get_latency())
+        if random.random() < error_rate:
+            self.send_error(503)
+            return
+        parts = urlsplit(self.path)
+        response = get_response(parts.path, parts.query)
+        if response is None:
+            self.send_error(404)
+            return
+        self.send_response(response['status'])
+        for name, value in response['headers'].items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(response['body'])))
+        self.end_headers()
+        self.wfile.write(response['body'])
+
+    def log_message(self, format, *args) -> None:
+        # keep the terminal free for the retrieval output
+        pass
+
+def start_emulator_server(port: int, scale: float, seed: int,
+                          archive_path: str | None) -> ThreadingHTTPServer:
+    '''
+    Starts the emulator on the given port in a background thread. Returns the
+    server.
+    '''
+    set_scale(scale, seed)
+    load_recorded_responses(archive_path)
+    server = ThreadingHTTPServer(('', port), EmulatorRequestHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def serve_emulator(port: int, scale: float, seed: int,
+                   archive_path: str | None) -> None:
+    '''
+    Serves the emulated sites until interrupted with Ctrl+C.
+    '''
+    server = start_emulator_server(port, scale, seed, archive_path)
+    base_url = f'http://localhost:{port}'
+    print(f'Emulating LiveTiming and Tempus at {base_url}/. Stop with Ctrl+C.')
+    if archive_path is None:
+        print('Retrieve the emulated meet with:\n'
+              f'  python main.py retrieve --url "{base_url}/program.php'
+              f'?cid={EMULATED_MEET_ID}&session=1" '
+              f'--livetiming-base-url {base_url} '
+              f'--tempus-base-url {base_url} --cache-dir emulator_cache')
+    wait_for_interrupt(server)
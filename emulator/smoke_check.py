@@ -0,0 +1,66 @@
+'''
+This file contains the smoke check of the emulator: a retrieval of the
+emulated session that must find the splits of the best swims. Without it, a
+page the retrieval can no longer read only shows up as every lookup failing,
+and a load test against the emulator only exercises the error path.
+
+Run from the repository root:
+
+    python main.py emulate --check
+
+The retrieval uses a temporary cache directory, so that it does not mix the
+emulated meets into the real caches and starts cold. It finds the splits
+through the programs and event results pages of the archive meets (see
+get_event_results in retrieve_data.py), as a retrieval does by default.
+'''
+
+import tempfile
+from collections import Counter
+
+from cache.cache_paths import set_cache_directory
+from emulator.emulator_server import start_emulator_server
+from emulator.synthetic_sites import EMULATED_MEET_ID, FIRST_TIME_FRACTION
+from retrieve_data.retrieve_data import retrieve_data
+from retrieve_data.site_urls import set_base_urls
+
+# Fraction of the looked up swims that must have splits. Only the swimmers
+# swimming an event for the first time have none.
+MIN_SPLITS_FRACTION = (1 - FIRST_TIME_FRACTION) * 0.8
+
+def run_smoke_check(port: int, scale: float, seed: int) -> bool:
+    '''
+    Retrieves the emulated session from an emulator started on the given port
+    and prints the outcome of the best swims. Returns True if at least
+    MIN_SPLITS_FRACTION of them have splits.
+    '''
+    server = start_emulator_server(port, scale, seed, None)
+    base_url = f'http://localhost:{port}'
+    try:
+        with tempfile.TemporaryDirectory() as cache_directory:
+            set_cache_directory(cache_directory)
+            set_base_urls(base_url, base_url)
+            session = retrieve_data(f'{base_url}/program.php'
+                                    f'?cid={EMULATED_MEET_ID}&session=1', 100)
+    finally:
+        set_base_urls(None, None)
+        server.shutdown()
+    if session is None:
+        print('Smoke check failed: the emulated session was not retrieved.')
+        return False
+    outcomes = Counter()
+    for event in session.events:
+        for heat in event.heats:
+            for entry in heat.lanes:
+                best_swim = entry.best_swim
+                outcomes['splits' if best_swim.splits is not None
+                         else best_swim.error or 'no splits'] += 1
+    num_swims = sum(outcomes.values())
+    for outcome, count in outcomes.most_common():
+        print(f'  {outcome}: {count}')
+    if num_swims == 0 or outcomes['splits'] < num_swims * MIN_SPLITS_FRACTION:
+        print(f'Smoke check failed: {outcomes["splits"]} of {num_swims} '
+              'swims have splits.')
+        return False
+    print(f'Smoke check passed: {outcomes["splits"]} of {num_swims} swims '
+          'have splits.')
+    return True
@@ -0,0 +1,596 @@
+'''
+This file contains the synthetic LiveTiming and Tempus pages the emulator
+serves (see emulator_server.py). The pages have the same structure as the real
+ones, as far as the retrieval reads them, so a whole retrieval can run against
+them:
+
+    LiveTiming  program.php?cid=&session=      session program
+                heatlist.php?cid=&session=&event=
+                                               heat list of an event
+                archive.php                    archive of all meets
+                results.php?cid=&session=0     results of a meet
+                results.php?cid=&session=&event=
+                                               results of an event
+    Tempus      index.php?r=swimmer/index      swimmer grid and search
+                index.php?r=swimmer/distance&id=&event=
+                                               all times of an event
+                index.php?r=swimmer/view&id=   best times of all events
+
+Every page is generated from the seed, so the same seed always gives the same
+sites. The best swims of the swimmers are consistent across the sites: the
+time, meet and date on Tempus are those of the swim in the LiveTiming results
+of the meet, with splits for every 50.
+
+The size of the meet scales with set_scale: a scale of 1 is a normal session
+of NORMAL_SESSION_EVENTS events from a pool of NORMAL_SESSION_SWIMMERS
+swimmers, and a scale of 10 is ten times both.
+'''
+import html
+import random
+import threading
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+from retrieve_data.event_ids import TEMPUS_EVENT_IDs
+
+EMULATED_MEET_ID = '1000'
+EMULATED_MEET_NAME = 'Emulatorsimmet 2025'
+
+# Size of a session at scale 1.
+NORMAL_SESSION_EVENTS = 16
+NORMAL_SESSION_SWIMMERS = 400
+MAX_HEATS_PER_EVENT = 6
+NUM_LANES = 8
+
+# Number of meets in the LiveTiming archive, and the first of their ids.
+NUM_ARCHIVE_MEETS = 300
+FIRST_ARCHIVE_MEET_ID = 5000
+FIRST_SWIMMER_ID = 300000
+
+# Fraction of the swimmers that have never swum an event.
+FIRST_TIME_FRACTION = 0.1
+
+# Minimum number of swims listed for each event in the results of a meet.
+MIN_SWIMS_PER_RESULT = 24
+
+# Number of rows on each page of the Tempus swimmer grid.
+GRID_PAGE_SIZE = 20
+
+POOL = '25m'
+EVENTS = [(50, 'frisim'), (100, 'frisim'), (200, 'frisim'), (400, 'frisim'),
+          (50, 'ryggsim'), (100, 'ryggsim'), (200, 'ryggsim'),
+          (50, 'bröstsim'), (100, 'bröstsim'), (200, 'bröstsim'),
+          (50, 'fjärilsim'), (100, 'fjärilsim'), (200, 'fjärilsim'),
+          (100, 'medley'), (200, 'medley'), (400, 'medley')]
+GENDERS = ['Damer', 'Herrar']
+
+# Seconds per 50 of an average swimmer.
+STROKE_PACES = {'frisim': 33.0, 'ryggsim': 38.0, 'bröstsim': 42.0,
+                'fjärilsim': 36.0, 'medley': 39.0}
+
+FIRST_NAMES = {
+    'Damer': ['Alva', 'Ebba', 'Elsa', 'Ella', 'Freja', 'Ines', 'Julia',
+              'Klara', 'Linnea', 'Maja', 'Moa', 'Nora', 'Olivia', 'Saga',
+              'Selma', 'Stella', 'Tilde', 'Vera', 'Wilma', 'Agnes'],
+    'Herrar': ['Adam', 'Albin', 'Alfred', 'Anton', 'Axel', 'Elias', 'Emil',
+               'Erik', 'Filip', 'Gustav', 'Hugo', 'Isak', 'Leo', 'Liam',
+               'Lucas', 'Melvin', 'Nils', 'Oliver', 'Oscar', 'Viktor']
+}
+LAST_NAMES = ['Andersson', 'Berg', 'Björk', 'Dahl', 'Ek', 'Engström',
+              'Forsberg', 'Holm', 'Hedlund', 'Jonsson', 'Karlsson', 'Lind',
+              'Lindqvist', 'Lundgren', 'Nilsson', 'Nyström', 'Sandberg',
+              'Sjöberg', 'Strand', 'Wallin', 'Åberg', 'Öberg']
+CLUBS = ['Sundsvalls Simsällskap', 'SK Neptun', 'Västerås SS',
+         'Linköpings ASS', 'Malmö KK', 'Göteborg Sim', 'Jönköpings SS',
+         'Umeå Simsällskap', 'Örebro Simallians', 'Täby Sim',
+         'Södertörns SS', 'Helsingborgs SS', 'Uppsala Simsällskap',
+         'Luleå Simsällskap', 'Kristianstads SLS', 'Borås Simsällskap']
+MEET_CITIES = ['Sundsvall', 'Västerås', 'Linköping', 'Malmö', 'Göteborg',
+               'Jönköping', 'Umeå', 'Örebro', 'Täby', 'Helsingborg',
+               'Uppsala', 'Luleå', 'Kristianstad', 'Borås', 'Karlstad']
+MEET_KINDS = ['Sprint', 'Cup', 'Open', 'Grand Prix', 'Simiaden',
+              'Trofén', 'Mästerskap', 'Höstsim', 'Vårsim', 'Juniorsim']
+MEET_YEARS = [2023, 2024, 2025]
+
+scale: float = 1.0
+seed: int = 1
+
+_lock = threading.Lock()
+_meet_swims_lock = threading.Lock()
+# built on the first request after set_scale
+swimmers: list[dict] | None = None
+archive_meets: list[dict] | None = None
+# { 'meet id' : { (distance, stroke, gender) : [(swimmer, best swim), ...] } }
+meet_swims: dict[str, dict] | None = None
+
+def set_scale(new_scale: float, new_seed: int = 1) -> None:
+    '''
+    Sets the size of the emulated meet and the seed the sites are generated
+    from.
+    '''
+    global scale, seed, swimmers, archive_meets, meet_swims
+    with _lock:
+        scale = new_scale
+        seed = new_seed
+        swimmers = None
+        archive_meets = None
+        meet_swims = None
+    get_swim.cache_clear()
+    get_session_events.cache_clear()
+
+###############################################################################
+# Generated data
+###############################################################################
+
+def get_random(*keys) -> random.Random:
+    '''
+    Returns a random generator seeded by the seed and the keys, so that the
+    same keys always give the same data.
+    '''
+    return random.Random('-'.join(str(key) for key in (seed,) + keys))
+
+def build_sites() -> None:
+    '''
+    Generates the swimmers and the archive meets. Called with the lock held.
+    '''
+    global swimmers, archive_meets
+    rng = get_random('swimmers')
+    swimmers = []
+    for i in range(round(NORMAL_SESSION_SWIMMERS * scale)):
+        gender = GENDERS[i % 2]
+        swimmers.append({'id': str(FIRST_SWIMMER_ID + i),
+                         'first_name': rng.choice(FIRST_NAMES[gender]),
+                         'last_name': rng.choice(LAST_NAMES),
+                         'born': str(rng.randint(2006, 2014)),
+                         'club': rng.choice(CLUBS),
+                         'gender': gender,
+                         # seconds per 50 slower than the average swimmer
+                         'level': rng.gauss(0.0, 2.5)})
+    rng = get_random('archive')
+    names = [(city, kind, year) for city in MEET_CITIES
+             for kind in MEET_KINDS for year in MEET_YEARS]
+    rng.shuffle(names)
+    archive_meets = []
+    for i, (city, kind, year) in enumerate(names[:NUM_ARCHIVE_MEETS]):
+        archive_meets.append({
+            'id': str(FIRST_ARCHIVE_MEET_ID + i),
+            'name': f'{city} {kind} {year}',
+            'location': city,
+            'date': f'{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+        })
+
+def get_swimmers() -> list[dict]:
+    '''
+    Returns the swimmers, generating them on the first call.
+    '''
+    with _lock:
+        if swimmers is None:
+            build_sites()
+        return swimmers
+
+def get_archive_meets() -> list[dict]:
+    '''
+    Returns the meets of the LiveTiming archive.
+    '''
+    get_swimmers()
+    return archive_meets
+
+def get_swimmer(swimmer_id: str) -> dict | None:
+    '''
+    Returns a swimmer by their Tempus id.
+    '''
+    all_swimmers = get_swimmers()
+    index = int(swimmer_id) - FIRST_SWIMMER_ID if swimmer_id.isdigit() else -1
+    if 0 <= index < len(all_swimmers):
+        return all_swimmers[index]
+    return None
+
+def make_splits(rng: random.Random, distance: int, stroke: str,
+                level: float) -> list[int]:
+    '''
+    Returns the times of every 50 of a swim in hundredths.
+    '''
+    pace = STROKE_PACES[stroke] + level + distance / 200
+    fifties = []
+    for i in range(distance // 50):
+        # no turn on the first 50
+        fifty = pace - (2.5 if i == 0 else 0.0) + rng.uniform(-0.8, 0.8)
+        fifties.append(round(max(fifty, 22.0) * 100))
+    return fifties
+
+@lru_cache(maxsize=None)
+def get_swim(swimmer_id: str, distance: int, stroke: str) -> dict | None:
+    '''
+    Returns the best swim of a swimmer in an event: the meet, and the times
+    of every 50 in hundredths. Returns None if the swimmer has never swum the
+    event.
+    '''
+    swimmer = get_swimmer(swimmer_id)
+    rng = get_random('swim', swimmer_id, distance, stroke)
+    if swimmer is None or rng.random() < FIRST_TIME_FRACTION:
+        return None
+    meet = rng.choice(get_archive_meets())
+    return {'meet': meet,
+            'fifties': make_splits(rng, distance, stroke, swimmer['level'])}
+
+def get_meet_swims(meet_id: str) -> dict:
+    '''
+    Returns the best swims swum at a meet, by event. Indexes the best swims of
+    all swimmers on the first call.
+    '''
+    global meet_swims
+    all_swimmers = get_swimmers()
+    with _meet_swims_lock:
+        if meet_swims is None:
+            index = dict()
+            for swimmer in all_swimmers:
+                for distance, stroke in EVENTS:
+                    swim = get_swim(swimmer['id'], distance, stroke)
+                    if swim is None:
+                        continue
+                    event_swims = index.setdefault(
+                        swim['meet']['id'], dict()).setdefault(
+                        (distance, stroke, swimmer['gender']), [])
+                    event_swims.append((swimmer, swim))
+            meet_swims = index
+        return meet_swims.get(meet_id, dict())
+
+@lru_cache(maxsize=None)
+def get_session_events(session: int) -> list[dict]:
+    '''
+    Returns the events of a session of the emulated meet, with the swimmers
+    of every lane of every heat.
+    '''
+    rng = get_random('session', session)
+    all_swimmers = get_swimmers()
+    num_events = round(NORMAL_SESSION_EVENTS * scale)
+    events = []
+    for i in range(num_events):
+        distance, stroke = EVENTS[(i + session) % len(EVENTS)]
+        gender = GENDERS[i % 2]
+        candidates = [swimmer for swimmer in all_swimmers
+                      if swimmer['gender'] == gender]
+        num_heats = rng.randint(1, MAX_HEATS_PER_EVENT)
+        num_entries = min(len(candidates),
+                          (num_heats - 1) * NUM_LANES
+                          + rng.randint(2, NUM_LANES))
+        entries = rng.sample(candidates, num_entries)
+        # the fastest swim last, as in a real heat list
+        entries.sort(key=lambda swimmer: -swimmer['level'])
+        heats = [entries[start:start + NUM_LANES]
+                 for start in range(0, len(entries), NUM_LANES)]
+        events.append({'number': (session - 1) * num_events + i + 1,
+                       'distance': distance,
+                       'stroke': stroke,
+                       'gender': gender,
+                       'heats': heats})
+    return events
+
+###############################################################################
+# Time formats
+###############################################################################
+
+def format_time(hundredths: int) -> str:
+    '''
+    Returns a time in the LiveTiming format, e.g. '58.12' or '1:02.34'.
+    '''
+    minutes, hundredths = divmod(hundredths, 6000)
+    seconds = f'{hundredths // 100:02d}.{hundredths % 100:02d}'
+    return f'{minutes}:{seconds}' if minutes > 0 else seconds.lstrip('0')
+
+def format_tempus_time(hundredths: int) -> str:
+    '''
+    Returns a time in the Tempus format, e.g. '00:58.12'.
+    '''
+    minutes, hundredths = divmod(hundredths, 6000)
+    return f'{minutes:02d}:{hundredths // 100:02d}.{hundredths % 100:02d}'
+
+def format_splits(fifties: list[int]) -> str:
+    '''
+    Returns the splits row text of a swim, e.g.
+    '50m: 29.12 100m: 1:02.34 (33.22)'.
+    '''
+    texts = [f'50m: {format_time(fifties[0])}']
+    total = fifties[0]
+    for i, fifty in enumerate(fifties[1:], start=2):
+        total += fifty
+        texts.append(f'{i * 50}m: {format_time(total)} ({format_time(fifty)})')
+    return ' '.join(texts)
+
+###############################################################################
+# Pages
+###############################################################################
+
+def make_page(title: str, rows: list[str]) -> bytes:
+    '''
+    Returns a page with a heading and a table of the rows.
+    '''
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>{html.escape(title)}</title></head><body>'
+            f'<h1>{html.escape(title)}</h1><table><tbody>'
+            f'{"".join(rows)}</tbody></table></body></html>').encode('utf-8')
+
+def make_row(*cells: str, header: bool = False) -> str:
+    '''
+    Returns a table row of already escaped cells, on lines of their own as on
+    the real pages, so that the text of the row has the cells apart.
+    '''
+    tag = 'th' if header else 'td'
+    return ('<tr>\n' + '\n'.join(f'<{tag}>{cell}</{tag}>' for cell in cells)
+            + '\n</tr>\n')
+
+def get_event_name(event: dict) -> str:
+    '''
+    Returns the name of an event, e.g. '100m frisim Damer'.
+    '''
+    return f'{event["distance"]}m {event["stroke"]} {event["gender"]}'
+
+def get_program_page(query: dict) -> bytes | None:
+    '''
+    Returns the program of a session, with a heat list link for every event.
+    The sessions of the archive meets have results links instead.
+    '''
+    session = int(query.get('session', '1'))
+    if query.get('cid') != EMULATED_MEET_ID:
+        meet = get_archive_meet(query.get('cid', ''))
+        if meet is None:
+            return None
+        return get_archive_program_page(meet, session)
+    rows = [make_row('Gren', 'Namn', '', header=True)]
+    for event in get_session_events(session):
+        link = (f'heatlist.php?cid={EMULATED_MEET_ID}&amp;session={session}'
+                f'&amp;event={event["number"]}')
+        rows.append(make_row(str(event['number']),
+                             html.escape(get_event_name(event)),
+                             f'<a href="{link}">Heatlista</a>'))
+    return make_page(f'Pass {session} {EMULATED_MEET_NAME}', rows)
+
+def get_heat_list_page(query: dict) -> bytes | None:
+    '''
+    Returns the heat list of an event, with a seed time for every lane.
+    '''
+    session = int(query.get('session', '1'))
+    event_number = int(query.get('event', '0'))
+    event = next((event for event in get_session_events(session)
+                  if event['number'] == event_number), None)
+    if event is None:
+        return None
+    rows = [make_row('Heatlista', header=True),
+            make_row(f'Bassäng: {POOL}')]
+    num_heats = len(event['heats'])
+    for heat_number, heat in enumerate(event['heats'], start=1):
+        rows.append(make_row(html.escape(
+            f'Gren {event_number} {get_event_name(event)} '
+            f'Heat {heat_number} ({num_heats})')))
+        for lane, swimmer in enumerate(heat, start=1):
+            swim = get_swim(swimmer['id'], event['distance'], event['stroke'])
+            seed_time = ('-' if swim is None
+                         else format_time(sum(swim['fifties'])))
+            rows.append(make_row(
+                str(lane),
+                html.escape(f'{swimmer["first_name"]} '
+                            f'{swimmer["last_name"]}'),
+                swimmer['born'], html.escape(swimmer['club']), seed_time))
+    return make_page(f'Heatlista {get_event_name(event)}', rows)
+
+def get_archive_page(query: dict) -> bytes | None:
+    '''
+    Returns the archive of all meets.
+    '''
+    rows = [make_row('Tävling', 'Ort', 'Bassäng', 'Datum', header=True)]
+    for meet in get_archive_meets():
+        rows.append(make_row(
+            f'<a href="index.php?cid={meet["id"]}">'
+            f'{html.escape(meet["name"])}</a>',
+            html.escape(meet['location']), POOL, meet['date']))
+    return make_page('Arkiv', rows)
+
+def get_meet_events(meet_id: str) -> list[dict]:
+    '''
+    Returns the events of an archive meet in program order, with the best
+    swims swum in them. The first half of the events is in session 1 and the
+    rest in session 2.
+    '''
+    event_swims = sorted(get_meet_swims(meet_id).items(),
+                         key=lambda item: (EVENTS.index(item[0][:2]),
+                                           item[0][2]))
+    events = []
+    for i, ((distance, stroke, gender), swims) in enumerate(event_swims):
+        events.append({'number': i + 1,
+                       'session': 1 if i < (len(event_swims) + 1) // 2 else 2,
+                       'distance': distance,
+                       'stroke': stroke,
+                       'gender': gender,
+                       'swims': swims})
+    return events
+
+def get_archive_meet(meet_id: str) -> dict | None:
+    '''
+    Returns an archive meet by its id.
+    '''
+    return next((meet for meet in get_archive_meets()
+                 if meet['id'] == meet_id), None)
+
+def get_archive_program_page(meet: dict, session: int) -> bytes:
+    '''
+    Returns the program of a session of an archive meet, with a results link
+    for every event. A session after the last one has no events.
+    '''
+    rows = [make_row('Gren', 'Namn', '', header=True)]
+    for event in get_meet_events(meet['id']):
+        if event['session'] != session:
+            continue
+        link = (f'results.php?cid={meet["id"]}&amp;session={session}'
+                f'&amp;event={event["number"]}')
+        rows.append(make_row(str(event['number']),
+                             html.escape(get_event_name(event)),
+                             f'<a href="{link}">Resultat</a>'))
+    return make_page(f'Pass {session} {meet["name"]}', rows)
+
+def make_event_results_rows(meet: dict, event: dict) -> list[str]:
+    '''
+    Returns the result rows of an event of an archive meet, with the splits
+    of every swim. Swimmers that are not in the swimmer pool fill up the
+    event to MIN_SWIMS_PER_RESULT, the last of them after the best swims,
+    since the splits of a swim end at the next ranked row.
+    '''
+    distance, stroke, gender = (event['distance'], event['stroke'],
+                                event['gender'])
+    rng = get_random('results', meet['id'], distance, stroke, gender)
+    swims = [(f'{swimmer["first_name"]} {swimmer["last_name"]}',
+              swimmer['born'], swimmer['club'], swim['fifties'])
+             for swimmer, swim in event['swims']]
+    slowest = max(sum(fifties) for _, _, _, fifties in swims)
+    for i in range(max(1, MIN_SWIMS_PER_RESULT - len(swims))):
+        fifties = make_splits(rng, distance, stroke, rng.gauss(0.0, 2.5))
+        if i == 0:
+            # slower than every best swim
+            extra = max(0, slowest - sum(fifties)) // len(fifties) + 100
+            fifties = [fifty + extra for fifty in fifties]
+        swims.append((f'{rng.choice(FIRST_NAMES[gender])} '
+                      f'{rng.choice(LAST_NAMES)}',
+                      str(rng.randint(2006, 2014)),
+                      rng.choice(CLUBS), fifties))
+    swims.sort(key=lambda swim: sum(swim[3]))
+    rows = [make_row(html.escape(f'Gren {event["number"]} '
+                                 f'{get_event_name(event)}')),
+            make_row('Plac', 'Namn', 'Född', 'Klubb', 'Tid', header=True)]
+    for rank, (name, born, club, fifties) in enumerate(swims, start=1):
+        rows.append(make_row(str(rank), html.escape(name), born,
+                             html.escape(club), format_time(sum(fifties))))
+        if distance > 50:
+            rows.append(make_row('', format_splits(fifties)))
+    rows.append(make_row(f'Grenen officiell {meet["date"]}'))
+    return rows
+
+def get_results_page(query: dict) -> bytes | None:
+    '''
+    Returns the results of an archive meet: of a single event with an event
+    parameter, of a session with a session parameter, and of every event with
+    session 0.
+    '''
+    meet = get_archive_meet(query.get('cid', ''))
+    if meet is None:
+        return None
+    session = int(query.get('session', '0'))
+    event_number = int(query.get('event', '0'))
+    rows = [make_row(html.escape(meet['name']), header=True)]
+    for event in get_meet_events(meet['id']):
+        if session != 0 and event['session'] != session:
+            continue
+        if event_number != 0 and event['number'] != event_number:
+            continue
+        rows.extend(make_event_results_rows(meet, event))
+    return make_page(meet['name'], rows)
+
+def get_tempus_event(event_id: str) -> tuple[int, str] | None:
+    '''
+    Returns the distance and stroke of a Tempus event id of the pool.
+    '''
+    for key, value in TEMPUS_EVENT_IDs.items():
+        if value == event_id and key.endswith(f'({POOL})'):
+            distance, stroke = key.split(' ')[:2]
+            if (int(distance[:-1]), stroke) in EVENTS:
+                return int(distance[:-1]), stroke
+    return None
+
+def get_swimmer_grid_page(query: dict) -> bytes | None:
+    '''
+    Returns a page of the Tempus swimmer grid, searched by club and
+    optionally by first and last name.
+    '''
+    club = query.get('Swimmer[swimmer_club]', '').lower()
+    first_name = query.get('Swimmer[first_name]', '').lower()
+    last_name = query.get('Swimmer[last_name]', '').lower()
+    page = int(query.get('Swimmer_page', '1'))
+    matches = [swimmer for swimmer in get_swimmers()
+               if club in swimmer['club'].lower()
+               and swimmer['first_name'].lower().startswith(first_name)
+               and swimmer['last_name'].lower().startswith(last_name)]
+    matches.sort(key=lambda swimmer: (swimmer['last_name'],
+                                      swimmer['first_name']))
+    matches = matches[(page - 1) * GRID_PAGE_SIZE:page * GRID_PAGE_SIZE]
+    rows = [make_row('Förnamn', 'Efternamn', 'Född', 'Klubb', header=True)]
+    for swimmer in matches:
+        rows.append(make_row(
+            f'<a href="/index.php?r=swimmer/view&amp;id={swimmer["id"]}">'
+            f'{html.escape(swimmer["first_name"])}</a>',
+            html.escape(swimmer['last_name']), swimmer['born'],
+            html.escape(swimmer['club'])))
+    if not matches:
+        rows.append(make_row('Inget hittades'))
+    return make_page('Simmare', rows)
+
+def get_distance_page(query: dict) -> bytes | None:
+    '''
+    Returns all times of a swimmer in an event, fastest first. A swimmer who
+    has never swum the event gets a page without a table.
+    '''
+    swimmer = get_swimmer(query.get('id', ''))
+    event = get_tempus_event(query.get('event', ''))
+    if swimmer is None or event is None:
+        return None
+    swim = get_swim(swimmer['id'], *event)
+    if swim is None:
+        return b'<!DOCTYPE html><html><body><p>Inga tider</p></body></html>'
+    rng = get_random('distance', swimmer['id'], *event)
+    best = sum(swim['fifties'])
+    times = [(best, swim['meet'])]
+    for _ in range(rng.randint(0, 3)):
+        times.append((best + rng.randint(50, 800),
+                      rng.choice(get_archive_meets())))
+    rows = [make_row('Tid', 'Bassäng', 'Datum', 'Tävling', header=True)]
+    for hundredths, meet in sorted(times, key=lambda time: time[0]):
+        rows.append(make_row(format_tempus_time(hundredths), POOL,
+                             meet['date'], html.escape(meet['name'])))
+    return make_page(f'{swimmer["first_name"]} {swimmer["last_name"]}', rows)
+
+def get_swimmer_view_page(query: dict) -> bytes | None:
+    '''
+    Returns the best times of a swimmer in all events.
+    '''
+    swimmer = get_swimmer(query.get('id', ''))
+    if swimmer is None:
+        return None
+    rows = [make_row('Gren', 'Tid', 'Datum', 'Tävling', header=True)]
+    for distance, stroke in EVENTS:
+        swim = get_swim(swimmer['id'], distance, stroke)
+        if swim is not None:
+            rows.append(make_row(
+                html.escape(f'{distance}m {stroke} ({POOL})'),
+                format_tempus_time(sum(swim['fifties'])),
+                swim['meet']['date'], html.escape(swim['meet']['name'])))
+    return make_page(f'{swimmer["first_name"]} {swimmer["last_name"]}', rows)
+
+# { 'path' : page function }
+LIVETIMING_PAGES = {
+    '/program.php': get_program_page,
+    '/heatlist.php': get_heat_list_page,
+    '/archive.php': get_archive_page,
+    '/results.php': get_results_page
+}
+# { 'r parameter of index.php' : page function }
+TEMPUS_PAGES = {
+    'swimmer/index': get_swimmer_grid_page,
+    'swimmer/distance': get_distance_page,
+    'swimmer/view': get_swimmer_view_page
+}
+
+def get_synthetic_page(path: str, query_string: str) -> bytes | None:
+    '''
+    Returns the synthetic page for the path and query of a request, or None
+    if there is no such page.
+    '''
+    query = {name: values[0]
+             for name, values in parse_qs(query_string).items()}
+    if path == '/index.php':
+        page_function = TEMPUS_PAGES.get(query.get('r', ''))
+    else:
+        page_function = LIVETIMING_PAGES.get(path)
+    if page_function is None:
+        return None
+    try:
+        return page_function(query)
+    except ValueError:
+        # a malformed number in the query
+        return None
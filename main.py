@@ -1,5 +1,28 @@
 '''
+The command line entry point. Run from the repository root:
 
+    python main.py retrieve     retrieve the session, save it and render it,
+                                rendering every event as soon as it is done
+    python main.py render       render the saved session
+    python main.py watch        render the saved session, then keep polling
+                                the session and push changes to open pages
+    python main.py cache stats  print the entries, sizes and hit rates of
+                                every cache (also: validate, compact, prune)
+    python main.py cache export bundle.zip
+                                export the caches to a bundle, which
+                                'cache import bundle.zip' merges into the
+                                caches of another machine
+    python main.py bench        run the benchmark suite
+    python main.py emulate      serve local stand-ins for LiveTiming and
+                                Tempus to load test the retrieval against
+
+Run 'python main.py <command> --help' for the options of a command. The
+constants below are the defaults of the options. Without a command,
+RETRIEVE_NEW_DATA selects between retrieve and render, and WATCH_SESSION
+watches the session afterwards.
+
+The modules of each command are imported when the command runs, so that
+render and cache stats start without importing the retrieval code.
 '''
 
 ###############################################################################
@@ -13,32 +36,559 @@ LIVETIMING_SESSION_URL = (
 # Number of heats per event to get the best swim splits for. Set to 1 or above.
 NUM_HEATS = 100
 
-# Whether to retrieve new data or just populate the html with the existing data.
+# Whether to retrieve new data or just populate the html with the existing data
+# when main.py is run without a command.
 RETRIEVE_NEW_DATA = False
 
+# Minutes the retrieval has to finish in. As the time runs out, the splits and
+# then the earliest heats of each event are skipped and marked as such. None
+# retrieves everything.
+DEADLINE_MINUTES = None
+
+# Number of swimmers in a heat whose best swims are looked up at the same time.
+CONCURRENCY = 1
+
+# Set to True to send a second copy of a request that has not answered within
+# the 95th percentile latency of its host, using whichever answers first. At
+# most 5% of the requests are hedged.
+HEDGE_REQUESTS = False
+
+# Set to True to always fetch the results of whole meets. By default, only the
+# results pages of the needed event are fetched, with the whole meet as the
+# fallback.
+FULL_MEET_RESULTS = False
+
+# Number of worker processes that parse the meet results and archive pages
+# while the requests continue. 0 parses them in the retrieval threads.
+PARSE_WORKERS = 0
+
+# Megabytes of memory the retrieval should stay within. Near the budget, the
+# least recently used meet results are evicted from memory to a spill file and
+# the large pages are parsed in a low-memory mode. None sets no budget.
+MEMORY_BUDGET_MB = None
+
+# Base URLs of LiveTiming and Tempus, e.g. 'http://localhost:8800' to retrieve
+# from the emulator (python main.py emulate). None uses the real sites.
+LIVETIMING_BASE_URL = None
+TEMPUS_BASE_URL = None
+
+# The directory the caches are stored in.
+CACHE_DIRECTORY = 'cache'
+
+# Set to 'record' to save every HTTP response of the retrieval to
+# HTTP_ARCHIVE_PATH, or to 'replay' to serve the whole retrieval from that
+# archive without network access. None makes normal requests.
+HTTP_ARCHIVE_MODE = None
+HTTP_ARCHIVE_PATH = 'http_archive.zip'
+
+# Where to write the JSON run report of a retrieval (spans, cache hit rates,
+# HTTP metrics per host and error counts). None writes no report.
+RUN_REPORT_PATH = 'run_report.json'
+
+# Set to a file path to profile the retrieval with cProfile. The statistics
+# are written to PROFILE_PATH and the span stacks for flamegraphs to
+# PROFILE_PATH + '.collapsed'.
+PROFILE_PATH = None
+
+# Set to True to trace the memory of the retrieval and rendering with
+# tracemalloc. The peak memory and top allocation sites of each stage are
+# written to the run report.
+TRACE_MEMORY = False
+
+# Set to True to serve the UI at http://localhost:UI_SERVER_PORT/ after the
+# html is populated.
+SERVE_UI = False
+UI_SERVER_PORT = 8000
+
+# Set to True to keep polling the session after the html is populated. Changed
+# start lists update the session files and are pushed to every page open at
+# http://localhost:UI_SERVER_PORT/.
+WATCH_SESSION = False
+WATCH_POLL_SECONDS = 60
+
+# The emulator's port, and the size of its meet relative to a normal session.
+EMULATOR_PORT = 8800
+EMULATOR_SCALE = 1
+
+###############################################################################
+
+import argparse
+import sys
+
+###############################################################################
+# Commands
+###############################################################################
+
+def render(session, serve: bool, port: int,
+           event_fragments: dict | None = None) -> None:
+    '''
+    Populates index.html with the session, builds the UI into ui/build and
+    serves it if serve is True. The events already rendered during a
+    retrieval can be given in event_fragments.
+    '''
+    from populate_html.populate_html import populate_html
+    from ui_server.build_ui import build_ui
+    populate_html(session, event_fragments)
+    build_ui()
+    if serve:
+        from ui_server.ui_server import serve_ui
+        serve_ui(port)
+
+def load_saved_session():
+    '''
+    Returns the saved session, or None after printing why there is none.
+    '''
+    from session_model.serialization import load_session_data
+    session = load_session_data()
+    if session is None:
+        print('No saved session. Run "python main.py retrieve" first.')
+    return session
+
+def get_progress_renderer(serve: bool, port: int, event_fragments: dict,
+                          servers: list):
+    '''
+    Returns the on_event_done callback of retrieve_data, which renders
+    index.html after every finished event with the pending events as loading.
+    If serve is True, the UI server is started with the first finished event
+    (and added to servers), and the finished events are pushed to the open
+    pages. The rendered event fragments are kept in event_fragments.
+    '''
+    from populate_html.populate_html import populate_html_progress
+    from ui_server.build_ui import build_ui
+    published_event_numbers = set()
+
+    def on_event_done(session, pending_event_numbers: list[int]) -> None:
+        populate_html_progress(session, pending_event_numbers,
+                               event_fragments)
+        if not serve:
+            return
+        from ui_server.ui_server import (start_ui_server,
+                                         load_ui_assets,
+                                         publish_event)
+        build_ui()
+        if not servers:
+            servers.append(start_ui_server(port))
+            print(f'\nServing the UI at http://localhost:{port}/ while '
+                  'retrieving.')
+        else:
+            load_ui_assets()
+        finished_event_numbers = set()
+        for event in session.events:
+            finished_event_numbers.add(event.number)
+            if event.number not in published_event_numbers:
+                publish_event('event-update', event_fragments[event.number])
+        # events without a start list are no longer loading
+        for event_number in (published_event_numbers 
+                             - finished_event_numbers
+                             - set(pending_event_numbers)):
+            publish_event('event-remove', {'event_number': str(event_number)})
+        published_event_numbers.clear()
+        published_event_numbers.update(finished_event_numbers)
+        published_event_numbers.update(pending_event_numbers)
+
+    return on_event_done
+
+def retrieve_command(args: argparse.Namespace) -> None:
+    '''
+    Retrieves the session data from the session URL with the given number of
+    heats of each event, saves it to session_data.bin and session_data.json,
+    and renders it. index.html is rendered after every finished event, with
+    the events still being retrieved shown as loading, and with --serve the
+    UI is served from the first finished event on.
+
+    With --deadline, the retrieval degrades to finish in the given number of
+    minutes, and with --memory-budget, it evicts cache entries and parses in
+    low-memory mode near the given number of megabytes. --hedge hedges slow
+    requests, and --full-meet-results fetches the results of whole meets
+    instead of single events. The retrieval is
+    recorded to, or replayed from, an HTTP archive with --record or --replay.
+    The run report and profile of the retrieval are written to --report and
+    --profile, and --trace-memory adds the memory of each stage of the
+    retrieval and rendering to the run report.
+    '''
+    from cache.cache_paths import set_cache_directory
+    from retrieve_data.retrieve_data import (retrieve_data,
+                                             set_concurrency,
+                                             set_targeted_results)
+    from retrieve_data.page_parsers import start_parse_pool, stop_parse_pool
+    from retrieve_data.deadline import set_deadline
+    from retrieve_data.memory_budget import set_memory_budget
+    from retrieve_data.hedging import set_hedging
+    from retrieve_data.site_urls import set_base_urls
+    from retrieve_data.http_archive import (start_recording,
+                                            start_replaying,
+                                            stop_http_archive)
+    from retrieve_data.metrics import (start_profiling,
+                                       stop_profiling,
+                                       start_memory_tracing,
+                                       stop_memory_tracing,
+                                       memory_stage,
+                                       write_run_report,
+                                       write_collapsed_stacks)
+    from session_model.serialization import save_session_data
+
+    set_cache_directory(args.cache_dir)
+    set_base_urls(args.livetiming_base_url, args.tempus_base_url)
+    set_concurrency(args.concurrency)
+    set_targeted_results(not args.full_meet_results)
+    if args.deadline is not None:
+        set_deadline(args.deadline * 60)
+    if args.memory_budget is not None:
+        set_memory_budget(int(args.memory_budget * 1024 * 1024))
+    set_hedging(args.hedge)
+    if args.record is not None:
+        start_recording(args.record)
+    elif args.replay is not None:
+        start_replaying(args.replay)
+    if args.profile is not None:
+        start_profiling()
+    if args.trace_memory:
+        start_memory_tracing()
+    if args.parse_workers > 0:
+        start_parse_pool(args.parse_workers)
+    event_fragments = dict()
+    servers = []
+    try:
+        session = retrieve_data(args.url, args.heats, get_progress_renderer(
+            args.serve, args.port, event_fragments, servers))
+    finally:
+        stop_parse_pool()
+        set_deadline(None)
+        set_memory_budget(None)
+        set_hedging(False)
+        # an interrupted or failed run is the one worth replaying
+        if args.profile is not None:
+            stop_profiling(args.profile)
+            write_collapsed_stacks(args.profile + '.collapsed')
+        stop_http_archive()
+    if session is not None:
+        with memory_stage('save_session'):
+            save_session_data(session)
+        with memory_stage('render'):
+            render(session, False, args.port, event_fragments)
+    stop_memory_tracing()
+    if args.report is not None:
+        write_run_report(args.report)
+    if session is None:
+        print('Error getting session page.')
+        return
+    if not args.serve:
+        return
+    if not servers:
+        from ui_server.ui_server import serve_ui
+        serve_ui(args.port)
+        return
+    # the UI server was started during the retrieval
+    from ui_server.ui_server import load_ui_assets, wait_for_interrupt
+    load_ui_assets()
+    print(f'Serving the UI at http://localhost:{args.port}/. Stop with '
+          'Ctrl+C.')
+    wait_for_interrupt(servers[0])
+
+def render_command(args: argparse.Namespace) -> None:
+    '''
+    Renders the saved session, which is loaded from session_data.bin (or
+    imported from session_data.json).
+    '''
+    session = load_saved_session()
+    if session is None:
+        return
+    render(session, args.serve, args.port)
+
+def watch_command(args: argparse.Namespace) -> None:
+    '''
+    Renders the saved session, then keeps watching the session for changes
+    while serving the UI.
+    '''
+    from cache.cache_paths import set_cache_directory
+    from retrieve_data.site_urls import set_base_urls
+    set_cache_directory(args.cache_dir)
+    set_base_urls(args.livetiming_base_url, args.tempus_base_url)
+    session = load_saved_session()
+    if session is None:
+        return
+    render(session, False, args.port)
+    from watch.watch import watch_session
+    watch_session(args.url, args.heats, args.poll_seconds, args.port)
+
+def cache_command(args: argparse.Namespace) -> None:
+    '''
+    Runs a cache maintenance action.
+    '''
+    from cache.cache_paths import set_cache_directory
+    set_cache_directory(args.cache_dir)
+    if args.action in ('stats', 'validate', 'compact', 'prune'):
+        from cache.cache_maintenance import (print_cache_stats,
+                                             print_validation,
+                                             compact_caches,
+                                             prune_caches)
+        if args.action == 'stats':
+            print_cache_stats(args.report)
+        elif args.action == 'validate':
+            print_validation()
+        elif args.action == 'compact':
+            for kind, count in compact_caches().items():
+                print(f'{kind:<24}{count:>9} removed')
+        else:
+            max_bytes = (None if args.max_mb is None
+                         else int(args.max_mb * 1024 * 1024))
+            removed = prune_caches(args.max_age_days, args.max_idle_days,
+                                   max_bytes)
+            for cache_name, count in removed.items():
+                print(f'{cache_name:<24}{count:>9} removed')
+        return
+    if args.path is None:
+        print(f'"cache {args.action}" needs a path.')
+        return
+    from cache.cache_bundle import (export_cache_bundle,
+                                    import_cache_bundle,
+                                    write_cache_manifest)
+    if args.action == 'manifest':
+        write_cache_manifest(args.path)
+        print(f'Wrote the cache manifest to {args.path}.')
+    elif args.action == 'export':
+        counts = export_cache_bundle(args.path, args.exclude)
+        if counts is None:
+            print(f'Could not read the manifest {args.exclude}.')
+            return
+        for cache_name, count in counts.items():
+            print(f'{cache_name:<24}{count:>9} entries exported')
+    elif args.action == 'import':
+        counts = import_cache_bundle(args.path)
+        if counts is None:
+            print(f'{args.path} is not a cache bundle.')
+            return
+        for cache_name, cache_counts in counts.items():
+            print(f'{cache_name:<24}{cache_counts["added"]:>9} added'
+                  f'{cache_counts["unchanged"]:>9} unchanged'
+                  f'{cache_counts["conflicting"]:>9} kept local')
+
+def bench_command(args: argparse.Namespace) -> None:
+    '''
+    Runs the benchmark suite. Exits with status 1 if there are regressions.
+    '''
+    from benchmark.benchmark import run_benchmark_suite
+    if not run_benchmark_suite(args.save):
+        sys.exit(1)
+
+def emulate_command(args: argparse.Namespace) -> None:
+    '''
+    Serves local stand-ins for LiveTiming and Tempus until interrupted, with
+    the given latency distribution, error rate and request rate limit. The
+    pages are synthetic, with a meet of --scale times a normal session, or
+    recorded in the HTTP archive given with --archive. With --check, a
+    retrieval of the synthetic session is run against the emulator instead,
+    which exits with status 1 if too few of its best swims have splits.
+    '''
+    from emulator.emulator_server import configure_emulator, serve_emulator
+    configure_emulator(args.latency_ms, args.latency_sigma, args.slow_rate,
+                       args.slow_ms, args.error_rate,
+                       args.max_requests_per_second)
+    if args.check:
+        from emulator.smoke_check import run_smoke_check
+        if not run_smoke_check(args.port, args.scale, args.seed):
+            sys.exit(1)
+        return
+    serve_emulator(args.port, args.scale, args.seed, args.archive)
+
 ###############################################################################
 
-import json
+def get_parser() -> argparse.ArgumentParser:
+    '''
+    Returns the parser of the command line arguments.
+    '''
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command')
+
+    # options shared by the commands
+    session_options = argparse.ArgumentParser(add_help=False)
+    session_options.add_argument('--url', default=LIVETIMING_SESSION_URL,
+                                 help='LiveTiming session program URL')
+    session_options.add_argument('--heats', type=int, default=NUM_HEATS,
+                                 help='number of heats per event, counted '
+                                      'from the last heat')
+    session_options.add_argument('--livetiming-base-url',
+                                 default=LIVETIMING_BASE_URL,
+                                 help='base URL of LiveTiming, e.g. the '
+                                      'emulator\'s http://localhost:'
+                                      f'{EMULATOR_PORT}')
+    session_options.add_argument('--tempus-base-url',
+                                 default=TEMPUS_BASE_URL,
+                                 help='base URL of Tempus')
+    cache_options = argparse.ArgumentParser(add_help=False)
+    cache_options.add_argument('--cache-dir', default=CACHE_DIRECTORY,
+                               help='directory the caches are stored in')
+    serve_options = argparse.ArgumentParser(add_help=False)
+    serve_options.add_argument('--serve', action='store_true',
+                               default=SERVE_UI,
+                               help='serve the UI after rendering')
+    serve_options.add_argument('--port', type=int, default=UI_SERVER_PORT,
+                               help='port of the UI server')
+
+    retrieve_parser = commands.add_parser(
+        'retrieve', parents=[session_options, cache_options, serve_options],
+        help='retrieve the session, save it and render it')
+    retrieve_parser.add_argument('--concurrency', type=int,
+                                 default=CONCURRENCY,
+                                 help='number of swimmers in a heat looked '
+                                      'up at the same time')
+    retrieve_parser.add_argument('--deadline', type=float, metavar='MINUTES',
+                                 default=DEADLINE_MINUTES,
+                                 help='finish the retrieval in this many '
+                                      'minutes, skipping splits and early '
+                                      'heats as needed')
+    retrieve_parser.add_argument('--full-meet-results', action='store_true',
+                                 default=FULL_MEET_RESULTS,
+                                 help='fetch the results of whole meets '
+                                      'instead of only the needed events')
+    retrieve_parser.add_argument('--hedge', action='store_true',
+                                 default=HEDGE_REQUESTS,
+                                 help='resend requests slower than the p95 '
+                                      'latency of their host and use the '
+                                      'first answer')
+    retrieve_parser.add_argument('--memory-budget', type=float, metavar='MB',
+                                 default=MEMORY_BUDGET_MB,
+                                 help='evict cache entries and parse in '
+                                      'low-memory mode near this many '
+                                      'megabytes')
+    retrieve_parser.add_argument('--parse-workers', type=int,
+                                 default=PARSE_WORKERS,
+                                 help='number of processes parsing the large '
+                                      'pages (0 parses them in process)')
+    archive = retrieve_parser.add_mutually_exclusive_group()
+    archive.add_argument('--record', metavar='PATH',
+                         default=(HTTP_ARCHIVE_PATH
+                                  if HTTP_ARCHIVE_MODE == 'record' else None),
+                         help='record every HTTP response to an archive')
+    archive.add_argument('--replay', metavar='PATH',
+                         default=(HTTP_ARCHIVE_PATH
+                                  if HTTP_ARCHIVE_MODE == 'replay' else None),
+                         help='serve every HTTP response from an archive')
+    retrieve_parser.add_argument('--report', metavar='PATH',
+                                 default=RUN_REPORT_PATH,
+                                 help='where to write the run report')
+    retrieve_parser.add_argument('--profile', metavar='PATH',
+                                 default=PROFILE_PATH,
+                                 help='profile the retrieval with cProfile')
+    retrieve_parser.add_argument('--trace-memory', action='store_true',
+                                 default=TRACE_MEMORY,
+                                 help='add the peak memory and top allocation '
+                                      'sites of each stage to the run report')
+    retrieve_parser.set_defaults(function=retrieve_command)
+
+    render_parser = commands.add_parser('render', parents=[serve_options],
+                                        help='render the saved session')
+    render_parser.set_defaults(function=render_command)
+
+    watch_parser = commands.add_parser(
+        'watch', parents=[session_options, cache_options],
+        help='render the saved session and keep polling the session for '
+             'changes')
+    watch_parser.add_argument('--poll-seconds', type=float,
+                              default=WATCH_POLL_SECONDS,
+                              help='seconds between polls of the session')
+    watch_parser.add_argument('--port', type=int, default=UI_SERVER_PORT,
+                              help='port of the UI server')
+    watch_parser.set_defaults(function=watch_command)
+
+    cache_parser = commands.add_parser('cache', parents=[cache_options],
+                                       help='cache maintenance')
+    cache_parser.add_argument('action', 
+                              choices=['stats', 'validate', 'compact',
+                                       'prune', 'export', 'import', 
+                                       'manifest'],
+                              help='stats: print the entries, sizes and '
+                                   'last run hit rates of the caches, '
+                                   'validate: print the invalid and '
+                                   'duplicate entries, compact: remove them '
+                                   'and the unreferenced data, prune: remove '
+                                   'old, unused or excess entries, '
+                                   'export/import: write or merge a cache '
+                                   'bundle at PATH, manifest: write the '
+                                   'hashes of the cache entries to PATH')
+    cache_parser.add_argument('path', nargs='?', metavar='PATH',
+                              help='bundle or manifest file')
+    cache_parser.add_argument('--exclude', metavar='PATH',
+                              help='export only the entries missing from '
+                                   'this manifest or bundle')
+    cache_parser.add_argument('--report', metavar='PATH',
+                              default=RUN_REPORT_PATH,
+                              help='run report the hit rates are read from')
+    cache_parser.add_argument('--max-age-days', type=float,
+                              help='prune entries stored longer ago')
+    cache_parser.add_argument('--max-idle-days', type=float,
+                              help='prune entries not used for longer')
+    cache_parser.add_argument('--max-mb', type=float,
+                              help='prune the least recently used entries '
+                                   'until the caches take at most this much')
+    cache_parser.set_defaults(function=cache_command)
+
+    bench_parser = commands.add_parser('bench',
+                                       help='run the benchmark suite')
+    bench_parser.add_argument('--save', action='store_true',
+                              help='save the results as the baseline of '
+                                   'this machine')
+    bench_parser.set_defaults(function=bench_command)
 
-from retrieve_data.retrieve_data import retrieve_data
-from populate_html.populate_html import populate_html
+    emulate_parser = commands.add_parser(
+        'emulate', help='serve local stand-ins for LiveTiming and Tempus')
+    emulate_parser.add_argument('--port', type=int, default=EMULATOR_PORT,
+                                help='port of the emulator')
+    emulate_parser.add_argument('--scale', type=float, default=EMULATOR_SCALE,
+                                help='size of the synthetic meet relative to '
+                                     'a normal session')
+    emulate_parser.add_argument('--seed', type=int, default=1,
+                                help='seed the synthetic pages are generated '
+                                     'from')
+    emulate_parser.add_argument('--archive', metavar='PATH',
+                                help='serve the responses of an HTTP archive '
+                                     'instead of synthetic pages')
+    emulate_parser.add_argument('--latency-ms', type=float, default=150,
+                                help='median latency of a response')
+    emulate_parser.add_argument('--latency-sigma', type=float, default=0.5,
+                                help='sigma of the lognormal latency '
+                                     'distribution')
+    emulate_parser.add_argument('--slow-rate', type=float, default=0.0,
+                                help='fraction of responses delayed by '
+                                     '--slow-ms more')
+    emulate_parser.add_argument('--slow-ms', type=float, default=5000,
+                                help='extra latency of the slow responses')
+    emulate_parser.add_argument('--error-rate', type=float, default=0.0,
+                                help='fraction of requests answered with 503')
+    emulate_parser.add_argument('--max-requests-per-second', type=float,
+                                help='answer requests above this rate with '
+                                     '429 and Retry-After')
+    emulate_parser.add_argument('--check', action='store_true',
+                                help='retrieve the synthetic session from '
+                                     'the emulator and check that the best '
+                                     'swims have splits')
+    emulate_parser.set_defaults(function=emulate_command)
+    return parser
 
 def main():
     '''
-    Main function. If RETRIEVE_NEW_DATA is set to True, retrieves the session
-    data from LIVETIMING_SESSION_URL with NUM_HEATS heats of each event, saves 
-    it to session_data.json, and populates the html. If set to False just
-    populates the html with the existing data in session_data.json.
+    Main function. Runs the command given on the command line. Without a
+    command, retrieves if RETRIEVE_NEW_DATA is set to True and otherwise
+    renders, and then watches the session if WATCH_SESSION is set to True.
     '''
+    parser = get_parser()
+    args = parser.parse_args()
+    if args.command is not None:
+        args.function(args)
+        return
     if RETRIEVE_NEW_DATA:
-        session_data = retrieve_data(LIVETIMING_SESSION_URL, NUM_HEATS)
-        with open('session_data.json', 'w', encoding='utf-8') as file:
-            json.dump(session_data, file, indent=4, sort_keys=True)
-    else:
-        with open('session_data.json', 'r', encoding='utf-8') as file:
-            session_data = json.load(file)
-
-    populate_html(session_data)
+        args = parser.parse_args(['retrieve'])
+        # watch serves the UI itself
+        args.serve = args.serve and not WATCH_SESSION
+        args.function(args)
+    if WATCH_SESSION:
+        args = parser.parse_args(['watch'])
+        args.function(args)
+    elif not RETRIEVE_NEW_DATA:
+        args = parser.parse_args(['render'])
+        args.function(args)
 
 if __name__ == '__main__':
     main()
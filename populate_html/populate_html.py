@@ -1,10 +1,17 @@
 '''
 This file contains the functions that populate index.html with the session
 data.
+
+The HTML of every event is rendered once into fragments (the 'event-item' and
+the 'right-column'), which are joined into the page. During a retrieval,
+populate_html_progress writes the page after every finished event, with the
+events that are still being retrieved shown as loading. The fragments also
+carry the search index of their event (see search_index.py), which is embedded
+in the page.
 '''
 
 # external libraries
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Comment
 import json
 
 # templates
@@ -20,11 +27,25 @@ from populate_html.html_snippet_templates import (EVENT_ITEM_TEMPLATE,
 
 # helper functions
 from populate_html.utilities import format_date        
-from retrieve_data.utilities import get_element_text                          
+from populate_html.search_index import (make_event_search_index,
+                                        get_search_index_json)
+from session_model.session_model import (Session,
+                                         Event,
+                                         Heat,
+                                         LaneEntry,
+                                         BestSwim)
+
+
+# Text of the events that are still being retrieved
+LOADING_TEXT = 'Laddar...'
 
+# Comments in the template where the event fragments are inserted
+EVENT_ITEMS_MARKER = 'event-items'
+RIGHT_COLUMNS_MARKER = 'right-columns'
+SEARCH_INDEX_MARKER = 'search-index'
 
 ###############################################################################
-# Helper functions for add_right_columns (reverse order)
+# Helper functions for make_right_column (reverse order)
 ###############################################################################
 
 def add_splits(swimmer_content_soup, splits: dict) -> None:
@@ -65,49 +86,47 @@ def add_splits(swimmer_content_soup, splits: dict) -> None:
                                   class_='swimmer-content-splits').append(
                                         split_row_soup)
 
-def add_error_message(swimmer_content_soup, best_swim_info: dict) -> None:
+def add_error_message(swimmer_content_soup, best_swim: BestSwim) -> None:
     '''
     Adds error message to 'swimmer-content-splits'.
     '''
-    error_message = best_swim_info['Error']
+    error_message = best_swim.error
     error_message_soup = BeautifulSoup(
         f'<p class="pt12-gray3">{error_message}</p>', 'html.parser')
     swimmer_content_soup.find('div', class_='swimmer-content-splits').append(
         error_message_soup)
 
-def add_swimmers(heat_content_soup, swimmers: dict) -> None:
+def add_swimmers(heat_content_soup, lanes: list[LaneEntry]) -> None:
     '''
     Adds 'swimmer-list' to 'heat-content'.
     '''
-    swimmers = list(swimmers.items())
-    # key has format '(lane, name)'
-    swimmers.sort(key=lambda swimmer: int(swimmer[0][1:-1].split(', ')[0]))
-    for swimmer_string, best_swim_info in swimmers:
-        swimmer_string = swimmer_string[1:-1]
-        swimmer_tokens = swimmer_string.split(', ')
-        lane_number = swimmer_tokens[0]
-        swimmer_name = swimmer_tokens[1]
+    for entry in sorted(lanes, key=lambda entry: entry.lane):
+        best_swim = entry.best_swim
 
         swimmer_container_soup = BeautifulSoup(SWIMMER_CONTAINER_TEMPLATE, 
                                                'html.parser')
+        swimmer_container_soup.find('div', class_='swimmer-container')[
+            'data-lane'] = str(entry.lane)
         
         # add swimmer item
         swimmer_item_soup = BeautifulSoup(SWIMMER_ITEM_TEMPLATE, 'html.parser')
         p_swimmer_item_lane = swimmer_item_soup.find('p',
                                                      class_='swimmer-item-lane')
-        p_swimmer_item_lane.string = lane_number
+        p_swimmer_item_lane.string = str(entry.lane)
         p_swimmer_item_name = swimmer_item_soup.find('p',
                                                      class_='swimmer-item-name')
-        p_swimmer_item_name.string = swimmer_name
+        p_swimmer_item_name.string = entry.name
         p_swimmer_item_best = swimmer_item_soup.find('p', 
                                                      class_='swimmer-item-best')
-        if 'final_time' in best_swim_info:
-            p_swimmer_item_best.string = best_swim_info['final_time']
-        elif 'first time' in best_swim_info['Error'].lower():
+        if best_swim.final_time is not None:
+            p_swimmer_item_best.string = best_swim.final_time
+        elif 'first time' in best_swim.error.lower():
             p_swimmer_item_best.string = 'Första gången'
+        elif best_swim.degraded == 'skipped':
+            p_swimmer_item_best.string = 'Ej hämtad'
         else:
             p_swimmer_item_best.string = 'Error'
-        if 'Error' in best_swim_info:
+        if best_swim.error is not None:
             p_swimmer_item_lane['class'] = 'swimmer-item-lane pt14-gray4'
             p_swimmer_item_name['class'] = 'swimmer-item-name pt14-gray4'
             p_swimmer_item_best['class'] = 'swimmer-item-best pt14-gray4'
@@ -123,62 +142,58 @@ def add_swimmers(heat_content_soup, swimmers: dict) -> None:
                                               class_='swimmer-content-links')
         a_result = links_div.a
 
-        if 'meet_name' in best_swim_info and 'result_url' in best_swim_info:
-            a_result['href'] = best_swim_info['result_url']
-            a_result.string = best_swim_info['meet_name']
-        elif 'meet_name' in best_swim_info:
-            a_result.string = best_swim_info['meet_name']
+        if best_swim.meet_name is not None and best_swim.result_url is not None:
+            a_result['href'] = best_swim.result_url
+            a_result.string = best_swim.meet_name
+        elif best_swim.meet_name is not None:
+            a_result.string = best_swim.meet_name
             a_result['class'] = 'inactive-link'
-        elif 'result_url' in best_swim_info:
-            a_result['href'] = best_swim_info['result_url']
-            a_result.string = best_swim_info['result_url']
+        elif best_swim.result_url is not None:
+            a_result['href'] = best_swim.result_url
+            a_result.string = best_swim.result_url
         else:
             a_result.decompose()
         
         content_text_div = swimmer_content_soup.find(
             'div', class_='swimmer-content-text')
-        if 'meet_date' in best_swim_info and 'meet_location' in best_swim_info:
-            date = format_date(best_swim_info['meet_date'])
-            content_text_div.p.string = (
-                    f'{best_swim_info["meet_location"]}, {date}')
-        elif 'meet_date' in best_swim_info:
-            date = format_date(best_swim_info['meet_date'])
+        if (best_swim.meet_date is not None and 
+            best_swim.meet_location is not None):
+            date = format_date(best_swim.meet_date)
+            content_text_div.p.string = f'{best_swim.meet_location}, {date}'
+        elif best_swim.meet_date is not None:
+            date = format_date(best_swim.meet_date)
             content_text_div.p.string = date
-        elif 'meet_location' in best_swim_info:
-            content_text_div.p.string = (best_swim_info['meet_location'])
+        elif best_swim.meet_location is not None:
+            content_text_div.p.string = best_swim.meet_location
         
         right_links_div = swimmer_content_soup.find('div', class_='right-links')
         right_links_a = right_links_div.find_all('a')
-        if ('all_times_url' in best_swim_info and 
-            'all_events_url' in best_swim_info):
-            right_links_a[0]['href'] = best_swim_info['all_times_url']
-            right_links_a[1]['href'] = best_swim_info['all_events_url']
-        elif 'all_times_url' in best_swim_info:
-            right_links_a[0]['href'] = best_swim_info['all_times_url']
+        if (best_swim.all_times_url is not None and 
+            best_swim.all_events_url is not None):
+            right_links_a[0]['href'] = best_swim.all_times_url
+            right_links_a[1]['href'] = best_swim.all_events_url
+        elif best_swim.all_times_url is not None:
+            right_links_a[0]['href'] = best_swim.all_times_url
             right_links_a[1].decompose()
-        elif 'all_events_url' in best_swim_info:
-            right_links_a[1]['href'] = best_swim_info['all_events_url']
+        elif best_swim.all_events_url is not None:
+            right_links_a[1]['href'] = best_swim.all_events_url
             right_links_a[0].decompose()
         else:
             right_links_div.decompose()
 
         
         
-        if 'avg50' in best_swim_info:
-            if best_swim_info['avg50'] is not None:
-                swimmer_content_soup.find('p', class_='avg50-time').string = (
-                    best_swim_info['avg50'])
-            else:
-                swimmer_content_soup.find('div', class_='swimmer-content-avg50'
-                                          ).decompose()
+        if best_swim.avg50 is not None:
+            swimmer_content_soup.find('p', class_='avg50-time').string = (
+                best_swim.avg50)
         else:
             swimmer_content_soup.find('div', class_='swimmer-content-avg50'
                                       ).decompose()
                 
-        if 'splits' in best_swim_info:
-            add_splits(swimmer_content_soup, best_swim_info['splits'])
+        if best_swim.splits is not None:
+            add_splits(swimmer_content_soup, best_swim.splits)
         else:
-            add_error_message(swimmer_content_soup, best_swim_info)
+            add_error_message(swimmer_content_soup, best_swim)
 
         swimmer_container_soup.find('div', class_='swimmer-container').append(
                 swimmer_content_soup)
@@ -187,25 +202,25 @@ def add_swimmers(heat_content_soup, swimmers: dict) -> None:
         heat_content_soup.find('div', class_='swimmer-list').append(
             swimmer_container_soup)
 
-def add_heats(right_column_soup, heats: dict) -> None:
+def add_heats(right_column_soup, heats: list[Heat]) -> None:
     '''
     Adds 'heat-list' to 'right-column'.
     '''
-    heats = list(heats.items())
-    heats.sort(key=lambda heat: int(heat[0]))
-    number_of_heats = heats[-1][0]
-    for number, swimmers in heats:
+    heats = sorted(heats, key=lambda heat: heat.number)
+    number_of_heats = heats[-1].number
+    for heat in heats:
         heat_container_soup = BeautifulSoup(HEAT_CONTAINER_TEMPLATE, 
                                             'html.parser')
         heat_container_div = heat_container_soup.find(
             'div', class_='heat-container')
+        heat_container_div['data-heat'] = str(heat.number)
         # add heat item
         heat_item_soup = BeautifulSoup(HEAT_ITEM_TEMPLATE, 'html.parser')
-        heat_item_soup.p.string = f'Heat {number} ({number_of_heats})'
+        heat_item_soup.p.string = f'Heat {heat.number} ({number_of_heats})'
         heat_container_div.append(heat_item_soup)
         # add heat content
         heat_content_soup = BeautifulSoup(HEAT_CONTENT_TEMPLATE, 'html.parser')
-        add_swimmers(heat_content_soup, swimmers)
+        add_swimmers(heat_content_soup, heat.lanes)
         heat_container_div.append(heat_content_soup)
 
         # add to right column
@@ -224,61 +239,129 @@ def populate_page_title(page_soup, meet_name: str, session_number: str) -> None:
     page_soup.h1.string = meet_name
     page_soup.h2.string = f'Pass {session_number}'
 
-def populate_event_menu(page_soup, events: dict) -> None:
+def make_event_item(event: Event):
     '''
-    Populates the event menu with the events.
+    Returns the 'event-item' of an event in the event menu.
     '''
-    for event_string in events.keys():
-        event_string = event_string[1:-1]
-        event_tokens = event_string.split(', ')
-        event_number = event_tokens[0]
-        event_name = event_tokens[1]
-
-        event_soup = BeautifulSoup(EVENT_ITEM_TEMPLATE, 'html.parser')
-        event_soup.find('div', class_='event-item')['id'] = (
-            f'event-item-{event_number}')
-        event_soup.find('p', class_='event-item-number').string = event_number
-        event_soup.find('p', class_='event-item-name').string = event_name
-
-        # add to page
-        page_soup.find('div', class_='event-menu').append(event_soup)
+    event_soup = BeautifulSoup(EVENT_ITEM_TEMPLATE, 'html.parser')
+    event_soup.find('div', class_='event-item')['id'] = (
+        f'event-item-{event.number}')
+    event_soup.find('p', class_='event-item-number').string = str(event.number)
+    event_soup.find('p', class_='event-item-name').string = event.name
+    return event_soup
 
-def add_right_columns(page_soup, events: dict) -> None:
+def make_right_column(event: Event):
     '''
-    Adds right columns to the page, one for each event.
+    Returns the 'right-column' of an event with all its heats.
     '''
-    for event_string, heats in events.items():
-        event_string = event_string[1:-1]
-        event_tokens = event_string.split(', ')
-        event_number = event_tokens[0]
-        event_name = event_tokens[1]
+    right_column_soup = BeautifulSoup(RIGHT_COLUMN_TEMPLATE, 'html.parser')
+    right_column_soup.find('div', class_='right-column')['id'] = (
+        f'right-column-{event.number}')
+    right_column_soup.h3.string = f'Gren {event.number}, {event.name}'
+    add_heats(right_column_soup, event.heats)
+    return right_column_soup
 
-        right_column_soup = BeautifulSoup(RIGHT_COLUMN_TEMPLATE, 'html.parser')
-        right_column_soup.find('div', class_='right-column')['id'] = (
-            f'right-column-{event_number}')
-        right_column_soup.h3.string = f'Gren {event_number}, {event_name}'
-
-        add_heats(right_column_soup, heats)
+def get_event_fragments(event: Event) -> dict[str, str]:
+    '''
+    Returns the HTML of the 'event-item' and the 'right-column' of one event,
+    and its part of the search index, for updating an open page without
+    reloading it.
+    '''
+    return {
+        'event_number': str(event.number),
+        'event_item': str(make_event_item(event)),
+        'right_column': str(make_right_column(event)),
+        'search_index': make_event_search_index(event)
+    }
 
-        # add to page
-        page_soup.find('div', class_='two-columns').append(right_column_soup)
+def get_loading_event_fragments(event_number: int) -> dict[str, str]:
+    '''
+    Returns the HTML of the 'event-item' and the 'right-column' of an event
+    that is still being retrieved.
+    '''
+    event_soup = BeautifulSoup(EVENT_ITEM_TEMPLATE, 'html.parser')
+    event_item_div = event_soup.find('div', class_='event-item')
+    event_item_div['id'] = f'event-item-{event_number}'
+    event_item_div['class'] = 'event-item loading'
+    event_soup.find('p', class_='event-item-number').string = str(event_number)
+    event_soup.find('p', class_='event-item-name').string = LOADING_TEXT
+    right_column_soup = BeautifulSoup(RIGHT_COLUMN_TEMPLATE, 'html.parser')
+    right_column_soup.find('div', class_='right-column')['id'] = (
+        f'right-column-{event_number}')
+    right_column_soup.h3.string = f'Gren {event_number}'
+    right_column_soup.find('div', class_='heat-list').append(BeautifulSoup(
+        f'<p class="pt14-gray3">{LOADING_TEXT}</p>', 'html.parser'))
+    return {
+        'event_number': str(event_number),
+        'event_item': str(event_soup),
+        'right_column': str(right_column_soup)
+    }
 
-###############################################################################
+def get_cached_event_fragments(event: Event, 
+                               event_fragments: dict[int, dict] | None
+                               ) -> dict[str, str]:
+    '''
+    Returns the fragments of an event from event_fragments, rendering and
+    adding them if they are not there. event_fragments can be None to always
+    render the event.
+    '''
+    if event_fragments is None:
+        return get_event_fragments(event)
+    if event.number not in event_fragments:
+        event_fragments[event.number] = get_event_fragments(event)
+    return event_fragments[event.number]
 
-def populate_html(session_data: dict) -> None:
+def write_index_html(meet_name: str, session_number: str,
+                     fragments: list[dict[str, str]]) -> None:
     '''
-    The function called by main.py to populate index.html. Given the session 
-    data, populates index.html with the data.
+    Writes index.html with the event fragments in the given order.
     '''
     # get template from index_template.html
     with open('ui/index_template.html', 'r', encoding='utf-8') as file:
         page_soup = BeautifulSoup(file, 'html.parser')
-    populate_page_title(page_soup, session_data['meet_name'], 
-                        session_data['session_number'])
-    populate_event_menu(page_soup, session_data['events'])
-    add_right_columns(page_soup, session_data['events'])
-    # write to index.html
+    populate_page_title(page_soup, meet_name, session_number)
+    # the fragments are inserted as text, without parsing them again
+    page_soup.find('div', class_='event-menu').append(
+        Comment(EVENT_ITEMS_MARKER))
+    page_soup.find('div', class_='two-columns').append(
+        Comment(RIGHT_COLUMNS_MARKER))
+    page_soup.find('script', id='search-index').append(
+        Comment(SEARCH_INDEX_MARKER))
+    html = str(page_soup)
+    html = html.replace(f'<!--{EVENT_ITEMS_MARKER}-->', ''.join(
+        fragment['event_item'] for fragment in fragments))
+    html = html.replace(f'<!--{RIGHT_COLUMNS_MARKER}-->', ''.join(
+        fragment['right_column'] for fragment in fragments))
+    html = html.replace(f'<!--{SEARCH_INDEX_MARKER}-->',
+                        get_search_index_json(fragments))
     with open('ui/index.html', 'w', encoding='utf-8') as file:
-        file.write(str(page_soup))
+        file.write(html)
+
+###############################################################################
+
+def populate_html(session: Session,
+                  event_fragments: dict[int, dict] | None = None) -> None:
+    '''
+    The function called by main.py to populate index.html. Given the session, 
+    populates index.html with its data. The fragments already rendered by
+    populate_html_progress during the retrieval can be given in 
+    event_fragments, so that those events are not rendered again.
+    '''
+    write_index_html(session.meet_name, session.session_number,
+                     [get_cached_event_fragments(event, event_fragments)
+                      for event in session.events])
     
     print('Application ready. Open ui/index.html with Live Server to view.')
+
+def populate_html_progress(session: Session, pending_event_numbers: list[int],
+                           event_fragments: dict[int, dict]) -> None:
+    '''
+    Populates index.html with the events of the session finished so far and
+    the pending events as loading. Called after every finished event during a
+    retrieval. Every event is rendered once and kept in event_fragments.
+    '''
+    fragments = [get_cached_event_fragments(event, event_fragments)
+                 for event in session.events]
+    fragments += [get_loading_event_fragments(event_number)
+                  for event_number in pending_event_numbers]
+    write_index_html(session.meet_name, session.session_number, fragments)
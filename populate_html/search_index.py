@@ -0,0 +1,70 @@
+'''
+This file contains the search index of the swimmers and clubs that
+populate_html embeds in index.html, so that script.js can search as you type
+without walking the page.
+
+The index has one part per event, so that a single event can be replaced when
+it is updated on an open page:
+
+{ 'event_number' : {
+    'name': 'event name',
+    # [name, club, heat, lane, best time]
+    'entries': [['name', 'club', heat, lane, 'best'], ...],
+    # the first PREFIX_LENGTH characters of every normalized word of the
+    # names and clubs, with the indices of the entries that have the word
+    'prefixes': { 'prefix' : [entry index, ...] } } }
+
+Text is normalized by removing accents and lowercasing, so that 'ostersund'
+finds 'Östersund'. script.js normalizes the search the same way.
+'''
+import json
+import unicodedata
+
+from session_model.session_model import Event
+
+# Number of characters of a word the entries are indexed by.
+PREFIX_LENGTH = 2
+
+def normalize_search_text(text: str) -> str:
+    '''
+    Removes the accents of a text and lowercases it.
+    '''
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(character for character in decomposed
+                   if not unicodedata.combining(character)).lower()
+
+def get_search_words(text: str) -> list[str]:
+    '''
+    Returns the normalized words of a text.
+    '''
+    return normalize_search_text(text).replace('-', ' ').split()
+
+def make_event_search_index(event: Event) -> dict:
+    '''
+    Returns the part of the search index for one event.
+    '''
+    entries = []
+    prefixes = dict()
+    for heat in sorted(event.heats, key=lambda heat: heat.number):
+        for entry in sorted(heat.lanes, key=lambda entry: entry.lane):
+            entry_index = len(entries)
+            entries.append([entry.name, entry.club, heat.number, entry.lane,
+                            entry.best_swim.final_time or ''])
+            for word in set(get_search_words(f'{entry.name} {entry.club}')):
+                entry_indices = prefixes.setdefault(word[:PREFIX_LENGTH], [])
+                if not entry_indices or entry_indices[-1] != entry_index:
+                    entry_indices.append(entry_index)
+    return {'name': event.name, 'entries': entries, 'prefixes': prefixes}
+
+def get_search_index_json(fragments: list[dict]) -> str:
+    '''
+    Returns the search index of the events of the fragments as JSON that can
+    be embedded in a script element. Fragments of events that are still being
+    retrieved have no search index.
+    '''
+    search_index = {fragment['event_number']: fragment['search_index']
+                    for fragment in fragments if 'search_index' in fragment}
+    search_index_json = json.dumps(search_index, ensure_ascii=False,
+                                   separators=(',', ':'))
+    # a '</' would end the script element
+    return search_index_json.replace('</', '<\\/')
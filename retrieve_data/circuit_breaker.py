@@ -0,0 +1,105 @@
+'''
+This file contains a circuit breaker for each host GET makes requests to.
+
+When a host is down, every request to it would wait for the full request
+timeout, which for a session of 400 swimmers adds up to well over an hour of
+producing errors. Instead, the circuit of a host opens after
+FAILURE_THRESHOLD failures in a row (timeouts, connection errors and server
+errors). While it is open, GET fails immediately without a request, and the
+error is recorded as 'host_unavailable'. After OPEN_SECONDS, one request is
+let through as a probe: if it succeeds the circuit closes, otherwise it opens
+again for twice as long, up to MAX_OPEN_SECONDS.
+
+The circuits of different hosts are independent, so the retrieval carries on
+with the hosts it can still reach.
+'''
+
+import threading
+import time
+from urllib.parse import urlparse
+
+# Number of failed requests in a row after which the circuit of a host opens.
+FAILURE_THRESHOLD = 5
+
+# Seconds the circuit stays open before a probe request is let through. The
+# time doubles after every failed probe, up to MAX_OPEN_SECONDS.
+OPEN_SECONDS = 30
+MAX_OPEN_SECONDS = 300
+
+_lock = threading.Lock()
+
+# { 'host' : { 'failures': int, 'opened_at': float | None,
+#              'open_seconds': float, 'probing': bool } }
+circuits: dict[str, dict] = dict()
+
+def reset_circuit_breakers() -> None:
+    '''
+    Closes the circuits of all hosts.
+    '''
+    with _lock:
+        circuits.clear()
+
+def _get_circuit(host: str) -> dict:
+    '''
+    Returns the circuit of a host. Must be called with the lock held.
+    '''
+    return circuits.setdefault(host, {'failures': 0,
+                                      'opened_at': None,
+                                      'open_seconds': OPEN_SECONDS,
+                                      'probing': False})
+
+def allow_request(url: str) -> bool:
+    '''
+    Returns True if a request to the host of the URL may be made: the circuit
+    is closed, or it is the probe of an open circuit.
+    '''
+    with _lock:
+        circuit = _get_circuit(urlparse(url).netloc)
+        if circuit['opened_at'] is None:
+            return True
+        if circuit['probing']:
+            return False
+        if time.monotonic() - circuit['opened_at'] < circuit['open_seconds']:
+            return False
+        circuit['probing'] = True
+        return True
+
+def record_request_success(url: str) -> None:
+    '''
+    Records that the host of the URL answered, which closes its circuit.
+    '''
+    with _lock:
+        circuit = _get_circuit(urlparse(url).netloc)
+        circuit['failures'] = 0
+        circuit['opened_at'] = None
+        circuit['open_seconds'] = OPEN_SECONDS
+        circuit['probing'] = False
+
+def record_request_failure(url: str) -> bool:
+    '''
+    Records that a request to the host of the URL failed. Returns True if this
+    opened the circuit of the host.
+    '''
+    with _lock:
+        circuit = _get_circuit(urlparse(url).netloc)
+        circuit['failures'] += 1
+        if circuit['probing']:
+            # the probe failed, stay open for longer
+            circuit['probing'] = False
+            circuit['opened_at'] = time.monotonic()
+            circuit['open_seconds'] = min(circuit['open_seconds'] * 2,
+                                          MAX_OPEN_SECONDS)
+            return False
+        if (circuit['opened_at'] is None
+                and circuit['failures'] >= FAILURE_THRESHOLD):
+            circuit['opened_at'] = time.monotonic()
+            return True
+        return False
+
+def is_host_unavailable(host: str) -> bool:
+    '''
+    Returns True if the circuit of the host is open.
+    '''
+    with _lock:
+        circuit = circuits.get(host)
+        return circuit is not None and circuit['opened_at'] is not None
@@ -0,0 +1,155 @@
+'''
+This file contains the wall-clock budget of a retrieval (main.py retrieve
+--deadline). With a deadline set, the retrieval degrades as the budget runs
+out, so that it always finishes on time with as much of the session as
+possible:
+
+LEVEL_FULL          everything is retrieved
+LEVEL_SKIP_SPLITS   the LiveTiming splits are skipped, and the best time is
+                    the one shown in Tempus
+LEVEL_SKIP_HEATS    also, the best swims of the earliest heats of an event are
+                    not looked up, only those of its last heat
+LEVEL_SKIP_ALL      the deadline is reached, nothing more is looked up
+
+The level is chosen by comparing the fraction of the budget left with the
+fraction of the work left, which retrieve_data reports in work units (events)
+and the progress within the current unit (its heats). The degraded entries
+are marked with BestSwim.degraded.
+
+Network requests are given at most the time left as their timeout, and none
+are made once the deadline is reached.
+'''
+
+import threading
+import time
+
+LEVEL_FULL = 0
+LEVEL_SKIP_SPLITS = 1
+LEVEL_SKIP_HEATS = 2
+LEVEL_SKIP_ALL = 3
+
+# Seconds kept at the end of the budget for saving and rendering the session.
+FINISH_RESERVE_SECONDS = 5.0
+
+# The splits are skipped when the fraction of the budget left falls below
+# SKIP_SPLITS_PACE times the fraction of the work left, and the earliest heats
+# when it falls below SKIP_HEATS_PACE times it. Slightly below 1, so that the
+# retrieval is not degraded while it keeps up with the pace.
+SKIP_SPLITS_PACE = 0.9
+SKIP_HEATS_PACE = 0.5
+
+# The monotonic times the budget started and has to be used by (without the
+# finish reserve). None if there is no deadline.
+budget_start: float | None = None
+budget_end: float | None = None
+
+work_units_total = 0
+work_units_done = 0
+# Fraction of the current work unit done
+work_unit_progress = 0.0
+_lock = threading.Lock()
+
+def set_deadline(seconds: float | None) -> None:
+    '''
+    Starts a budget of the given number of seconds from now. None removes the
+    deadline.
+    '''
+    global budget_start, budget_end
+    if seconds is None:
+        budget_start = budget_end = None
+        return
+    assert seconds > FINISH_RESERVE_SECONDS, (
+        f'Deadline must be more than {FINISH_RESERVE_SECONDS:.0f} seconds.')
+    budget_start = time.monotonic()
+    budget_end = budget_start + seconds - FINISH_RESERVE_SECONDS
+
+def has_deadline() -> bool:
+    '''
+    Returns True if a deadline is set.
+    '''
+    return budget_end is not None
+
+def get_seconds_left() -> float | None:
+    '''
+    Returns the seconds left of the budget (0 when it is used up), or None if
+    there is no deadline.
+    '''
+    if budget_end is None:
+        return None
+    return max(budget_end - time.monotonic(), 0.0)
+
+###############################################################################
+# Work progress
+###############################################################################
+
+def set_work_total(units: int) -> None:
+    '''
+    Sets the number of work units of the retrieval and resets the progress.
+    '''
+    global work_units_total, work_units_done, work_unit_progress
+    with _lock:
+        work_units_total = units
+        work_units_done = 0
+        work_unit_progress = 0.0
+
+def set_work_unit_progress(fraction: float) -> None:
+    '''
+    Sets the fraction of the current work unit that is done.
+    '''
+    global work_unit_progress
+    with _lock:
+        work_unit_progress = min(max(fraction, 0.0), 1.0)
+
+def finish_work_unit() -> None:
+    '''
+    Counts the current work unit as done.
+    '''
+    global work_units_done, work_unit_progress
+    with _lock:
+        work_units_done += 1
+        work_unit_progress = 0.0
+
+def get_work_left_fraction() -> float:
+    '''
+    Returns the fraction of the work that is left.
+    '''
+    with _lock:
+        if work_units_total == 0:
+            return 1.0
+        done = (work_units_done + work_unit_progress) / work_units_total
+    return max(1.0 - done, 0.0)
+
+###############################################################################
+# Degradation
+###############################################################################
+
+def get_degradation_level() -> int:
+    '''
+    Returns how much the retrieval is degraded right now (see the levels
+    above). Always LEVEL_FULL without a deadline.
+    '''
+    seconds_left = get_seconds_left()
+    if seconds_left is None:
+        return LEVEL_FULL
+    if seconds_left == 0.0:
+        return LEVEL_SKIP_ALL
+    time_left_fraction = seconds_left / (budget_end - budget_start)
+    work_left_fraction = get_work_left_fraction()
+    if time_left_fraction >= work_left_fraction * SKIP_SPLITS_PACE:
+        return LEVEL_FULL
+    if time_left_fraction >= work_left_fraction * SKIP_HEATS_PACE:
+        return LEVEL_SKIP_SPLITS
+    return LEVEL_SKIP_HEATS
+
+def get_request_timeout(timeout: float) -> float | None:
+    '''
+    Returns the timeout of a network request, which is at most the seconds
+    left of the budget. Returns None if the deadline is reached and no request
+    should be made.
+    '''
+    seconds_left = get_seconds_left()
+    if seconds_left is None:
+        return timeout
+    if seconds_left == 0.0:
+        return None
+    return min(timeout, seconds_left)
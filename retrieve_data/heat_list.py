@@ -0,0 +1,213 @@
+'''
+This file contains the start list parser, which turns a LiveTiming heat list
+(the 'Heatlista' page of an event) into a StartList: the event name, pool,
+number of heats and the lanes of each heat. It also finds the heat lists of a
+session. It makes no requests.
+
+Parsed start lists are cached by the URL and content hash of their heat list
+(see start_list_cache.py), so an unchanged heat list is only parsed once, also
+across runs. The BeautifulSoup tree of a heat list is freed as soon as it has
+been parsed, and only the compact StartList is kept.
+'''
+
+import hashlib
+from dataclasses import dataclass, field
+
+# external libraries
+from bs4 import BeautifulSoup
+
+# helper functions
+from retrieve_data.utilities import get_element_text
+from retrieve_data.site_urls import livetiming_url
+from retrieve_data.metrics import record_cache_lookup
+
+# cache functions
+from cache.start_list_cache import (get_cached_start_list,
+                                    get_last_cached_start_list,
+                                    add_start_list_to_cache)
+
+
+@dataclass
+class StartListEntry:
+    '''
+    A swimmer in a lane of a heat list.
+    '''
+    lane: int
+    name: str
+    born: str
+    club: str
+
+    def get_swimmer_data(self) -> dict[str, str]:
+        '''
+        Returns the swimmer data ('name', 'born' and 'club') the best swim of
+        the swimmer is looked up with.
+        '''
+        return {'name': self.name, 'born': self.born, 'club': self.club}
+
+@dataclass
+class StartListHeat:
+    '''
+    A heat of a heat list with its lanes.
+    '''
+    number: int
+    entries: list[StartListEntry] = field(default_factory=list)
+
+@dataclass
+class StartList:
+    '''
+    The parsed heat list of an event. total_heats is the number of heats the
+    heat list states, which the heats found on the page normally match.
+    '''
+    event_name: str
+    pool: str | None
+    total_heats: int
+    heats: list[StartListHeat] = field(default_factory=list)
+
+    def get_included_heats(self, num_heats: int) -> list[StartListHeat]:
+        '''
+        Returns the heats within num_heats of the last heat.
+        '''
+        return [heat for heat in self.heats
+                if heat.number > self.total_heats - num_heats]
+
+    def to_tuple(self) -> tuple:
+        '''
+        Returns the start list as nested tuples, for the start list cache.
+        '''
+        return (self.event_name, self.pool, self.total_heats,
+                tuple((heat.number,
+                       tuple((entry.lane, entry.name, entry.born, entry.club)
+                             for entry in heat.entries))
+                      for heat in self.heats))
+
+    @classmethod
+    def from_tuple(cls, values) -> 'StartList':
+        '''
+        Creates a StartList from the nested tuples (or lists, after a round
+        trip through JSON) returned by to_tuple.
+        '''
+        event_name, pool, total_heats, heats = values
+        return cls(event_name, pool, total_heats,
+                   [StartListHeat(number, [StartListEntry(*entry)
+                                           for entry in entries])
+                    for number, entries in heats])
+
+def get_lane_and_swimmer_data(row) -> tuple[str, dict[str, str]] | None:
+    '''
+    Returns the lane and the swimmer data ('name', 'born' and 'club') of a heat
+    list row. Returns None if the row is not a swimmer row.
+    '''
+    row_text = get_element_text(row)
+    if (len(row_text) <= 2) or (not row_text[0].isdigit()): return None
+    tds = row.find_all('td')
+    element_texts = [get_element_text(td) for td in tds]
+    element_texts = [text for text in element_texts if text != '']
+    if len(element_texts) <= 3: return None # safety
+    element_texts = (element_texts[1:] if element_texts[2][0].isalpha()
+                     else element_texts)
+    lane = element_texts[0]
+    swimmer_data = dict()
+    swimmer_data['name'] = element_texts[1]
+    swimmer_data['born'] = element_texts[2]
+    club = element_texts[3]
+    club = ' '.join([word.title() if len(word) > 2 else word
+                    for word in club.split(' ')])
+    swimmer_data['club'] = club
+    return lane, swimmer_data
+
+def is_skipped_event(event_name: str) -> bool:
+    '''
+    Returns True for relays and extralopp, which have no individual best swims.
+    '''
+    return (('x' in event_name.lower() and
+             'mixed' not in event_name.lower()) or
+            'extralopp' in event_name.lower())
+
+def parse_start_list(content: bytes) -> StartList | None:
+    '''
+    Parses the content of a heat list page into a StartList. Returns None if
+    the page has no heats. Relays and extralopp are parsed like the other
+    events, is_skipped_event tells them apart.
+    '''
+    event_soup = BeautifulSoup(content, 'html.parser')
+    try:
+        event_trs = event_soup.find_all('tr')
+        event_name = None
+        pool = None
+        total_heats = None
+        curr_heat = None
+        heats = []
+        for row in event_trs[1:]:
+            row_text = get_element_text(row)
+            if row_text == '': continue
+            if row_text[:9] == 'Bassäng: ':
+                pool = row_text[9:12]
+            if row_text[:5] == 'Gren ':
+                # new heat
+                row_tokens = row_text.split(' ')
+                has_heat_count = row_tokens[-1][1].isdigit()
+                if event_name is None:
+                    event_name = ' '.join(row_tokens[2:5])
+                if total_heats is None:
+                    total_heats = (int(row_tokens[-1].replace('(', '')
+                                                     .replace(')', ''))
+                                   if has_heat_count else 1)
+                curr_heat = StartListHeat(
+                    int(row_tokens[-2]) if has_heat_count else 1)
+                heats.append(curr_heat)
+                continue
+            if curr_heat is not None:
+                lane_and_swimmer_data = get_lane_and_swimmer_data(row)
+                if lane_and_swimmer_data is not None:
+                    lane, swimmer_data = lane_and_swimmer_data
+                    curr_heat.entries.append(StartListEntry(
+                        int(lane), swimmer_data['name'], swimmer_data['born'],
+                        swimmer_data['club']))
+    finally:
+        # free the tree now rather than whenever the garbage collector runs
+        event_soup.decompose()
+    if event_name is None:
+        return None
+    return StartList(event_name, pool, total_heats, heats)
+
+def get_start_list(url: str, content: bytes) -> StartList | None:
+    '''
+    Returns the StartList of the heat list page at url with the given
+    content, from the start list cache if the page has not changed since it
+    was last parsed. Returns None if the page has no heats.
+    '''
+    content_hash = hashlib.sha1(content).hexdigest()
+    cached_start_list = get_cached_start_list(url, content_hash)
+    record_cache_lookup('start_list', cached_start_list is not None)
+    if cached_start_list is not None:
+        return StartList.from_tuple(cached_start_list)
+    start_list = parse_start_list(content)
+    if start_list is not None:
+        add_start_list_to_cache(url, content_hash, start_list.to_tuple())
+    return start_list
+
+def get_last_start_list(url: str) -> StartList | None:
+    '''
+    Returns the StartList last parsed from the heat list page at url, for
+    when the page can no longer be retrieved. Returns None if it was never
+    parsed.
+    '''
+    cached_start_list = get_last_cached_start_list(url)
+    if cached_start_list is None:
+        return None
+    return StartList.from_tuple(cached_start_list)
+
+def get_session_heat_list_urls(session_soup) -> list[tuple[str, str]]:
+    '''
+    Returns the event number and heat list URL of every event in a session
+    program page that has a 'Heatlista' link.
+    '''
+    heat_list_urls = []
+    for row in session_soup.find_all('tr')[1:]:
+        tds = row.find_all('td')
+        event_number = get_element_text(tds[0])
+        for td in tds:
+            if get_element_text(td) == 'Heatlista':
+                link = td.find('a')['href']
+                heat_list_urls.append((event_number, livetiming_url(link)))
+    return heat_list_urls
@@ -0,0 +1,148 @@
+'''
+This file contains the hedged requests GET can make to cut the tail latency
+of slow LiveTiming and Tempus responses.
+
+Most requests answer quickly, but a few take many seconds and hold up their
+whole heat. With hedging on (set_hedging), a request that has not answered
+within the 95th percentile of the recent latencies of its host is sent once
+more, and whichever response arrives first is used. The slower request is
+left to finish in the background. A host is only hedged once
+MIN_LATENCY_SAMPLES of its latencies have been observed, and at most
+MAX_HEDGED_FRACTION of the requests are hedged, so that hedging adds little
+load to the sites.
+
+The latencies of every network request are observed, hedged or not, so the
+percentile is known when hedging is turned on.
+'''
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import (ThreadPoolExecutor,
+                                FIRST_COMPLETED,
+                                wait)
+from typing import Callable
+from urllib.parse import urlparse
+
+from retrieve_data.metrics import record_hedged_request
+
+# Number of recent latencies of each host the percentile is taken over.
+LATENCY_WINDOW = 200
+
+# Number of latencies of a host observed before its requests are hedged.
+MIN_LATENCY_SAMPLES = 20
+
+# Percentile of the recent latencies after which a request is hedged.
+HEDGE_PERCENTILE = 95
+
+# Hedged requests are sent at most for this fraction of the requests.
+MAX_HEDGED_FRACTION = 0.05
+
+# Number of threads the hedged requests and the requests they race run in.
+HEDGE_THREADS = 32
+
+_lock = threading.Lock()
+
+hedging_enabled: bool = False
+hedge_executor: ThreadPoolExecutor | None = None
+# { 'host' : deque of recent latencies in seconds }
+host_latencies: dict[str, deque] = dict()
+num_requests: int = 0
+num_hedged_requests: int = 0
+
+def set_hedging(enabled: bool) -> None:
+    '''
+    Turns hedged requests on or off. Turning them on restarts the count of
+    requests MAX_HEDGED_FRACTION is taken of.
+    '''
+    global hedging_enabled, hedge_executor, num_requests, num_hedged_requests
+    hedging_enabled = enabled
+    if enabled:
+        with _lock:
+            num_requests = 0
+            num_hedged_requests = 0
+    if enabled and hedge_executor is None:
+        hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_THREADS)
+    elif not enabled and hedge_executor is not None:
+        # the slower requests may still be running, don't wait for them
+        hedge_executor.shutdown(wait=False)
+        hedge_executor = None
+
+def observe_latency(url: str, seconds: float) -> None:
+    '''
+    Adds the latency of a request to the recent latencies of its host.
+    '''
+    host = urlparse(url).netloc
+    with _lock:
+        latencies = host_latencies.get(host)
+        if latencies is None:
+            latencies = host_latencies[host] = deque(maxlen=LATENCY_WINDOW)
+        latencies.append(seconds)
+
+def get_hedge_delay(url: str) -> float | None:
+    '''
+    Returns the seconds after which a request to the URL is hedged: the
+    HEDGE_PERCENTILE of the recent latencies of its host. Returns None if too
+    few latencies have been observed.
+    '''
+    with _lock:
+        latencies = sorted(host_latencies.get(urlparse(url).netloc, ()))
+    if len(latencies) < MIN_LATENCY_SAMPLES:
+        return None
+    index = math.ceil(len(latencies) * HEDGE_PERCENTILE / 100) - 1
+    return latencies[index]
+
+def reserve_hedge() -> bool:
+    '''
+    Returns True if one more hedged request fits in MAX_HEDGED_FRACTION, and
+    counts it.
+    '''
+    global num_hedged_requests
+    with _lock:
+        if num_hedged_requests + 1 > num_requests * MAX_HEDGED_FRACTION:
+            return False
+        num_hedged_requests += 1
+        return True
+
+def timed(request: Callable[[], object], url: str) -> Callable[[], object]:
+    '''
+    Wraps a request so that its latency is observed when it finishes.
+    '''
+    def timed_request():
+        start = time.perf_counter()
+        try:
+            return request()
+        finally:
+            observe_latency(url, time.perf_counter() - start)
+    return timed_request
+
+def send_request(url: str, request: Callable[[], object]):
+    '''
+    Makes a request to the URL and returns its response, hedging it if hedging
+    is on. The request is a function without arguments, which is called once
+    more for the hedged request. If the first request to finish raised an
+    exception, the other one is waited for, and if both raised, the exception
+    of the first is raised.
+    '''
+    global num_requests
+    with _lock:
+        num_requests += 1
+    executor = hedge_executor
+    delay = get_hedge_delay(url) if hedging_enabled else None
+    if executor is None or delay is None:
+        return timed(request, url)()
+    first = executor.submit(timed(request, url))
+    done, _ = wait([first], timeout=delay)
+    if done or not reserve_hedge():
+        return first.result()
+    hedge = executor.submit(timed(request, url))
+    pending = {first, hedge}
+    while True:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        succeeded = [future for future in done if future.exception() is None]
+        if succeeded or not pending:
+            break
+    winner = succeeded[0] if succeeded else first
+    record_hedged_request(url, winner is hedge)
+    return winner.result()
@@ -0,0 +1,118 @@
+'''
+This file contains the record/replay archive for HTTP traffic. In record mode,
+every response GET receives is kept and written to the archive when recording
+stops. In replay mode, GET serves all responses from the archive and makes no
+requests at all, which makes a retrieval run deterministic.
+
+The archive is a zip file with an index.json that maps each URL to its status
+code, headers and the name of the zip member holding the response body.
+'''
+import hashlib
+import json
+import zipfile
+
+# Only these headers are kept, the rest is not used by the retrieval code.
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+# None, 'record' or 'replay'
+http_archive_mode: str | None = None
+http_archive_path: str | None = None
+
+# { 'url' : { 'status': int, 'headers': { 'name': 'value' }, 'body': bytes } }
+http_archive: dict[str, dict] = dict()
+
+def start_recording(path: str) -> None:
+    '''
+    Starts recording all responses to the archive at the given path. The
+    archive is written when stop_http_archive is called.
+    '''
+    global http_archive_mode, http_archive_path, http_archive
+    http_archive_mode = 'record'
+    http_archive_path = path
+    http_archive = dict()
+
+def start_replaying(path: str) -> None:
+    '''
+    Loads the archive at the given path and starts serving all responses from
+    it.
+    '''
+    global http_archive_mode, http_archive_path, http_archive
+    http_archive_mode = 'replay'
+    http_archive_path = path
+    http_archive = load_http_archive(path)
+
+def stop_http_archive() -> None:
+    '''
+    Writes the archive if recording and goes back to making real requests.
+    '''
+    global http_archive_mode
+    if http_archive_mode == 'record':
+        save_http_archive(http_archive_path, http_archive)
+    http_archive_mode = None
+
+def is_recording() -> bool:
+    '''
+    Returns True if responses are being recorded.
+    '''
+    return http_archive_mode == 'record'
+
+def is_replaying() -> bool:
+    '''
+    Returns True if responses are being served from the archive.
+    '''
+    return http_archive_mode == 'replay'
+
+def record_http_response(url: str, status: int, headers, body: bytes) -> None:
+    '''
+    Adds a response to the archive. A later response for the same URL replaces
+    the earlier one.
+    '''
+    http_archive[url] = {
+        'status': status,
+        'headers': {name: headers[name] for name in RECORDED_HEADERS
+                    if name in headers},
+        'body': body
+    }
+
+def get_replayed_http_response(url: str) -> dict | None:
+    '''
+    Gets the recorded response of a URL. Returns None if the URL was not
+    recorded.
+    '''
+    return http_archive.get(url)
+
+###############################################################################
+# Archive file format
+###############################################################################
+
+def save_http_archive(path: str, archive: dict[str, dict]) -> None:
+    '''
+    Writes an archive to a zip file. Bodies are stored as separate, compressed
+    members named by the hash of their URL.
+    '''
+    index = dict()
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as file:
+        for url, response in archive.items():
+            member = hashlib.sha1(url.encode('utf-8')).hexdigest()
+            file.writestr(member, response['body'])
+            index[url] = {
+                'status': response['status'],
+                'headers': response['headers'],
+                'member': member
+            }
+        file.writestr('index.json', json.dumps(index, indent=4))
+
+def load_http_archive(path: str) -> dict[str, dict]:
+    '''
+    Reads an archive written by save_http_archive.
+    '''
+    archive = dict()
+    with zipfile.ZipFile(path, 'r') as file:
+        index = json.loads(file.read('index.json'))
+        for url, response in index.items():
+            archive[url] = {
+                'status': response['status'],
+                'headers': response['headers'],
+                'body': file.read(response['member'])
+            }
+    return archive
@@ -1,8 +1,12 @@
 ''''
 This file contains the function meet_names_match, which is used to match a meet
-name from Tempus to a meet name from LiveTiming, and its helper functions.
+name from Tempus to a meet name from LiveTiming, and its helper functions. It
+also contains find_meet, which does the same matching against an index of the
+whole LiveTiming archive, with a fallback to near matches.
 '''
 import re
+from functools import lru_cache
+
 from retrieve_data.utilities import collapse_whitespace
 
 MEET_NAME_ABBREVIATIONS = {
@@ -22,6 +26,20 @@ MEET_NAME_REMOVABLE_TOKENS = {
     'simarena', 'simarenan', 'simbassäng', 'simbassängen', '&'
 }
 
+# Minimum Jaccard similarity of the token signatures, without the year, for
+# a near match.
+NEAR_MATCH_THRESHOLD = 0.6
+
+# Number of meet names whose cleaned names and signatures are memoized, a few
+# times the number of meets in the LiveTiming archive.
+MEET_NAME_CACHE_SIZE = 16384
+
+NUMBER_OR_TEXT_PATTERN = re.compile(r'(\d+|\D+)')
+
+# MEET_NAME_ABBREVIATIONS with the keys as sets, so they are built only once
+MEET_NAME_ABBREVIATION_SETS = [(frozenset(key), value) for key, value
+                               in MEET_NAME_ABBREVIATIONS.items()]
+
 def clean_meet_name(name: str) -> str:
     '''
     Cleans a meet name by removing unnecessary characters and adding spaces
@@ -31,7 +49,7 @@ def clean_meet_name(name: str) -> str:
     name = name.replace(',', ' ').replace('-', ' ').replace('.', ' ')
     name = name.replace('50m', '50').replace('25m', '25')
     # add space between words and numbers
-    name = ' '.join(re.compile(r'(\d+|\D+)').findall(name))
+    name = ' '.join(NUMBER_OR_TEXT_PATTERN.findall(name))
     return collapse_whitespace(name)
 
 def make_abbreviations(tokens: set[str]) -> None:
@@ -39,32 +57,122 @@ def make_abbreviations(tokens: set[str]) -> None:
     Replaces any tokens that are a key of MEET_NAME_ABBREVIATIONS with the
     corresponding value.
     '''
-    for key, value in MEET_NAME_ABBREVIATIONS.items():
-        key = set(key)
+    for key, value in MEET_NAME_ABBREVIATION_SETS:
         if key.issubset(tokens):
             tokens -= key
             tokens.add(value)
 
+@lru_cache(maxsize=MEET_NAME_CACHE_SIZE)
+def get_clean_meet_name(name: str) -> str:
+    '''
+    Returns the lowercase, cleaned meet name. Cached, since the same names are
+    compared many times.
+    '''
+    return clean_meet_name(name.lower())
+
+@lru_cache(maxsize=MEET_NAME_CACHE_SIZE)
+def get_meet_signature(name: str, year: str) -> frozenset[str]:
+    '''
+    Returns the normalized token signature of a meet name: the tokens of the
+    cleaned name without removable tokens, with abbreviations applied and the
+    year added. Two meets with the same signature are the same meet.
+    '''
+    tokens = set(get_clean_meet_name(name).split(' '))
+    # delete arbitrary tokens
+    tokens -= MEET_NAME_REMOVABLE_TOKENS
+    make_abbreviations(tokens)
+    # make sure the set contains the year
+    tokens |= {year}
+    return frozenset(tokens)
+
 def meet_names_match(name1: str, date1: str, name2: str, date2: str) -> bool:
     '''
     Returns True if the two meet names are similar enough to be considered the 
     same meet. This function is used to match a meet name from Tempus to a meet 
     name from LiveTiming.
     '''
-    name1, name2 = name1.lower(), name2.lower()
-    if name1 == name2: return True
-    name1, name2 = clean_meet_name(name1), clean_meet_name(name2)
-    if name1 == name2: return True
+    if name1.lower() == name2.lower(): return True
+    if get_clean_meet_name(name1) == get_clean_meet_name(name2): return True
     year1, year2 = date1[:4], date2[:4]
     if year1 != year2: return False
-    name1_tokens = set(name1.split(' '))
-    name2_tokens = set(name2.split(' '))
-    # delete arbitrary tokens
-    name1_tokens -= MEET_NAME_REMOVABLE_TOKENS
-    name2_tokens -= MEET_NAME_REMOVABLE_TOKENS
-    make_abbreviations(name1_tokens)
-    make_abbreviations(name2_tokens)
-    # make sure both sets contain the year
-    name1_tokens |= {year1}
-    name2_tokens |= {year2}
-    return name1_tokens == name2_tokens 
+    return get_meet_signature(name1, year1) == get_meet_signature(name2, year2)
+
+###############################################################################
+# Indexed matching against the LiveTiming archive
+###############################################################################
+
+def build_meet_index(archive_rows: list[tuple]) -> dict:
+    '''
+    Builds an index over the meets of the LiveTiming archive. The archive rows
+    are tuples that start with the meet name and date, e.g. 
+    (name, date, id, location). The index looks like this:
+        {
+            'names': { 'lowercase name': row },
+            'clean_names': { 'cleaned name': row },
+            'years': { 
+                'YYYY': { 
+                    'signatures': { signature: row },
+                    'rows': [(signature, row), ...]
+                }
+            }
+        }
+    The first row wins when several meets share a key, like the first match
+    of a scan through the archive would.
+    '''
+    index = {'names': dict(), 'clean_names': dict(), 'years': dict()}
+    for row in archive_rows:
+        name, date = row[0], row[1]
+        year = date[:4]
+        signature = get_meet_signature(name, year)
+        index['names'].setdefault(name.lower(), row)
+        index['clean_names'].setdefault(get_clean_meet_name(name), row)
+        year_index = index['years'].setdefault(
+            year, {'signatures': dict(), 'rows': []})
+        year_index['signatures'].setdefault(signature, row)
+        year_index['rows'].append((signature, row))
+    return index
+
+def jaccard_similarity(tokens1: frozenset, tokens2: frozenset) -> float:
+    '''
+    Returns the Jaccard similarity of two token sets, 0 if both are empty.
+    '''
+    union = tokens1 | tokens2
+    if not union:
+        return 0.0
+    return len(tokens1 & tokens2) / len(union)
+
+def find_meet(index: dict, name: str, date: str) -> tuple | None:
+    '''
+    Returns the archive row of the meet that matches the name and date, or
+    None. Exact matches (the same ones meet_names_match finds) are dictionary
+    lookups. Otherwise, the meets of the same year are ranked by the Jaccard
+    similarity of their signatures without the year, which all of them share,
+    and the best one is returned if it reaches NEAR_MATCH_THRESHOLD. Numbers
+    in the names (such as 25 and 50 for the pool length) must agree for a near
+    match, since they tell different meets apart.
+    '''
+    row = index['names'].get(name.lower())
+    if row is None:
+        row = index['clean_names'].get(get_clean_meet_name(name))
+    year = date[:4]
+    year_index = index['years'].get(year)
+    if row is not None or year_index is None:
+        return row
+    signature = get_meet_signature(name, year)
+    row = year_index['signatures'].get(signature)
+    if row is not None:
+        return row
+    numbers = {token for token in signature if token.isdigit()}
+    name_tokens = signature - {year}
+    best_row, best_similarity = None, 0.0
+    for candidate_signature, candidate_row in year_index['rows']:
+        if numbers != {token for token in candidate_signature 
+                       if token.isdigit()}:
+            continue
+        similarity = jaccard_similarity(name_tokens,
+                                        candidate_signature - {year})
+        if similarity > best_similarity:
+            best_row, best_similarity = candidate_row, similarity
+    if best_similarity < NEAR_MATCH_THRESHOLD:
+        return None
+    return best_row
@@ -0,0 +1,93 @@
+'''
+This file contains the memory budget of a retrieval. Large meets used to make
+the retrieval swap: the whole meet results cache is held in memory, and the
+BeautifulSoup trees of the large pages come on top of it.
+
+With a budget set (set_memory_budget), the retrieval checks its memory use
+after every fetched meet results page. When the use is near the budget, the
+least recently used meet results are evicted from memory to a spill file (see
+meet_results_cache.py), and page_parsers.py parses the large pages in its
+low-memory mode until the use is below the budget again.
+
+The memory use is the memory traced by tracemalloc while it is tracing, and
+the resident set size of the process otherwise. The resident set size is read
+from /proc, and where there is no /proc, the peak resident set size is used.
+'''
+
+import gc
+import os
+import sys
+import threading
+import tracemalloc
+
+from cache.meet_results_cache import evict_meet_results
+from retrieve_data.metrics import record_memory_budget_action
+
+# Fraction of the budget at which the budget counts as near.
+MEMORY_BUDGET_NEAR_FRACTION = 0.8
+
+# Fraction of the meet results in memory evicted each time the budget is near.
+EVICTED_FRACTION = 0.5
+
+_lock = threading.Lock()
+
+memory_budget_bytes: int | None = None
+
+def set_memory_budget(budget_bytes: int | None) -> None:
+    '''
+    Sets the memory budget in bytes. None removes the budget.
+    '''
+    assert budget_bytes is None or budget_bytes > 0, \
+        'Memory budget must be greater than 0.'
+    global memory_budget_bytes
+    memory_budget_bytes = budget_bytes
+
+def get_memory_usage() -> int | None:
+    '''
+    Returns the memory used by the process in bytes, or None if it can not be
+    measured.
+    '''
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            resident_pages = int(file.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        # not available on Windows
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+    except ImportError:
+        return None
+
+def is_memory_budget_near() -> bool:
+    '''
+    Returns True if a memory budget is set and the memory use is near it.
+    '''
+    if memory_budget_bytes is None:
+        return False
+    memory_usage = get_memory_usage()
+    if memory_usage is None:
+        return False
+    return memory_usage >= memory_budget_bytes * MEMORY_BUDGET_NEAR_FRACTION
+
+def enforce_memory_budget() -> None:
+    '''
+    Evicts meet results from memory if the memory use is near the budget. Only
+    one thread evicts at a time, the others carry on.
+    '''
+    if not is_memory_budget_near():
+        return
+    if not _lock.acquire(blocking=False):
+        return
+    try:
+        num_evicted = evict_meet_results(EVICTED_FRACTION)
+        if num_evicted > 0:
+            gc.collect()
+            record_memory_budget_action('meet_results_evicted', num_evicted)
+    finally:
+        _lock.release()
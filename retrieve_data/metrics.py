@@ -0,0 +1,420 @@
+'''
+This file contains the instrumentation of a retrieval run. It records
+    - a span for each function of the call chain (count, total and max time,
+      and the 50th, 95th and 99th percentiles, e.g. the p99 latency of a
+      swimmer is that of get_best_swim_for_swimmer),
+    - cache hits and misses for each cache,
+    - HTTP requests, bytes and a latency histogram for each host, and how
+      many requests were hedged and how many of those the hedge won,
+    - counts of each kind of error and of each kind of error entry in the
+      session data,
+    - what the memory budget made the run do (see memory_budget.py).
+The collected data is written as a JSON run report by write_run_report. The
+spans can also be written as collapsed stacks for flamegraph tools, and the
+whole run can be profiled with cProfile.
+
+Recording is a few dictionary updates per call, so it is always on. Memory
+tracing slows the run down and is off unless start_memory_tracing is called.
+It then records the current and peak memory of each memory_stage and the
+lines that allocated the most of it, taken from a tracemalloc snapshot.
+'''
+
+import cProfile
+import json
+import math
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import urlparse
+
+# Upper bounds, in seconds, of the buckets of the HTTP latency histograms.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+# Maximum number of durations kept for the percentiles of each span. Above
+# it, the durations are a uniform sample of all calls.
+MAX_SPAN_SAMPLES = 10000
+
+# Maximum number of error messages kept for the run report.
+MAX_ERROR_LOG_LENGTH = 1000
+
+# Number of allocation sites reported for each memory stage.
+MAX_ALLOCATION_SITES = 10
+
+_lock = threading.Lock()
+_local = threading.local()
+
+run_started_at: float = time.time()
+# { 'function name' : { 'count': int, 'total_seconds': float,
+#                       'max_seconds': float } }
+spans: dict[str, dict] = dict()
+# { 'function name' : [seconds, ...] }
+span_samples: dict[str, list[float]] = dict()
+# { 'outer;inner;innermost' : self seconds }
+collapsed_stacks: dict[str, float] = dict()
+# { 'cache name' : { 'hits': int, 'misses': int } }
+cache_lookups: dict[str, dict[str, int]] = dict()
+# { 'host' : { 'requests': int, ... } }
+http_hosts: dict[str, dict] = dict()
+# { 'kind' : count }
+errors: dict[str, int] = dict()
+error_entries: dict[str, int] = dict()
+error_log: list[str] = []
+# { 'stage' : { 'current_bytes': int, 'peak_bytes': int,
+#               'top_allocations': [ { 'site': 'file:line', 'bytes': int,
+#                                      'count': int }, ... ] } }
+memory_stages: dict[str, dict] = dict()
+# { 'action' : count }
+memory_budget_actions: dict[str, int] = dict()
+
+profiler: cProfile.Profile | None = None
+
+def reset_metrics() -> None:
+    '''
+    Clears all recorded data and restarts the run clock.
+    '''
+    global run_started_at
+    with _lock:
+        run_started_at = time.time()
+        for collection in (spans, span_samples, collapsed_stacks, 
+                           cache_lookups, http_hosts,
+                           errors, error_entries, memory_stages,
+                           memory_budget_actions):
+            collection.clear()
+        error_log.clear()
+
+###############################################################################
+# Spans
+###############################################################################
+
+def _get_span_stack() -> list[list]:
+    '''
+    Returns the span stack of the current thread. Each item is a list with the
+    span name and the time spent in its child spans.
+    '''
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+@contextmanager
+def span(name: str):
+    '''
+    Context manager that records the time spent in the block as a span with
+    the given name.
+    '''
+    stack = _get_span_stack()
+    frame = [name, 0.0]
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        stack_key = ';'.join(item[0] for item in stack)
+        stack.pop()
+        if stack:
+            stack[-1][1] += seconds
+        with _lock:
+            span_data = spans.setdefault(
+                name, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            span_data['count'] += 1
+            span_data['total_seconds'] += seconds
+            span_data['max_seconds'] = max(span_data['max_seconds'], seconds)
+            samples = span_samples.setdefault(name, [])
+            if len(samples) < MAX_SPAN_SAMPLES:
+                samples.append(seconds)
+            else:
+                # reservoir sampling
+                index = random.randrange(span_data['count'])
+                if index < MAX_SPAN_SAMPLES:
+                    samples[index] = seconds
+            collapsed_stacks[stack_key] = (collapsed_stacks.get(stack_key, 0.0)
+                                           + seconds - frame[1])
+
+def traced(function):
+    '''
+    Decorator that records every call of the function as a span named after
+    the function.
+    '''
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with span(function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
+
+###############################################################################
+# Counters
+###############################################################################
+
+def record_cache_lookup(cache_name: str, hit: bool) -> None:
+    '''
+    Counts a hit or a miss in one of the caches.
+    '''
+    with _lock:
+        counts = cache_lookups.setdefault(cache_name, {'hits': 0, 'misses': 0})
+        counts['hits' if hit else 'misses'] += 1
+
+def _get_host_data(url: str) -> dict:
+    '''
+    Returns the recorded data of the host of a URL. Must be called with the
+    lock held.
+    '''
+    return http_hosts.setdefault(urlparse(url).netloc, {
+        'requests': 0,
+        'failed': 0,
+        'bytes_downloaded': 0,
+        'bytes_served': 0,
+        'total_seconds': 0.0,
+        'hedged': 0,
+        'hedge_wins': 0,
+        'sources': dict(),
+        'latency_histogram': [0] * (len(LATENCY_BUCKETS) + 1)
+    })
+
+def record_http_request(url: str, source: str, status: int | None,
+                        num_bytes: int, seconds: float) -> None:
+    '''
+    Records a response GET returned. The source is 'network' for a downloaded
+    response, 'revalidated' for a stored response confirmed by a 304 answer,
+    'fresh' for a stored response served without a request and 'replay' for a
+    response from the HTTP archive. The status is None for a timeout.
+    '''
+    with _lock:
+        host_data = _get_host_data(url)
+        host_data['sources'][source] = host_data['sources'].get(source, 0) + 1
+        if status != 200:
+            host_data['failed'] += 1
+        host_data['bytes_served'] += num_bytes
+        if source not in ('network', 'revalidated'):
+            return
+        host_data['requests'] += 1
+        if source == 'network':
+            host_data['bytes_downloaded'] += num_bytes
+        host_data['total_seconds'] += seconds
+        bucket = len(LATENCY_BUCKETS)
+        for i, upper_bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= upper_bound:
+                bucket = i
+                break
+        host_data['latency_histogram'][bucket] += 1
+
+def record_hedged_request(url: str, hedge_won: bool) -> None:
+    '''
+    Counts a request that was hedged (see hedging.py), and whether the hedged
+    request answered first.
+    '''
+    with _lock:
+        host_data = _get_host_data(url)
+        host_data['hedged'] += 1
+        if hedge_won:
+            host_data['hedge_wins'] += 1
+
+def record_error(kind: str, message: str, debug: bool) -> None:
+    '''
+    Counts an error of the given kind and keeps its message for the run
+    report. The message is also printed if debug is True.
+    '''
+    if debug: print(message)
+    with _lock:
+        errors[kind] = errors.get(kind, 0) + 1
+        if len(error_log) < MAX_ERROR_LOG_LENGTH:
+            error_log.append(message)
+
+def record_error_entry(kind: str) -> None:
+    '''
+    Counts an entry of the session data that ended up with an error.
+    '''
+    with _lock:
+        error_entries[kind] = error_entries.get(kind, 0) + 1
+
+def record_memory_budget_action(action: str, count: int = 1) -> None:
+    '''
+    Counts something the memory budget made the run do, such as evicting
+    cache entries or parsing a page in low-memory mode.
+    '''
+    with _lock:
+        memory_budget_actions[action] = (memory_budget_actions.get(action, 0)
+                                         + count)
+
+def get_span_total_seconds(name: str) -> float:
+    '''
+    Returns the total time recorded for the spans with the given name.
+    '''
+    with _lock:
+        return spans.get(name, {'total_seconds': 0.0})['total_seconds']
+
+def get_totals() -> dict[str, float]:
+    '''
+    Returns the totals over all hosts and caches: the number of HTTP requests
+    and the number of cache hits and misses.
+    '''
+    with _lock:
+        return {
+            'requests': sum(host_data['requests']
+                            for host_data in http_hosts.values()),
+            'cache_hits': sum(counts['hits']
+                              for counts in cache_lookups.values()),
+            'cache_misses': sum(counts['misses']
+                                for counts in cache_lookups.values())
+        }
+
+###############################################################################
+# Profiling
+###############################################################################
+
+def start_profiling() -> None:
+    '''
+    Starts profiling the current thread with cProfile.
+    '''
+    global profiler
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+def stop_profiling(path: str) -> None:
+    '''
+    Stops profiling and writes the cProfile statistics to the given path. They
+    can be read with pstats or tools such as snakeviz.
+    '''
+    global profiler
+    if profiler is None:
+        return
+    profiler.disable()
+    profiler.dump_stats(path)
+    profiler = None
+
+###############################################################################
+# Memory tracing
+###############################################################################
+
+def start_memory_tracing() -> None:
+    '''
+    Starts tracing the memory allocations of the process with tracemalloc.
+    Worker processes of the parse pool are not traced.
+    '''
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def stop_memory_tracing() -> None:
+    '''
+    Stops tracing the memory allocations. The recorded stages are kept for the
+    run report.
+    '''
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def get_top_allocations(snapshot: tracemalloc.Snapshot) -> list[dict]:
+    '''
+    Returns the lines that allocated the most of the memory still in use in a
+    snapshot, leaving out tracemalloc itself.
+    '''
+    snapshot = snapshot.filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),))
+    return [{'site': f'{statistic.traceback[0].filename}:'
+                     f'{statistic.traceback[0].lineno}',
+             'bytes': statistic.size,
+             'count': statistic.count}
+            for statistic in snapshot.statistics('lineno')
+                             [:MAX_ALLOCATION_SITES]]
+
+@contextmanager
+def memory_stage(name: str):
+    '''
+    Context manager that records the memory in use at the end of the block,
+    its peak during the block and the top allocation sites, if memory is being
+    traced. Stages must not be nested, since each one resets the peak.
+    '''
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        top_allocations = get_top_allocations(tracemalloc.take_snapshot())
+        with _lock:
+            memory_stages[name] = {'current_bytes': current_bytes,
+                                   'peak_bytes': peak_bytes,
+                                   'top_allocations': top_allocations}
+
+###############################################################################
+# Run report
+###############################################################################
+
+def get_latency_histogram(counts: list[int]) -> dict[str, int]:
+    '''
+    Labels the buckets of a latency histogram with their upper bounds.
+    '''
+    labels = [f'<={upper_bound}s' for upper_bound in LATENCY_BUCKETS]
+    labels.append(f'>{LATENCY_BUCKETS[-1]}s')
+    return dict(zip(labels, counts))
+
+def get_percentiles(samples: list[float]) -> dict[str, float]:
+    '''
+    Returns the 50th, 95th and 99th percentiles of the durations of a span.
+    '''
+    samples = sorted(samples)
+    return {f'p{percentile}_seconds': 
+                samples[math.ceil(len(samples) * percentile / 100) - 1]
+            for percentile in (50, 95, 99)}
+
+def get_run_report() -> dict:
+    '''
+    Returns all recorded data as a JSON-serializable dictionary.
+    '''
+    with _lock:
+        report = {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S',
+                                        time.localtime(run_started_at)),
+            'wall_seconds': round(time.time() - run_started_at, 3),
+            'spans': {
+                name: {**span_data,
+                       'mean_seconds': span_data['total_seconds'] /
+                                       span_data['count'],
+                       **get_percentiles(span_samples[name])}
+                for name, span_data in spans.items()
+            },
+            'caches': {
+                name: {**counts,
+                       'hit_ratio': counts['hits'] /
+                                    (counts['hits'] + counts['misses'])}
+                for name, counts in cache_lookups.items()
+            },
+            'http': {
+                host: {**host_data,
+                       'latency_histogram': get_latency_histogram(
+                           host_data['latency_histogram'])}
+                for host, host_data in http_hosts.items()
+            },
+            'errors': dict(errors),
+            'error_entries': dict(error_entries),
+            'error_log': list(error_log),
+            'memory': {
+                'peak_bytes': max((stage['peak_bytes'] 
+                                   for stage in memory_stages.values()),
+                                  default=None),
+                'stages': dict(memory_stages),
+                'budget_actions': dict(memory_budget_actions)
+            }
+        }
+    return report
+
+def write_run_report(path: str) -> None:
+    '''
+    Writes the run report to a JSON file.
+    '''
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(get_run_report(), file, indent=4)
+
+def write_collapsed_stacks(path: str) -> None:
+    '''
+    Writes the spans as collapsed stacks ('outer;inner microseconds' per line)
+    which can be turned into a flamegraph with flamegraph.pl or speedscope.
+    '''
+    with _lock:
+        lines = [f'{stack} {int(seconds * 1_000_000)}\n'
+                 for stack, seconds in sorted(collapsed_stacks.items())]
+    with open(path, 'w', encoding='utf-8') as file:
+        file.writelines(lines)
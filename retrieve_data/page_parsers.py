@@ -0,0 +1,131 @@
+'''
+This file contains the parsers of the large LiveTiming pages (the meet results
+and the archive) and the pool of processes they can run in.
+
+Parsing these pages with BeautifulSoup is pure Python work that holds the GIL,
+which stalls the threads waiting for the network while it runs. With the parse
+pool started (start_parse_pool), run_parser sends the raw page bytes to a
+worker process and only plain row texts or a meet index come back, so parsing
+runs on other cores while the requests continue. Without the pool, the parser
+runs in the calling thread.
+
+The parsers are module-level functions of plain bytes, so that they can be
+sent to the worker processes.
+
+When the retrieval is near its memory budget (see memory_budget.py), the
+parsers run in low-memory mode: only the table rows are built into the soup,
+instead of the whole page.
+'''
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+# external libraries
+from bs4 import BeautifulSoup, SoupStrainer
+
+# helper functions
+from retrieve_data.utilities import get_element_text
+from retrieve_data.meet_matcher import build_meet_index
+from retrieve_data.memory_budget import is_memory_budget_near
+from retrieve_data.metrics import record_memory_budget_action
+
+# The worker processes are started fresh instead of forked, since the
+# retrieval may have threads running when the pool starts.
+PARSE_POOL_START_METHOD = 'spawn'
+
+parse_pool: ProcessPoolExecutor | None = None
+
+###############################################################################
+# Parse pool
+###############################################################################
+
+def start_parse_pool(workers: int) -> None:
+    '''
+    Starts a pool of worker processes for run_parser.
+    '''
+    assert workers > 0, 'Number of parse workers must be greater than 0.'
+    global parse_pool
+    stop_parse_pool()
+    parse_pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(PARSE_POOL_START_METHOD))
+
+def stop_parse_pool() -> None:
+    '''
+    Stops the pool of worker processes. Parsers run in the calling thread
+    afterwards.
+    '''
+    global parse_pool
+    if parse_pool is not None:
+        parse_pool.shutdown()
+        parse_pool = None
+
+def run_parser(parser: Callable[[bytes, bool], object], content: bytes):
+    '''
+    Returns the result of a parser for the page content. Runs the parser in
+    the parse pool if it is started, otherwise in the calling thread. The
+    parser runs in low-memory mode if the memory budget is near.
+    '''
+    low_memory = is_memory_budget_near()
+    if low_memory:
+        record_memory_budget_action('low_memory_parses')
+    if parse_pool is None:
+        return parser(content, low_memory)
+    return parse_pool.submit(parser, content, low_memory).result()
+
+###############################################################################
+# Parsers
+###############################################################################
+
+def make_rows_soup(content: bytes, low_memory: bool) -> BeautifulSoup:
+    '''
+    Returns the soup of a page whose table rows are parsed. In low-memory
+    mode, the soup only holds the table rows.
+    '''
+    if low_memory:
+        return BeautifulSoup(content, 'html.parser', 
+                             parse_only=SoupStrainer('tr'))
+    return BeautifulSoup(content, 'html.parser')
+
+def parse_meet_results_rows(content: bytes, 
+                            low_memory: bool = False) -> list[str]:
+    '''
+    Returns the texts of the non-empty table rows of a meet results page.
+    '''
+    meet_results_soup = make_rows_soup(content, low_memory)
+    meet_results_row_texts = []
+    for row in meet_results_soup.find_all('tr'):
+        row_text = get_element_text(row)
+        if row_text != '':
+            meet_results_row_texts.append(row_text)
+    return meet_results_row_texts
+
+def parse_archive_rows(content: bytes, low_memory: bool = False
+                       ) -> list[tuple[str, str, str, str]]:
+    '''
+    Returns (name, date, id, location) for every meet on the LiveTiming
+    archive page.
+    '''
+    livetiming_soup = make_rows_soup(content, low_memory)
+    livetiming_trs = livetiming_soup.find_all('tr')
+    archive_rows = []
+    for row in livetiming_trs[1:]:
+        row_tds = row.find_all('td')
+        name_td = row_tds[0]
+        meet_name = get_element_text(name_td)
+        date_td = row_tds[3]
+        meet_date = get_element_text(date_td)
+        link = name_td.find('a')['href']
+        id = link.split('=')[-1]
+        location_td = row_tds[1]
+        location = get_element_text(location_td)
+        archive_rows.append((meet_name, meet_date, id, location))
+    return archive_rows
+
+def parse_meet_index(content: bytes, low_memory: bool = False) -> dict:
+    '''
+    Returns the meet index (see meet_matcher.build_meet_index) over the meets
+    on the LiveTiming archive page.
+    '''
+    return build_meet_index(parse_archive_rows(content, low_memory))
@@ -0,0 +1,236 @@
+'''
+This file contains the cache priming command. The first run for a new meet is
+the slowest, since the swimmer ID, meet ID/location and meet results caches
+are cold. Priming looks up the best swim of every entry of the meet ahead of
+race day (e.g. overnight), which fills all three caches, so that the run on the
+morning of the meet is nearly all cache hits.
+
+Run from the repository root:
+
+    python -m retrieve_data.prime_cache 7082
+    python -m retrieve_data.prime_cache 7082 --clubs "Västerås SS" "SK Neptun"
+    python -m retrieve_data.prime_cache --clubs "Västerås SS" --pools 25m
+
+The first form primes every entry in every session of the meet, the second
+only the entries of the given clubs. The third needs no meet: it looks up all
+active swimmers of the clubs in Tempus (see get_swimmer_ids_for_club) and
+primes every individual event in the given pools for each of them, which
+takes many more requests than priming the entries of a meet. Requests are rate
+limited on their own (--requests-per-second) so that priming does not hammer
+LiveTiming and Tempus.
+The caches are saved regularly, so an interrupted run keeps what it got.
+Priming fetches the results of whole meets rather than of single events (see
+set_targeted_results), since it looks up many events of the same meets.
+'''
+
+import argparse
+
+# external libraries
+from bs4 import BeautifulSoup
+
+# helper functions
+from retrieve_data.utilities import GET, set_rate_limit
+from retrieve_data.site_urls import livetiming_url, set_base_urls
+from retrieve_data.heat_list import (get_start_list,
+                                     get_session_heat_list_urls,
+                                     is_skipped_event)
+from retrieve_data.retrieve_data import (get_best_swim_for_swimmer,
+                                         get_swimmer_ids_for_club,
+                                         set_targeted_results,
+                                         DEBUG)
+from retrieve_data.event_ids import TEMPUS_EVENT_IDs
+from session_model.session_model import BestSwim
+from retrieve_data.metrics import (reset_metrics,
+                                   record_error,
+                                   get_run_report)
+
+# cache functions
+from cache.swimmer_id_cache import (load_stored_swimmer_id_cache,
+                                    save_swimmer_id_cache,
+                                    get_cached_swimmer_id)
+from cache.meet_id_cache import (load_stored_meet_id_and_location_cache,
+                                 save_meet_id_and_location_cache)
+from cache.meet_results_cache import (load_stored_meet_results_cache,
+                                      save_meet_results_cache)
+from cache.start_list_cache import (load_stored_start_list_cache,
+                                    save_start_list_cache)
+from cache.http_cache import load_stored_http_cache, save_http_cache
+
+# Sessions are looked for from session 1 up to this number, and the first
+# session without any heat lists ends the search.
+MAX_SESSIONS = 20
+
+DEFAULT_REQUESTS_PER_SECOND = 1.0
+
+POOLS = ['25m', '50m']
+
+# Number of primed entries between saves of the caches.
+SAVE_INTERVAL = 50
+
+###############################################################################
+# Helper functions for prime_meet
+###############################################################################
+
+def normalize_club(club: str) -> str:
+    '''
+    Normalizes a club name for comparisons (case and whitespace).
+    '''
+    return ' '.join(club.lower().split())
+
+def get_meet_entries(cid: str) -> list[tuple[str, str, dict[str, str]]]:
+    '''
+    Returns (event name, pool, swimmer data) for every individual entry in all
+    sessions of the meet. Every heat of every event is included.
+    '''
+    entries = []
+    for session in range(1, MAX_SESSIONS + 1):
+        session_url = livetiming_url(f'program.php?'
+                                     f'cid={cid}&session={session}')
+        session_page = GET(session_url, debug=DEBUG)
+        if session_page is None:
+            break
+        session_soup = BeautifulSoup(session_page.content, 'html.parser')
+        heat_list_urls = get_session_heat_list_urls(session_soup)
+        if heat_list_urls == []:
+            break
+        for _, heat_list_url in heat_list_urls:
+            heat_list_page = GET(heat_list_url, debug=DEBUG)
+            if heat_list_page is None:
+                record_error('heat_list_page',
+                             f'Error getting event heat list page: '
+                             f'{heat_list_url}', debug=DEBUG)
+                continue
+            start_list = get_start_list(heat_list_url,
+                                        heat_list_page.content)
+            if start_list is None or is_skipped_event(start_list.event_name):
+                continue
+            for heat in start_list.heats:
+                for entry in heat.entries:
+                    entries.append((start_list.event_name, start_list.pool,
+                                    entry.get_swimmer_data()))
+        print(f'Session {session}: {len(heat_list_urls)} events, '
+              f'{len(entries)} entries so far.')
+    return entries
+
+def get_club_entries(clubs: list[str], pools: list[str]
+                     ) -> list[tuple[str, str, dict[str, str]]]:
+    '''
+    Returns (event name, pool, swimmer data) for every individual event in
+    the given pools and every active swimmer of the clubs in Tempus.
+    '''
+    events = []
+    for event_name_with_pool in TEMPUS_EVENT_IDs:
+        event_name, pool = event_name_with_pool.split(' (')
+        pool = pool.rstrip(')')
+        if pool in pools and not is_skipped_event(event_name):
+            events.append((event_name, pool))
+    entries = []
+    for club in clubs:
+        swimmers = get_swimmer_ids_for_club(club)
+        for swimmer_data in swimmers:
+            for event_name, pool in events:
+                entries.append((event_name, pool, swimmer_data))
+        print(f'{club}: {len(swimmers)} swimmers, {len(entries)} entries '
+              'so far.')
+    return entries
+
+def save_caches() -> None:
+    '''
+    Saves all caches to their files.
+    '''
+    save_swimmer_id_cache()
+    save_meet_id_and_location_cache()
+    save_meet_results_cache()
+    save_start_list_cache()
+    save_http_cache()
+
+def print_coverage(entries: list, best_swims: list[BestSwim]) -> None:
+    '''
+    Prints how much of the entries is covered by the caches after priming.
+    '''
+    swimmers = {(swimmer_data['name'], swimmer_data['born'],
+                 swimmer_data['club']): swimmer_data
+                for _, _, swimmer_data in entries}
+    cached_ids = sum(1 for swimmer_data in swimmers.values()
+                     if get_cached_swimmer_id(swimmer_data) is not None)
+    with_splits = sum(1 for best_swim in best_swims 
+                      if best_swim.splits is not None)
+    report = get_run_report()
+    print(f'\nPrimed {len(best_swims)} of {len(entries)} entries.')
+    print(f'  Swimmer IDs cached:  {cached_ids} of {len(swimmers)} swimmers')
+    print(f'  Complete best swims: {with_splits} of {len(best_swims)} entries')
+    for kind, count in sorted(report['error_entries'].items()):
+        print(f'  {kind}: {count}')
+    print('Cache lookups while priming (hits / misses):')
+    for cache_name, counts in report['caches'].items():
+        print(f'  {cache_name}: {counts["hits"]} / {counts["misses"]}')
+
+###############################################################################
+
+def prime_meet(cid: str | None, clubs: list[str] | None,
+               pools: list[str] = POOLS) -> None:
+    '''
+    Looks up the best swim of every entry of the meet, or of the entries of
+    the given clubs, to fill the caches. Without a meet, looks up the best
+    swims of the swimmers of the clubs in every event of the pools instead.
+    Prints the coverage at the end.
+    '''
+    reset_metrics()
+    set_targeted_results(False)
+    load_stored_swimmer_id_cache()
+    load_stored_meet_id_and_location_cache()
+    load_stored_meet_results_cache()
+    load_stored_start_list_cache()
+    load_stored_http_cache()
+    if cid is None:
+        entries = get_club_entries(clubs, pools)
+    else:
+        entries = get_meet_entries(cid)
+    if cid is not None and clubs is not None:
+        club_names = {normalize_club(club) for club in clubs}
+        entries = [entry for entry in entries
+                   if normalize_club(entry[2]['club']) in club_names]
+    best_swims = []
+    try:
+        for event_name, pool, swimmer_data in entries:
+            best_swims.append(
+                get_best_swim_for_swimmer(swimmer_data, event_name, pool))
+            if len(best_swims) % SAVE_INTERVAL == 0:
+                save_caches()
+                print(f'Primed {len(best_swims)} of {len(entries)} entries.')
+    except KeyboardInterrupt:
+        print('\nInterrupted.')
+    save_caches()
+    print_coverage(entries, best_swims)
+
+def main() -> None:
+    '''
+    Parses the command line arguments and primes the caches.
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('cid', nargs='?',
+                        help='LiveTiming meet id, leave out to prime all '
+                             'swimmers of --clubs')
+    parser.add_argument('--clubs', nargs='+',
+                        help='only prime the entries of these clubs')
+    parser.add_argument('--pools', nargs='+', choices=POOLS, default=POOLS,
+                        help='pools of the events primed without a meet id')
+    parser.add_argument('--requests-per-second', type=float,
+                        default=DEFAULT_REQUESTS_PER_SECOND,
+                        help='rate limit for requests to LiveTiming and '
+                             'Tempus')
+    parser.add_argument('--livetiming-base-url', metavar='URL',
+                        help='LiveTiming server, e.g. the local emulator')
+    parser.add_argument('--tempus-base-url', metavar='URL',
+                        help='Tempus server, e.g. the local emulator')
+    args = parser.parse_args()
+    if args.cid is None and args.clubs is None:
+        parser.error('give a meet id, --clubs or both')
+    if args.requests_per_second <= 0:
+        parser.error('--requests-per-second must be greater than 0')
+    set_rate_limit(args.requests_per_second)
+    set_base_urls(args.livetiming_base_url, args.tempus_base_url)
+    prime_meet(args.cid, args.clubs, args.pools)
+
+if __name__ == '__main__':
+    main()
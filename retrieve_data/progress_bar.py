@@ -1,78 +1,158 @@
 '''
 This file contains the ProgressBar class that can be used to display a progress
-bar in the terminal. 
+bar in the terminal.
 '''
 
+import time
+
+from retrieve_data.metrics import get_totals
+
+# Seconds after the start before the rates and the ETA are shown. Before that,
+# they are a few requests over a near-zero time, and shown as '-'.
+MIN_RATE_SECONDS = 1.0
+
 class ProgressBar:
-    def __init__(self, bar_length: int, debug: bool) -> None:
+    def __init__(self, bar_length: int, debug: bool,
+                 max_redraws_per_second: float = 4) -> None:
         '''
         Initializes a ProgressBar object with the given bar length. The bar
-        length is the number of characters the bar will be displayed with. It 
-        must be greater than 0. Calls the _draw method to display the empty
-        progress bar.
+        length is the number of characters the bar will be displayed with. It
+        must be greater than 0. The bar is redrawn at most
+        max_redraws_per_second times per second, except for the final draw.
+        Calls the _draw method to display the empty progress bar.
+
+        Progress is counted in swimmers processed. The total number of
+        swimmers is only known for the heats that have been reached, so the
+        rest is estimated from the average number of swimmers per heat and
+        heats per event seen so far.
         '''
         assert bar_length > 0, 'Bar length must be greater than 0.'
         self.bar_length = bar_length
-        self.start_event = 0
-        self.num_events = None
-        self.curr_event = 0
-        self.num_heats = None
-        self.curr_heat = 0
+        self.min_redraw_interval = 1 / max_redraws_per_second
         self.debug = debug
-        self._draw(0)
-    
+        self.num_events = None
+        self.events_done = 0
+        self.events_started = 0
+        self.heats_in_events_started = 0
+        self.event_heats = 0
+        self.event_heats_started = 0
+        self.heats_started = 0
+        self.swimmers_added = 0
+        self.swimmers_done = 0
+        self.start_time = time.perf_counter()
+        self.last_draw_time = None
+        self._draw(force=True)
+
     def set_num_events(self, num_events: int) -> None:
         '''
-        Sets the number of events. It must be greater than 0.
+        Sets the number of events and restarts the clock the rates are
+        measured with. It must be greater than 0.
         '''
         assert num_events > 0, 'Number of events must be greater than 0.'
         self.num_events = num_events
-    
+        self.start_time = time.perf_counter()
+
     def update_event(self, event: int) -> None:
         '''
-        Updates the current event number.
+        Marks the current event as done. Calls the _draw method to display the
+        updated bar, which is final after the last event.
         '''
-        self.curr_event += 1
-        self.curr_heat = 1
-        filled_up_length = self.bar_length * (self.curr_event / 
-                                              self.num_events)
-        self._draw(filled_up_length)
+        self.events_done += 1
+        self.event_heats = self.event_heats_started = 0
+        self._draw(force=self.events_done == self.num_events)
 
     def set_num_heats(self, num_heats: int) -> None:
         '''
-        Sets the number of heats. It must be greater than 0.
+        Sets the number of heats that will be processed in the current event.
+        It must be greater than 0.
         '''
         assert num_heats > 0, 'Number of heats must be greater than 0.'
-        self.num_heats = num_heats
+        self.events_started += 1
+        self.heats_in_events_started += num_heats
+        self.event_heats = num_heats
+        self.event_heats_started = 0
 
-    def update_heat(self, heat: int) -> None:
-        '''
-        Updates the current heat number. The heat number must be greater than 0
-        and less than or equal to the number of heats. Calls the _draw method
-        to display the updated bar.
-        '''
-        assert 0 < heat <= self.num_heats, 'Heat number must be in range.'
-        self.curr_heat = heat
-        event_filled_up_length = self.bar_length * (self.curr_event / 
-                                                    self.num_events)
-        one_event_length = self.bar_length / self.num_events
-        heat_filled_up_length = one_event_length * (self.curr_heat / 
-                                                    self.num_heats)
-        filled_up_length = event_filled_up_length + heat_filled_up_length
-        self._draw(filled_up_length)
+    def add_swimmers(self, num_swimmers: int) -> None:
+        '''
+        Starts a heat with the given number of swimmers to process.
+        '''
+        self.heats_started += 1
+        self.event_heats_started += 1
+        self.swimmers_added += num_swimmers
+        self._draw()
 
-    def _draw(self, filled_up_length: float) -> None:
+    def update_swimmer(self) -> None:
         '''
-        Internal method to draw the progress bar with the given filled up 
-        length.
+        Marks one more swimmer as processed and calls the _draw method.
         '''
-        percentage = round(100 * filled_up_length / self.bar_length, 1)
-        filled_up_length = int(filled_up_length)
-        bar = ("#" * filled_up_length + 
+        self.swimmers_done += 1
+        self._draw()
+
+    def estimated_total_swimmers(self) -> float:
+        '''
+        Returns the number of swimmers added so far plus an estimate for the
+        heats and events that have not been reached yet.
+        '''
+        if self.heats_started == 0 or self.num_events is None:
+            return self.swimmers_added
+        swimmers_per_heat = self.swimmers_added / self.heats_started
+        heats_per_event = self.heats_in_events_started / self.events_started
+        remaining_heats = (
+            max(self.event_heats - self.event_heats_started, 0) +
+            heats_per_event * max(self.num_events - self.events_started, 0))
+        return self.swimmers_added + swimmers_per_heat * remaining_heats
+
+    def _draw(self, force: bool = False) -> None:
+        '''
+        Internal method to draw the progress bar. Skips the draw if the last
+        one was less than the minimum redraw interval ago, unless force is
+        True.
+        '''
+        now = time.perf_counter()
+        if (not force and self.last_draw_time is not None and
+            now - self.last_draw_time < self.min_redraw_interval):
+            return
+        self.last_draw_time = now
+
+        finished = (self.num_events is not None and 
+                    self.events_done == self.num_events)
+        if finished:
+            fraction = 1.0
+        else:
+            total = self.estimated_total_swimmers()
+            fraction = self.swimmers_done / total if total > 0 else 0.0
+            # only the last event finishes the bar
+            fraction = min(fraction, 0.999)
+        percentage = round(100 * fraction, 1)
+        filled_up_length = int(self.bar_length * fraction)
+        bar = ("#" * filled_up_length +
                "." * (self.bar_length - filled_up_length))
+
+        elapsed = max(now - self.start_time, 1e-9)
+        totals = get_totals()
+        lookups = totals['cache_hits'] + totals['cache_misses']
+        hit_ratio = totals['cache_hits'] / lookups if lookups > 0 else 0.0
+        swimmers_per_second = self.swimmers_done / elapsed
+        show_rates = finished or elapsed >= MIN_RATE_SECONDS
+        if finished:
+            eta = 'done'
+        elif show_rates and swimmers_per_second > 0:
+            remaining = (self.estimated_total_swimmers() -
+                         self.swimmers_done) / swimmers_per_second
+            eta = f'ETA {int(remaining // 60)}:{int(remaining % 60):02d}'
+        else:
+            eta = 'ETA -:--'
+        if show_rates:
+            swimmer_rate = f'{swimmers_per_second:.1f}'
+            request_rate = f'{totals["requests"] / elapsed:.1f}'
+        else:
+            swimmer_rate = request_rate = '-'
+        line = (f'[{bar}] {percentage}% | {self.swimmers_done} swimmers | '
+                f'{swimmer_rate} swimmers/s | {request_rate} req/s | '
+                f'cache {round(100 * hit_ratio)}% | {eta}')
         if self.debug:
-            print(f'[{bar}] {percentage}%', end='\n')
+            print(line, end='\n')
         else:
-            print(f'[{bar}] {percentage}%', end='\r')
-        if percentage == 100:
+            print(line.ljust(self.bar_length + 90), end='\r')
+        if finished:
             print()
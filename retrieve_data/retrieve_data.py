@@ -1,8 +1,11 @@
 '''
 This file contains the main call chain for retrieving data from LiveTiming and
 Tempus. The main function is retrieve_data, which takes a session url and the
-number of heats to consider, and returns a dictionary with the meet name, 
-session number, and the best swims for the session. 
+number of heats to consider, and returns the session (see session_model.py)
+with the meet name, session number, and the best swims of its events. 
+
+With a deadline set (see deadline.py), the splits and then the earliest heats
+of each event are skipped as the budget runs out.
 
 The main call chain is as follows:
 
@@ -37,10 +40,16 @@ get_best_swim_for_swimmer
  |  |  iterates:  no
  |  |
  |  +--> get_swimmer_id 
- |  |      called:    1 time
- |  |      cached:    yes
- |  |      request:   GET to Tempus
- |  |      iterates:  no
+ |  |   |  called:    1 time
+ |  |   |  cached:    yes
+ |  |   |  request:   GET to Tempus (fallback)
+ |  |   |  iterates:  no
+ |  |   |
+ |  |   +--> get_swimmer_ids_for_club
+ |  |          called:    once per club on a cache miss
+ |  |          cached:    yes (fills the cache for the whole club)
+ |  |          request:   GET to Tempus
+ |  |          iterates:  through the pages of the club's swimmers
  |  |
  |  +--> get_event_id
  |  |      called:    1 time
@@ -57,8 +66,8 @@ get_best_swim_for_swimmer
  |  +--> get_meet_id_and_location
  |         called:    1 time
  |         cached:    yes
- |         request:   GET to LiveTiming
- |         iterates:  through all meets in LiveTiming
+ |         request:   GET to LiveTiming (once per run)
+ |         iterates:  no (looks up the index over all meets in LiveTiming)
  V
 get_splits_from_meet
  |  |  called:    1 time
@@ -66,11 +75,23 @@ get_splits_from_meet
  |  |  request:   none
  |  |  iterates:  through all results of the meet
  |  |
- |  +--> get_meet_results
- |         called:    1 time
- |         cached:    yes
- |         request:   GET to LiveTiming
- |         iterates:  no
+ |  +--> get_event_results
+ |      |  called:    1 time
+ |      |  cached:    yes (the results of the event, or of the whole meet)
+ |      |  request:   GET to LiveTiming for each edition of the event
+ |      |  iterates:  through the editions of the event in the meet program
+ |      |
+ |      +--> get_meet_program
+ |      |      called:    1 time
+ |      |      cached:    yes (in memory, once per meet)
+ |      |      request:   GET to LiveTiming for each session of the meet
+ |      |      iterates:  through the sessions of the meet
+ |      |
+ |      +--> get_meet_results
+ |             called:    if the event can not be fetched on its own
+ |             cached:    yes
+ |             request:   GET to LiveTiming
+ |             iterates:  no
  V
 get_splits_from_event_edition
  |  called:    num. matching_event_editions_in_meet times
@@ -85,9 +106,13 @@ get_splits_from_swim
     iterates:  through the row texts of a swim and the splits on that row
 '''
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from urllib.parse import quote
+
 # external libraries
 from bs4 import BeautifulSoup
-from urllib.parse import quote
 
 # helper functions
 from retrieve_data.utilities import (GET,
@@ -95,12 +120,45 @@ from retrieve_data.utilities import (GET,
                                      fastest_swim,
                                      get_fifty_results,
                                      final_time,
-                                     avg50,
-                                     time_function)
-from retrieve_data.meet_matcher import meet_names_match
+                                     avg50)
+from retrieve_data.meet_matcher import find_meet
+from retrieve_data.page_parsers import (run_parser,
+                                        parse_meet_results_rows,
+                                        parse_meet_index)
 from retrieve_data.event_matcher import is_correct_event
 from retrieve_data.event_ids import TEMPUS_EVENT_IDs
+from retrieve_data.heat_list import (StartListEntry,
+                                     get_start_list,
+                                     get_last_start_list,
+                                     is_skipped_event)
 from retrieve_data.progress_bar import ProgressBar
+from retrieve_data.deadline import (LEVEL_SKIP_SPLITS,
+                                    LEVEL_SKIP_HEATS,
+                                    LEVEL_SKIP_ALL,
+                                    get_degradation_level,
+                                    set_work_total,
+                                    set_work_unit_progress,
+                                    finish_work_unit)
+from retrieve_data.memory_budget import enforce_memory_budget
+from retrieve_data.site_urls import (livetiming_url,
+                                     tempus_url,
+                                     get_livetiming_host,
+                                     get_tempus_host)
+from retrieve_data.circuit_breaker import (is_host_unavailable,
+                                           reset_circuit_breakers)
+from session_model.session_model import (Session,
+                                         Event,
+                                         Heat,
+                                         LaneEntry,
+                                         BestSwim)
+from retrieve_data.metrics import (traced,
+                                   span,
+                                   memory_stage,
+                                   reset_metrics,
+                                   get_span_total_seconds,
+                                   record_cache_lookup,
+                                   record_error,
+                                   record_error_entry)
 
 # cache functions
 from cache.swimmer_id_cache import (load_stored_swimmer_id_cache, 
@@ -113,25 +171,71 @@ from cache.meet_id_cache import (load_stored_meet_id_and_location_cache,
                                  add_meet_id_and_location_to_cache)
 from cache.meet_results_cache import (load_stored_meet_results_cache,
                                       save_meet_results_cache,
+                                      get_event_results_key,
                                       get_cached_meet_results,
                                       add_meet_results_to_cache)
+from cache.start_list_cache import (load_stored_start_list_cache,
+                                    save_start_list_cache)
+from cache.meet_program_cache import (load_stored_meet_program_cache,
+                                      save_meet_program_cache,
+                                      get_cached_meet_program,
+                                      add_meet_program_to_cache)
+from cache.http_cache import load_stored_http_cache, save_http_cache
 
 
 ###############################################################################
 ### Debugging
 
-# Set DEBUG to True to print debug messages
+# Set DEBUG to True to print error messages as they are recorded
 DEBUG = False
 
-def debug_print(*args): 
-    if DEBUG: print(*args)
+###############################################################################
+
 
 ###############################################################################
+### Targeted results
+
+# Set to False to always get the results of the whole meet (results.php with
+# session=0 and all=1) instead of only the pages of the needed event. The whole
+# meet is also the fallback when the event pages can not be found.
+targeted_results = True
 
+# Number of sessions of a meet whose programs are searched for an event.
+MAX_MEET_SESSIONS = 20
+
+def set_targeted_results(enabled: bool) -> None:
+    '''
+    Sets whether only the results of the needed event are fetched, or those of
+    the whole meet, which fills the cache in bulk.
+    '''
+    global targeted_results
+    targeted_results = enabled
 
 ###############################################################################
-### Initialize progress bar
-progress_bar = ProgressBar(bar_length=50, debug=DEBUG)
+
+
+###############################################################################
+### Progress bar and concurrency
+
+# The progress bar of the current run, created by get_meet_and_session_data
+progress_bar: ProgressBar | None = None
+
+# Number of swimmers in a heat whose best swims are looked up at the same time
+swimmer_concurrency = 1
+
+# The thread pool the swimmers are looked up in when swimmer_concurrency is
+# above 1, shared by the whole session so that its threads are started once
+swimmer_executor: ThreadPoolExecutor | None = None
+
+def set_concurrency(workers: int) -> None:
+    '''
+    Sets the number of swimmers in a heat that are looked up concurrently.
+    1 looks up one swimmer at a time.
+    '''
+    assert workers > 0, 'Concurrency must be at least 1.'
+    global swimmer_concurrency
+    swimmer_concurrency = workers
+
 ###############################################################################
 
 
@@ -139,6 +243,94 @@ progress_bar = ProgressBar(bar_length=50, debug=DEBUG)
 # Helper functions for get_best_swim_for_swimmer
 ###############################################################################
 
+# Clubs whose swimmers have been looked up in bulk during this run
+bulk_resolved_clubs: set[str] = set()
+# one lock per club, held while the club is looked up in bulk, so that
+# concurrent lookups of swimmers of the same club wait for it instead of
+# repeating it, while other clubs are looked up at the same time
+bulk_lookup_locks: dict[str, threading.Lock] = dict()
+bulk_lookup_locks_lock = threading.Lock()
+
+# Maximum number of swimmer grid pages walked for one club.
+MAX_SWIMMER_GRID_PAGES = 50
+
+# Header texts of the Tempus swimmer grid columns used by the bulk lookup.
+SWIMMER_GRID_HEADERS = {
+    'first_name': 'förnamn',
+    'last_name': 'efternamn',
+    'born': 'född',
+    'club': 'klubb'
+}
+
+@traced
+def get_swimmer_ids_for_club(club: str) -> list[dict[str, str]]:
+    '''
+    Adds the Tempus ids of all active swimmers of a club to the swimmer id
+    cache and returns the swimmer data of the swimmers found. Searches the
+    Tempus swimmer grid by club only and walks its pages, so a whole club takes
+    a few requests instead of one per swimmer. Rows from other clubs matching
+    the search are skipped.
+
+    The cache keys are built from the club name as given (the one in the start
+    lists), so that get_cached_swimmer_id finds them.
+    '''
+    bulk_resolved_clubs.add(club)
+    found_swimmers = []
+    seen_ids = set()
+    for page in range(1, MAX_SWIMMER_GRID_PAGES + 1):
+        grid_url = tempus_url(f'index.php?r=swimmer%2Findex'
+                              f'&Swimmer%5Bswimmer_club%5D={quote(club)}'
+                              f'&Swimmer%5BsearchChoice%5D=1'
+                              f'&Swimmer%5Bclass%5D=99'
+                              f'&Swimmer%5Bis_active%5D=1'
+                              f'&Swimmer_page={page}'
+                              f'&ajax=swimmer-grid')
+        response = GET(grid_url, debug=DEBUG)
+        if response is None:
+            record_error('swimmer_grid_page',
+                         f'Error getting Tempus swimmer grid page: '
+                         f'{grid_url}.', debug=DEBUG)
+            break
+        response_soup = BeautifulSoup(response.content, 'html.parser')
+        headers = [get_element_text(th).lower() 
+                   for th in response_soup.find_all('th')]
+        columns = {key: headers.index(header) 
+                   for key, header in SWIMMER_GRID_HEADERS.items()
+                   if header in headers}
+        if not {'first_name', 'last_name', 'born'}.issubset(columns):
+            record_error('swimmer_grid_page',
+                         f'Unexpected Tempus swimmer grid columns: '
+                         f'{headers}.', debug=DEBUG)
+            break
+        new_ids_on_page = False
+        for row in response_soup.find_all('tr')[1:]:
+            link = row.find('a')
+            tds = row.find_all('td')
+            if link is None or len(tds) < len(headers):
+                continue
+            id = link['href'].split('id=')[-1]
+            if id in seen_ids:
+                continue
+            seen_ids.add(id)
+            new_ids_on_page = True
+            texts = [get_element_text(td) for td in tds]
+            if ('club' in columns and 
+                texts[columns['club']].lower() != club.lower()):
+                continue
+            swimmer_data = {
+                'name': (f'{texts[columns["first_name"]]} '
+                         f'{texts[columns["last_name"]]}'),
+                'born': texts[columns['born']][:4],
+                'club': club
+            }
+            add_swimmer_id_to_cache(swimmer_data, id)
+            found_swimmers.append(swimmer_data)
+        # the last page repeats or has no swimmers
+        if not new_ids_on_page:
+            break
+    return found_swimmers
+
+@traced
 def get_swimmer_id(swimmer_data: dict[str, str]) -> str | None:
     '''
     Returns the Tempus id of a swimmer. The swimmer data should be a dictionary
@@ -146,27 +338,41 @@ def get_swimmer_id(swimmer_data: dict[str, str]) -> str | None:
     'First Last' and born should be in the format 'YYYY'.
 
     If the swimmer is in the cache, their id is returned immediately. Otherwise,
-    a GET request is made to Tempus to search for the swimmer. If the swimmer is
+    all swimmers of their club are looked up in bulk, once per run, with
+    get_swimmer_ids_for_club. Only if that does not find the swimmer, a GET 
+    request is made to Tempus to search for the swimmer. If the swimmer is
     found, their id is added to the cache and returned. If the swimmer is not
     found, None is returned.
     '''
     cached_id = get_cached_swimmer_id(swimmer_data)
+    record_cache_lookup('swimmer_id', cached_id is not None)
+    if cached_id is not None:
+        return cached_id
+    with bulk_lookup_locks_lock:
+        lock = bulk_lookup_locks.setdefault(swimmer_data['club'],
+                                            threading.Lock())
+    with lock:
+        if swimmer_data['club'] not in bulk_resolved_clubs:
+            get_swimmer_ids_for_club(swimmer_data['club'])
+    cached_id = get_cached_swimmer_id(swimmer_data)
     if cached_id is not None:
         return cached_id
     first_name = quote(swimmer_data['name'].split(' ')[0])
     last_name = quote(' '.join(swimmer_data['name'].split(' ')[1:]))
     club = quote(swimmer_data['club'])
-    form_url = (f'https://www.tempusopen.se/index.php?r=swimmer%2Findex'
-                f'&Swimmer%5Bfirst_name%5D={first_name}'
-                f'&Swimmer%5Blast_name%5D={last_name}'
-                f'&Swimmer%5Bswimmer_club%5D={club}'
-                f'&Swimmer%5BsearchChoice%5D=1'
-                f'&Swimmer%5Bclass%5D=99'
-                f'&Swimmer%5Bis_active%5D=1'
-                f'&ajax=swimmer-grid')
+    form_url = tempus_url(f'index.php?r=swimmer%2Findex'
+                          f'&Swimmer%5Bfirst_name%5D={first_name}'
+                          f'&Swimmer%5Blast_name%5D={last_name}'
+                          f'&Swimmer%5Bswimmer_club%5D={club}'
+                          f'&Swimmer%5BsearchChoice%5D=1'
+                          f'&Swimmer%5Bclass%5D=99'
+                          f'&Swimmer%5Bis_active%5D=1'
+                          f'&ajax=swimmer-grid')
     response = GET(form_url, debug=DEBUG)
     if response is None:
-        debug_print(f'Error getting Tempus swimmer search page: {form_url}.')
+        record_error('swimmer_search_page', 
+                     f'Error getting Tempus swimmer search page: {form_url}.',
+                     debug=DEBUG)
         return None
     response_soup = BeautifulSoup(response.content, 'html.parser')
     first_row = response_soup.find_all('tr')[1]
@@ -186,11 +392,13 @@ def get_event_id(event_name: str, pool: str) -> str | None:
     '''
     event_name_with_pool = f'{event_name} ({pool})'.lower()
     if event_name_with_pool not in TEMPUS_EVENT_IDs:
-        debug_print(f'Error: Event name not found in TEMPUS_EVENT_IDs: '
-                    f'{event_name_with_pool}.')
+        record_error('event_id', 
+                     f'Error: Event name not found in TEMPUS_EVENT_IDs: '
+                     f'{event_name_with_pool}.', debug=DEBUG)
         return None
     return TEMPUS_EVENT_IDs[event_name_with_pool]
 
+@traced
 def get_meet_name_and_date(swimmer_id: str, event_id: str
                            ) -> tuple[str, str, str] | None:
     '''
@@ -198,11 +406,13 @@ def get_meet_name_and_date(swimmer_id: str, event_id: str
     best. This function makes a GET request to Tempus. It also return the time
     of the swim as a backup time in case the LiveTiming results are not found.
     '''
-    tempus_url = (f'https://www.tempusopen.se/index.php?r=swimmer/'
-                  f'distance&id={swimmer_id}&event={event_id}')
-    tempus_page = GET(tempus_url, debug=DEBUG)
+    personal_best_url = tempus_url(f'index.php?r=swimmer/distance'
+                                   f'&id={swimmer_id}&event={event_id}')
+    tempus_page = GET(personal_best_url, debug=DEBUG)
     if tempus_page is None:
-        debug_print(f'Error getting Tempus personal best page {tempus_url}.')
+        record_error('personal_best_page',
+                     f'Error getting Tempus personal best page '
+                     f'{personal_best_url}.', debug=DEBUG)
         return None
     tempus_soup = BeautifulSoup(tempus_page.content, 'html.parser')
     tempus_trs = tempus_soup.find_all('tr')
@@ -216,72 +426,220 @@ def get_meet_name_and_date(swimmer_id: str, event_id: str
     backup_time = backup_time.removeprefix('00:').removeprefix('0')
     return name, date, backup_time
 
+# Index over the meets of the LiveTiming archive, built once per run on the
+# first meet id cache miss (see meet_matcher.build_meet_index)
+meet_index: dict | None = None
+meet_index_lock = threading.Lock()
+
+@traced
+def get_meet_index() -> dict | None:
+    '''
+    Returns the index over the LiveTiming archive. Makes a GET request to
+    LiveTiming and builds the index the first time it is called in a run, in 
+    the parse pool if it is started (see page_parsers.py).
+    '''
+    global meet_index
+    with meet_index_lock:
+        if meet_index is not None:
+            return meet_index
+        # note: 6444 is an arbitrary id and just used to get the page
+        archive_url = livetiming_url('archive.php?cid=6644')
+        livetiming_page = GET(archive_url, debug=DEBUG)
+        if livetiming_page is None:
+            record_error('archive_page', 
+                         f'Error getting LiveTiming all meets page: '
+                         f'{archive_url}.', debug=DEBUG)
+            return None
+        meet_index = run_parser(parse_meet_index, livetiming_page.content)
+        return meet_index
+
+@traced
 def get_meet_id_and_location(name: str, 
                              date:str) -> tuple[str, str] | None:
     '''
     Returns the LiveTiming id and location of a meet by its name. 
 
     If the meet is in the cache, its id and location are returned immediately.
-    Otherwise, a GET request is made to LiveTiming to search for the meet. If
-    the meet is found, its id and location are added to the cache and returned.
-    If the meet is not found, None, None is returned.
+    Otherwise, the meet is looked up in the index over the LiveTiming archive,
+    which is fetched once per run. If the meet is found, also as a near match,
+    its id and location are added to the cache and returned. If the meet is
+    not found, None is returned.
     '''
     cached_id_and_location = get_cached_meet_id_and_location(name)
+    record_cache_lookup('meet_id_and_location', 
+                        cached_id_and_location is not None)
     if cached_id_and_location is not None:
         return cached_id_and_location
-    # note: 6444 is an arbitrary id and just used to get the page
-    livetiming_url = 'https://www.livetiming.se/archive.php?cid=6644'
-    livetiming_page = GET(livetiming_url, debug=DEBUG)
-    if livetiming_page is None:
-        debug_print(f'Error getting LiveTiming all meets page: '
-                    f'{livetiming_url}.')
+    index = get_meet_index()
+    if index is None:
         return None
-    livetiming_soup = BeautifulSoup(livetiming_page.content, 'html.parser')
-    livetiming_trs = livetiming_soup.find_all('tr')
-    for row in livetiming_trs[1:]:
-        row_tds = row.find_all('td')
-        name_td = row_tds[0]
-        meet_name = get_element_text(name_td)
-        date_td = row_tds[3]
-        meet_date = get_element_text(date_td)
-        if meet_names_match(name, date, meet_name, meet_date):
-            link = name_td.find('a')['href']
-            id = link.split('=')[-1]
-            location_td = row_tds[1]
-            location = get_element_text(location_td)
-            add_meet_id_and_location_to_cache(name, id, location)
-            return id, location
-    return None
+    archive_row = find_meet(index, name, date)
+    if archive_row is None:
+        return None
+    _, _, id, location = archive_row
+    add_meet_id_and_location_to_cache(name, id, location)
+    return id, location
 
 ###############################################################################
-# Helper function for get_splits_from_meet
+# Helper functions for get_splits_from_meet
 ###############################################################################
 
+@traced
 def get_meet_results(meet_id: str) -> list[str] | None:
     '''
     Returns the table row texts of the results of a meet. If the meet is in the
     cache, its results are returned immediately. Otherwise, a GET request is
-    made to LiveTiming to get the meet results. The results are then added to
-    the cache.
+    made to LiveTiming to get the meet results, which are parsed in the parse
+    pool if it is started (see page_parsers.py). The results are then added 
+    to the cache, which evicts meet results from memory if the memory budget
+    is near (see memory_budget.py).
     '''
     cached_results = get_cached_meet_results(meet_id)
+    record_cache_lookup('meet_results', cached_results is not None)
     if cached_results is not None:
         return cached_results
-    meet_results_url = (f'https://www.livetiming.se/results.php?'
-                        f'cid={meet_id}&session=0&all=1')
+    meet_results_url = livetiming_url(f'results.php?'
+                                      f'cid={meet_id}&session=0&all=1')
     meet_results_page = GET(meet_results_url, debug=DEBUG)
     if meet_results_page is None:
-        debug_print(f'Error getting LiveTiming meet results page: '
-                    f'{meet_results_url}.')
+        record_error('meet_results_page',
+                     f'Error getting LiveTiming meet results page: '
+                     f'{meet_results_url}.', debug=DEBUG)
         return None
-    meet_results_soup = BeautifulSoup(meet_results_page.content, 'html.parser')
-    meet_results_trs = meet_results_soup.find_all('tr')
-    meet_results_row_texts = [get_element_text(row) 
-                              for row in meet_results_trs
-                              if get_element_text(row) != '']
+    meet_results_row_texts = run_parser(parse_meet_results_rows,
+                                        meet_results_page.content)
     add_meet_results_to_cache(meet_id, meet_results_row_texts)
+    enforce_memory_budget()
     return meet_results_row_texts
 
+# one lock per meet, so that each program is only fetched once
+meet_program_locks: dict[str, threading.Lock] = dict()
+meet_program_locks_lock = threading.Lock()
+
+@traced
+def get_meet_program(meet_id: str) -> list[tuple[int, str, list[str]]] | None:
+    '''
+    Returns (session, event number, cell texts of the program row) for every
+    event in the session programs of a meet. Makes a GET request to
+    LiveTiming for each session, until a session without events, if the meet
+    is not in the meet program cache. Returns None if no program was found.
+
+    The programs are only cached when every session was retrieved, so that a
+    failed request does not leave the later sessions out for good. All
+    sessions are needed, since the final of an event is usually in a later
+    session than its heats.
+    '''
+    with meet_program_locks_lock:
+        lock = meet_program_locks.setdefault(meet_id, threading.Lock())
+    with lock:
+        cached_program = get_cached_meet_program(meet_id)
+        record_cache_lookup('meet_program', cached_program is not None)
+        if cached_program is not None:
+            return cached_program
+        program = []
+        complete = True
+        for session in range(1, MAX_MEET_SESSIONS + 1):
+            program_url = livetiming_url(f'program.php?'
+                                         f'cid={meet_id}&session={session}')
+            program_page = GET(program_url, debug=DEBUG)
+            if program_page is None:
+                if session == 1:
+                    return None
+                complete = False
+                break
+            program_soup = BeautifulSoup(program_page.content, 'html.parser')
+            session_rows = []
+            for row in program_soup.find_all('tr')[1:]:
+                tds = row.find_all('td')
+                if tds == []: continue
+                session_rows.append((session, get_element_text(tds[0]),
+                                     [get_element_text(td) for td in tds]))
+            program_soup.decompose()
+            if session_rows == []:
+                break
+            program.extend(session_rows)
+        if program == []:
+            return None
+        if complete:
+            add_meet_program_to_cache(meet_id, program)
+        return program
+
+def get_event_editions(meet_id: str, event_name: str
+                       ) -> list[tuple[int, str]] | None:
+    '''
+    Returns (session, event number) of every edition of the event in the
+    program of a meet, e.g. the heats and the final, or the women's and the
+    men's event. Returns None if the program or the event was not found.
+    '''
+    program = get_meet_program(meet_id)
+    if program is None:
+        return None
+    event_editions = []
+    for session, event_number, cell_texts in program:
+        for cell_text in cell_texts:
+            if (len(cell_text.split(' ')) >= 2 and
+                is_correct_event(f'Gren {event_number} {cell_text}',
+                                 event_name)):
+                event_editions.append((session, event_number))
+                break
+    return event_editions if event_editions != [] else None
+
+def has_event_results(row_texts: list[str], event_name: str) -> bool:
+    '''
+    Returns True if the row texts hold a finished edition of the event, i.e.
+    the event row and the row that makes the event official.
+    '''
+    has_event_row = False
+    for row_text in row_texts:
+        if ((row_text[:5] == 'Gren ' or row_text[:6] == 'Event ') and
+            is_correct_event(row_text, event_name)):
+            has_event_row = True
+        if has_event_row and (row_text[:16] == 'Grenen officiell' or
+                              row_text[:14] == 'Event official'):
+            return True
+    return False
+
+@traced
+def get_event_results(meet_id: str, event_name: str) -> list[str] | None:
+    '''
+    Returns the table row texts of the results of an event at a meet. Instead
+    of the results of the whole meet, which are megabytes for a large meet,
+    only the results pages of the editions of the event in the meet program
+    are fetched. The row texts of the event are added to the meet results
+    cache under the key of the event.
+
+    The results of the whole meet are used if they are already cached, and
+    fetched (see get_meet_results) if targeted results are turned off, or if
+    the event pages can not be found or do not hold the event.
+    '''
+    if not targeted_results:
+        return get_meet_results(meet_id)
+    event_results_key = get_event_results_key(meet_id, event_name)
+    cached_results = get_cached_meet_results(meet_id)
+    if cached_results is None:
+        cached_results = get_cached_meet_results(event_results_key)
+    record_cache_lookup('meet_results', cached_results is not None)
+    if cached_results is not None:
+        return cached_results
+    event_editions = get_event_editions(meet_id, event_name)
+    if event_editions is None:
+        return get_meet_results(meet_id)
+    event_results_row_texts = []
+    for session, event_number in event_editions:
+        event_results_url = livetiming_url(f'results.php?cid={meet_id}'
+                                           f'&session={session}'
+                                           f'&event={event_number}')
+        event_results_page = GET(event_results_url, debug=DEBUG)
+        if event_results_page is None:
+            return get_meet_results(meet_id)
+        event_results_row_texts.extend(run_parser(parse_meet_results_rows,
+                                                  event_results_page.content))
+    if not has_event_results(event_results_row_texts, event_name):
+        return get_meet_results(meet_id)
+    add_meet_results_to_cache(event_results_key, event_results_row_texts)
+    enforce_memory_budget()
+    return event_results_row_texts
+
 ###############################################################################
 # Main call chain (reverse order)
 ###############################################################################
@@ -316,6 +674,7 @@ def get_splits_from_swim(swim_row_texts: list[str]) -> dict[str, str]:
                 i += 1
     return splits
 
+@traced
 def get_splits_from_event_edition(event_name: str,
                                   meet_year: int,
                                   event_edition_row_texts: list[str], 
@@ -365,14 +724,16 @@ def get_splits_from_event_edition(event_name: str,
             swim_row_texts.append(row_text)
     return None
 
+@traced
 def get_splits_from_meet(meet_id: str, 
                          meet_year: int,
                          swimmer_data: dict[str, str], 
                          event_name: str) -> dict[str, str] | None:
     '''
     Returns the splits for the swimmer in the given event at the given meet.
-    If the meet is in the cache, no GET request is made. Otherwise, a GET
-    request is made to LiveTiming to get the meet results.
+    If the results of the event or of the meet are in the cache, no GET
+    request is made. Otherwise, GET requests are made to LiveTiming to get the
+    results of the event (see get_event_results).
 
     If the swimmer swam the event multiple times, only the splits of the 
     fastest swim are returned. Returns None if the event is not found or if 
@@ -380,7 +741,7 @@ def get_splits_from_meet(meet_id: str,
     
     Called once by get_best_swim_for_swimmer.
     '''
-    meet_results_row_texts = get_meet_results(meet_id)
+    meet_results_row_texts = get_event_results(meet_id, event_name)
     if meet_results_row_texts is None:
         return None
     all_splits = []
@@ -420,270 +781,361 @@ def get_splits_from_meet(meet_id: str,
         return None
     return fastest_swim_splits
 
+# Errors of the best swims degraded to finish before the deadline
+DEADLINE_SPLITS_ERROR = 'Splits skipped to finish before the deadline.'
+DEADLINE_SKIPPED_ERROR = 'Not looked up to finish before the deadline.'
+# Name of an event past the deadline whose start list is not known
+DEADLINE_SKIPPED_EVENT_NAME = 'Ej hämtad'
+
+def get_skipped_best_swim() -> BestSwim:
+    '''
+    Returns the best swim of a swimmer that is not looked up to finish before
+    the deadline.
+    '''
+    record_error_entry('deadline_skipped')
+    return BestSwim(error=DEADLINE_SKIPPED_ERROR, degraded='skipped')
+
+def get_host_unavailable_error(host: str) -> str | None:
+    '''
+    Returns the error of a best swim whose lookup failed because the circuit
+    of the host is open, and records it as a 'host_unavailable' error entry.
+    Returns None if the host is available, and the lookup failed for another
+    reason.
+    '''
+    if not is_host_unavailable(host):
+        return None
+    record_error_entry('host_unavailable')
+    return f'{host} is unavailable, not looked up.'
+
+@traced
 def get_best_swim_for_swimmer(swimmer_data: dict[str, str], event_name: str,
-                              pool: str) -> dict:
+                              pool: str) -> BestSwim:
     '''
-    Gets the best swim for a swimmer in a given event. The return value is a
-    dictionary which looks like this:
-        {
-            'meet_name': 'meet name',
-            'meet_date': 'date',
-            'meet_location': 'location',
-            'result_url': 'url',
-            'final_time': 'time',
-            'avg50': 'time',
-            'splits': { '50': 'time', '100': 'time (last 50 time)', ... },
-            'all_times_url': 'url',
-            'all_events_url': 'url'
-        }
-    Called for each swimmer in a heat by get_best_swims_for_heat.
+    Gets the best swim for a swimmer in a given event (see BestSwim in
+    session_model.py). Called for each swimmer in a heat by 
+    get_best_swims_for_heat.
 
-    In case of an error, the returned dictionary looks like this:
-        {
-            'Error': 'error message',
-            [as many of the standard keys as possible]
-        }
+    In case of an error, the error of the best swim is set to the error 
+    message, and as many of the other fields as possible are filled in.
+
+    As the deadline approaches, the splits are skipped and the final time is
+    the backup time from Tempus, and past it nothing is looked up (see
+    BestSwim.degraded).
+
+    While Tempus or LiveTiming is unavailable (see circuit_breaker.py), the
+    lookups that need it fail immediately, and the error of the best swim
+    says so. What was looked up before is kept.
     '''
-    debug_print(f'      Getting best swim for swimmer '
-                f'{swimmer_data["name"]} ...')
+    if get_degradation_level() == LEVEL_SKIP_ALL:
+        return get_skipped_best_swim()
+
     # get the swimmer id (needed for the Tempus request)
     swimmer_id = get_swimmer_id(swimmer_data)
     if swimmer_id is None:
-        return {'Error' : 'Error getting Tempus swimmer id. '
-                          f'Swimmer name: {swimmer_data["name"]}.'}
+        host_unavailable_error = get_host_unavailable_error(get_tempus_host())
+        if host_unavailable_error is not None:
+            return BestSwim(error=host_unavailable_error)
+        record_error_entry('swimmer_id')
+        return BestSwim(error='Error getting Tempus swimmer id. '
+                              f'Swimmer name: {swimmer_data["name"]}.')
     
     # get the event id (needed for the Tempus request)
     event_name = ' '.join(event_name.split(' ')[:2]) # ensure format is correct
     event_id = get_event_id(event_name, pool)
     if event_id is None:
-        return {'Error' : 'Error getting Tempus event id. '
-                          f'Event name: {event_name}, Pool: {pool}.'}
+        record_error_entry('event_id')
+        return BestSwim(error='Error getting Tempus event id. '
+                              f'Event name: {event_name}, Pool: {pool}.')
     
-    best_swim = dict()
+    best_swim = BestSwim()
 
     # add the all times url and all events url
-    all_times_url = (f'https://www.tempusopen.se/index.php?r=swimmer/'
-                     f'distance&id={swimmer_id}&event={event_id}')
-    best_swim['all_times_url'] = all_times_url
-    all_events_url = (f'https://www.tempusopen.se/index.php?r=swimmer/'
-                      f'view&id={swimmer_id}')
-    best_swim['all_events_url'] = all_events_url
+    all_times_url = tempus_url(f'index.php?r=swimmer/'
+                               f'distance&id={swimmer_id}&event={event_id}')
+    best_swim.all_times_url = all_times_url
+    all_events_url = tempus_url(f'index.php?r=swimmer/'
+                                f'view&id={swimmer_id}')
+    best_swim.all_events_url = all_events_url
 
     # get the meet name and date
     return_val = get_meet_name_and_date(swimmer_id, event_id)
     if return_val is None:
-        best_swim['Error'] = 'First time swimming the event.'
+        best_swim.error = get_host_unavailable_error(get_tempus_host())
+        if best_swim.error is None:
+            best_swim.error = 'First time swimming the event.'
+            record_error_entry('first_time')
         return best_swim
     meet_name, meet_date, backup_time = return_val
         
-    best_swim['meet_name'] = meet_name
-    best_swim['meet_date'] = meet_date
+    best_swim.meet_name = meet_name
+    best_swim.meet_date = meet_date
+
+    if get_degradation_level() >= LEVEL_SKIP_SPLITS:
+        best_swim.error = DEADLINE_SPLITS_ERROR
+        best_swim.degraded = 'splits'
+        record_error_entry('deadline_splits')
+        best_swim.final_time = backup_time
+        return best_swim
     
     # get the meet id and location
     return_val = get_meet_id_and_location(meet_name, meet_date)
     if return_val is None:
-        best_swim['Error'] = 'Error getting LiveTiming meet id and location.'
-        best_swim['final_time'] = backup_time
+        best_swim.error = get_host_unavailable_error(get_livetiming_host())
+        if best_swim.error is None:
+            best_swim.error = 'Error getting LiveTiming meet id and location.'
+            record_error_entry('meet_id_and_location')
+        best_swim.final_time = backup_time
         return best_swim
     meet_id, meet_location = return_val
 
-    result_url = (
-        f'https://www.livetiming.se/results.php?cid={meet_id}&session=0&all=1')
-    best_swim['result_url'] = result_url
-    best_swim['meet_location'] = meet_location
+    result_url = livetiming_url(
+        f'results.php?cid={meet_id}&session=0&all=1')
+    best_swim.result_url = result_url
+    best_swim.meet_location = meet_location
 
     # get the splits
     meet_year = int(meet_date[:4])
     splits = get_splits_from_meet(meet_id, meet_year, swimmer_data, event_name)
     if splits is None:
-        best_swim['Error'] = ('Error getting splits from LiveTiming. '
-                              f'Meet id: {meet_id}.')
-        best_swim['final_time'] = backup_time
+        best_swim.error = get_host_unavailable_error(get_livetiming_host())
+        if best_swim.error is None:
+            best_swim.error = ('Error getting splits from LiveTiming. '
+                               f'Meet id: {meet_id}.')
+            record_error_entry('splits')
+        best_swim.final_time = backup_time
         return best_swim
     
-    best_swim['splits'] = splits
-    best_swim['final_time'] = final_time(splits)
-    best_swim['avg50'] = avg50(splits)
+    best_swim.splits = splits
+    best_swim.final_time = final_time(splits)
+    best_swim.avg50 = avg50(splits)
     if 'medley' in event_name.lower():
-        best_swim['avg50'] = None
+        best_swim.avg50 = None
 
     return best_swim
 
-def get_best_swims_for_heat(heat_rows: list, event_name: str, pool: str
-                            ) -> dict:
+@traced
+def get_best_swims_for_heat(heat_entries: list[StartListEntry], 
+                            event_name: str, pool: str,
+                            look_up: bool = True) -> list[LaneEntry]:
     '''
     Iterates through the swimmers in a heat and gets the best swim for each
     swimmer. Called for each heat in an event by get_best_swims_for_event.
+    With a swimmer_concurrency above 1, that many swimmers are looked up at
+    the same time in the swimmer_executor of the session. If look_up is
+    False, the best swims are not looked up to finish before the deadline.
+    '''
+    heat_swimmers = [(entry.lane, entry.get_swimmer_data())
+                     for entry in heat_entries]
+    progress_bar.add_swimmers(len(heat_swimmers))
+    if not look_up:
+        best_swims = []
+        for _ in heat_swimmers:
+            best_swims.append(get_skipped_best_swim())
+            progress_bar.update_swimmer()
+    elif swimmer_executor is not None and len(heat_swimmers) > 1:
+        futures = [swimmer_executor.submit(get_best_swim_for_swimmer,
+                                           swimmer_data, event_name, pool)
+                   for _, swimmer_data in heat_swimmers]
+        best_swims = []
+        for future in futures:
+            best_swims.append(future.result())
+            progress_bar.update_swimmer()
+    else:
+        best_swims = []
+        for _, swimmer_data in heat_swimmers:
+            best_swims.append(
+                get_best_swim_for_swimmer(swimmer_data, event_name, pool))
+            progress_bar.update_swimmer()
+    heat_lanes = []
+    for (lane, swimmer_data), best_swim in zip(heat_swimmers, best_swims):
+        heat_lanes.append(LaneEntry(
+            lane=lane,
+            name=swimmer_data['name'],
+            born=swimmer_data['born'],
+            club=swimmer_data['club'],
+            best_swim=best_swim))
+    return heat_lanes
+
+@traced
+def get_best_swims_for_event(event_number: int, event_heat_list_url: str,
+                             num_heats: int,
+                             look_up: bool = True) -> Event | None:
+    '''
+    Gets the start list of an event and the best swims for each heat within
+    num_heats of the last heat. Makes a GET request to LiveTiming. Called for
+    each event in a session by get_best_swims_for_session. Returns None if the
+    event is a relay.
+
+    When the retrieval is far behind the pace of its deadline, the best swims
+    of the earliest heats are not looked up, only those of the last heat. If
+    look_up is False (past the deadline), none are looked up, and the start
+    list is the one last parsed if the heat list page is not in the HTTP
+    cache. Without either, the event is returned without heats and named
+    DEADLINE_SKIPPED_EVENT_NAME.
     '''
-    debug_print('    Getting best swims for heat...')
-    heat_best_swims = dict()
-    for row in heat_rows:
-        row_text = get_element_text(row)
-        if (len(row_text) <= 2) or (not row_text[0].isdigit()): continue
-        tds = row.find_all('td')
-        element_texts = [get_element_text(td) for td in tds]
-        element_texts = [text for text in element_texts if text != '']
-        if len(element_texts) <= 3: continue # safety
-        element_texts = (element_texts[1:] if element_texts[2][0].isalpha() 
-                         else element_texts)
-        lane = element_texts[0]
-        swimmer_data = dict()
-        swimmer_data['name'] = element_texts[1]
-        swimmer_data['born'] = element_texts[2]
-        club = element_texts[3]
-        club = ' '.join([word.title() if len(word) > 2 else word 
-                        for word in club.split(' ')])
-        swimmer_data['club'] = club
-        heat_best_swims[f'({lane}, {swimmer_data["name"]})'] = (
-            get_best_swim_for_swimmer(swimmer_data, event_name, pool))
-    return heat_best_swims
-
-def get_best_swims_for_event(event_heat_list_url: str, num_heats: int
-                             ) -> tuple[str, dict] | None:
-    '''
-    Iterates through the heats in an event and gets the best swims for each 
-    heat. Makes a GET request to LiveTiming. Called for each event in a session
-    by get_best_swims_for_session. Returns None if the event is a relay.
-    '''
-    debug_print('  Getting best swims for event...')
     event_heat_list_page = GET(event_heat_list_url, debug=DEBUG)
-    if event_heat_list_page is None:
-        debug_print(f'Error getting event heat list page: '
-                    f'{event_heat_list_url}')
+    if event_heat_list_page is not None:
+        start_list = get_start_list(event_heat_list_url,
+                                    event_heat_list_page.content)
+    elif not look_up:
+        start_list = get_last_start_list(event_heat_list_url)
+        if start_list is None:
+            return Event(event_number, DEADLINE_SKIPPED_EVENT_NAME, heats=[])
+    else:
+        record_error('heat_list_page', 
+                     f'Error getting event heat list page: '
+                     f'{event_heat_list_url}', debug=DEBUG)
         return None
-    event_soup = BeautifulSoup(event_heat_list_page.content, 'html.parser')
-    event_trs = event_soup.find_all('tr')
-    event_name = None
-    pool = None
-    total_heats = None
-    curr_heat = None
-    curr_heat_rows = []
-    event_best_swims = dict()
-    for row in event_trs[1:]:
-        row_text = get_element_text(row)
-        if row_text == '': continue
-        if row_text[:9] == 'Bassäng: ':
-            pool = row_text[9:12]
-        if row_text[:5] == 'Gren ':
-            # new heat
-            row_tokens = row_text.split(' ')
-            if row_tokens[-1][1].isdigit():
-                heat = row_tokens[-2]
-            else:
-                heat = 1
-            if event_name is None:
-                event_name = ' '.join(row_tokens[2:5])
-                # skip relays and extralopp
-                if (('x' in event_name.lower() and 
-                    'mixed' not in event_name.lower()) or 
-                    'extralopp' in event_name.lower()):
-                    return None
-            if total_heats is None:
-                if row_tokens[-1][1].isdigit():
-                    total_heats = int(row_tokens[-1].replace('(', '')
-                                                    .replace(')', ''))
-                else:
-                    total_heats = 1
-                progress_bar.set_num_heats(min(total_heats, num_heats))
-            if (curr_heat is not None and 
-                int(curr_heat) > total_heats - num_heats):
-                # get best swims for the previous heat
-                heat_best_swims = get_best_swims_for_heat(curr_heat_rows, 
-                                                          event_name, pool)
-                event_best_swims[curr_heat] = heat_best_swims
-                progress_bar.update_heat(
-                    int(curr_heat) if num_heats >= total_heats
-                    else int(curr_heat) - (total_heats - num_heats))
-            if curr_heat is not None:
-                curr_heat_rows = []
-            curr_heat = heat
-            debug_print(f'    Heat: {curr_heat} of {total_heats}')
-            continue
-        if curr_heat is not None:
-            curr_heat_rows.append(row)
-    # get best swims for the last heat
-    heat_best_swims = get_best_swims_for_heat(curr_heat_rows, event_name, 
-                                              pool)
-    event_best_swims[curr_heat] = heat_best_swims
-    progress_bar.update_heat(int(curr_heat) if num_heats >= total_heats
-                             else int(curr_heat) - (total_heats - num_heats))
-    return event_name, event_best_swims
+    # skip relays and extralopp
+    if start_list is None or is_skipped_event(start_list.event_name):
+        return None
+    included_heats = start_list.get_included_heats(num_heats)
+    progress_bar.set_num_heats(len(included_heats))
+    event_heats = []
+    for heat in included_heats:
+        # the last heat is always looked up before the deadline
+        look_up_heat = look_up and (heat is included_heats[-1] or
+                                    get_degradation_level() < LEVEL_SKIP_HEATS)
+        heat_lanes = get_best_swims_for_heat(heat.entries,
+                                             start_list.event_name,
+                                             start_list.pool, look_up_heat)
+        event_heats.append(Heat(heat.number, heat_lanes))
+        set_work_unit_progress(len(event_heats) / len(included_heats))
+    return Event(event_number, start_list.event_name, heats=event_heats)
         
-def get_best_swims_for_session(session_soup, num_heats: int) -> dict:
+@traced
+def get_best_swims_for_session(
+        session_soup, num_heats: int,
+        on_event_done: Callable[[list[Event], list[int]], None] | None = None
+        ) -> list[Event]:
     '''
     Iterates through the events in a session and gets the best swims for each
-    event. Returns a dictionary where the keys are event names and the values
-    are dictionaries where the keys are lane numbers and swimmer names, and the
-    values are dictionaries with their best swims. Called once by 
+    event. Returns the events in program order. Called once by 
     get_meet_and_session_data.
+
+    The events are retrieved one at a time in program order, so the first
+    event of the session is finished first. After each event with a heat list,
+    on_event_done is called with the events finished so far and the numbers
+    of the events still to be retrieved, so that the page can be rendered
+    while the rest of the session is retrieved. Past the deadline, the
+    remaining events are still added, with best swims that are not looked up.
     '''
-    debug_print('Getting best swims for session...')
+    global swimmer_executor
     session_trs = session_soup.find_all('tr')
-    session_best_swims = dict()
+    scheduled_events = []
     for row in session_trs[1:]:
         tds = row.find_all('td')
-        event_number = get_element_text(tds[0])
-        debug_print(f'  Event number: {event_number} of '
-                    f'{progress_bar.num_events}')
+        event_number = int(get_element_text(tds[0]))
+        event_heat_list_url = None
         for td in tds:
             if get_element_text(td) == 'Heatlista':
                 link = td.find('a')['href']
-                event_heat_list_url = f'https://www.livetiming.se/{link}'
-                return_val = get_best_swims_for_event(event_heat_list_url,
-                                                      num_heats)
-                if return_val is None: 
-                    continue
-                event_name, event_best_swims = return_val
-                session_best_swims[f'({event_number}, {event_name})'] = (
-                    event_best_swims)
-        progress_bar.update_event(int(event_number))
-        
-    return session_best_swims
+                event_heat_list_url = livetiming_url(link)
+        scheduled_events.append((event_number, event_heat_list_url))
+    pending_event_numbers = [event_number 
+                             for event_number, url in scheduled_events
+                             if url is not None]
+    set_work_total(len(pending_event_numbers))
+    if swimmer_concurrency > 1:
+        swimmer_executor = ThreadPoolExecutor(max_workers=swimmer_concurrency)
+    session_events = []
+    try:
+        for event_number, event_heat_list_url in scheduled_events:
+            if event_heat_list_url is not None:
+                # past the deadline, nothing is looked up
+                event = get_best_swims_for_event(
+                    event_number, event_heat_list_url, num_heats,
+                    get_degradation_level() < LEVEL_SKIP_ALL)
+                if event is not None:
+                    session_events.append(event)
+                pending_event_numbers.remove(event_number)
+                finish_work_unit()
+                if on_event_done is not None:
+                    on_event_done(session_events, pending_event_numbers)
+            progress_bar.update_event(event_number)
+    finally:
+        if swimmer_executor is not None:
+            swimmer_executor.shutdown()
+            swimmer_executor = None
+    return session_events
 
-def get_meet_and_session_data(session_url: str, num_heats: int) -> dict:
+@traced
+def get_meet_and_session_data(
+        session_url: str, num_heats: int,
+        on_event_done: Callable[[Session, list[int]], None] | None = None
+        ) -> Session | None:
     '''
-    Returns a dictionary with the meet name, session number, and the best swims
-    for the session. Called once by retrieve_data. Makes a GET request to 
-    LiveTiming.
+    Returns the session with the meet name, session number, and the best swims
+    of its events. Called once by retrieve_data. Makes a GET request to 
+    LiveTiming. Returns None if the session page could not be retrieved.
+
+    on_event_done is called with the session so far and the numbers of the
+    events still to be retrieved every time an event is finished.
     '''
     session_page = GET(session_url, debug=DEBUG)
     if session_page is None:
-        debug_print(f'Error getting session page: {session_url}')
-        return {'Error' : 'Error getting session page.'}
+        record_error('session_page', 
+                     f'Error getting session page: {session_url}', 
+                     debug=DEBUG)
+        return None
     session_soup = BeautifulSoup(session_page.content, 'html.parser')
     tbody = session_soup.find('tbody')
     num_events = len(tbody.find_all('tr')) - 1
+    global progress_bar
+    progress_bar = ProgressBar(bar_length=50, debug=DEBUG)
     progress_bar.set_num_events(num_events)
     meet_name = ' '.join(get_element_text(session_soup.find('h1'))
                          .split(' ')[2:])
     session_number = session_url.split('=')[-1]
-    session_best_swims = get_best_swims_for_session(session_soup, num_heats)
-    session_data = dict()
-    session_data['meet_name'] = meet_name
-    session_data['session_number'] = session_number
-    session_data['events'] = session_best_swims
-    return session_data
+    def on_session_event_done(events, pending_event_numbers):
+        on_event_done(Session(meet_name, session_number, events),
+                      pending_event_numbers)
+    session_events = get_best_swims_for_session(
+        session_soup, num_heats,
+        on_session_event_done if on_event_done is not None else None)
+    return Session(meet_name, session_number, session_events)
 
-def retrieve_data(session_url: str, num_heats: int) -> dict:
+def retrieve_data(session_url: str, num_heats: int,
+                  on_event_done: Callable[[Session, list[int]], None] 
+                                 | None = None) -> Session | None:
     '''
-    The function called by main.py to retrieve session data. Returns a
-    dictionary with the meet name, session number, and the best swims for the
-    session. 
+    The function called by main.py to retrieve session data. Returns the 
+    session with the meet name, session number, and the best swims of its 
+    events, or None if the session page could not be retrieved. 
+
+    If on_event_done is given, it is called with the session so far and the
+    numbers of the events still to be retrieved every time an event is
+    finished (see get_best_swims_for_session).
 
     A progress bar is displayed while the data is being retrieved. The progress
     bar is updated for each event and heat. 
     
-    The time taken to retrieve the data is measured and printed.
+    The time taken to retrieve the data is measured and printed. The run
+    metrics are reset first, so that they can be written as a run report
+    afterwards (see metrics.py). If memory is being traced, loading the
+    caches, the retrieval and saving the caches are recorded as memory stages.
     '''
+    reset_metrics()
+    reset_circuit_breakers()
     # load caches from files
-    load_stored_swimmer_id_cache()
-    load_stored_meet_id_and_location_cache()
-    load_stored_meet_results_cache()
-    session_data = time_function(get_meet_and_session_data,
-                                 session_url, num_heats)
+    with memory_stage('load_caches'):
+        load_stored_swimmer_id_cache()
+        load_stored_meet_id_and_location_cache()
+        load_stored_meet_results_cache()
+        load_stored_start_list_cache()
+        load_stored_meet_program_cache()
+        load_stored_http_cache()
+    with span('retrieve_data'), memory_stage('retrieve_data'):
+        session_data = get_meet_and_session_data(session_url, num_heats,
+                                                 on_event_done)
     # save caches to files
-    save_swimmer_id_cache()
-    save_meet_id_and_location_cache()
-    save_meet_results_cache()
+    with memory_stage('save_caches'):
+        save_swimmer_id_cache()
+        save_meet_id_and_location_cache()
+        save_meet_results_cache()
+        save_start_list_cache()
+        save_meet_program_cache()
+        save_http_cache()
 
+    print(f'Time taken: {get_span_total_seconds("retrieve_data")} seconds')
     return session_data
@@ -0,0 +1,47 @@
+'''
+This file contains the base URLs of LiveTiming and Tempus. Every URL the
+retrieval builds starts with one of them, so the retrieval can be pointed at
+another server, such as the local emulator (see emulator/emulator_server.py),
+with set_base_urls.
+'''
+from urllib.parse import urlparse
+
+LIVETIMING_BASE_URL = 'https://www.livetiming.se'
+TEMPUS_BASE_URL = 'https://www.tempusopen.se'
+
+livetiming_base_url: str = LIVETIMING_BASE_URL
+tempus_base_url: str = TEMPUS_BASE_URL
+
+def set_base_urls(livetiming: str | None, tempus: str | None) -> None:
+    '''
+    Sets the base URLs of LiveTiming and Tempus, e.g. 'http://localhost:8800'.
+    None restores the real site.
+    '''
+    global livetiming_base_url, tempus_base_url
+    livetiming_base_url = (LIVETIMING_BASE_URL if livetiming is None
+                           else livetiming.rstrip('/'))
+    tempus_base_url = TEMPUS_BASE_URL if tempus is None else tempus.rstrip('/')
+
+def livetiming_url(path: str) -> str:
+    '''
+    Returns the LiveTiming URL of a path such as 'results.php?cid=1'.
+    '''
+    return f'{livetiming_base_url}/{path}'
+
+def tempus_url(path: str) -> str:
+    '''
+    Returns the Tempus URL of a path such as 'index.php?r=swimmer/view&id=1'.
+    '''
+    return f'{tempus_base_url}/{path}'
+
+def get_livetiming_host() -> str:
+    '''
+    Returns the host of LiveTiming, as the circuit breakers know it.
+    '''
+    return urlparse(livetiming_base_url).netloc
+
+def get_tempus_host() -> str:
+    '''
+    Returns the host of Tempus, as the circuit breakers know it.
+    '''
+    return urlparse(tempus_base_url).netloc
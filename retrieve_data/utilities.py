@@ -4,25 +4,231 @@ retrieve_data.py and other supporting data retrieval files.
 '''
 
 import requests
+import threading
 import time
 
+from cache.http_cache import (get_cached_http_response,
+                              is_http_response_fresh,
+                              get_conditional_headers,
+                              read_cached_http_body,
+                              mark_http_response_revalidated,
+                              add_http_response_to_cache)
+from retrieve_data.http_archive import (is_recording,
+                                        is_replaying,
+                                        record_http_response,
+                                        get_replayed_http_response)
+from retrieve_data.metrics import record_http_request, record_error
+from retrieve_data.deadline import get_request_timeout
+from retrieve_data.hedging import send_request
+from retrieve_data.circuit_breaker import (allow_request,
+                                           record_request_success,
+                                           record_request_failure)
+
+###############################################################################
+# Rate limit for requests
+###############################################################################
+
+# Minimum number of seconds between two requests. 0 means no rate limit.
+min_request_interval: float = 0.0
+next_request_time: float = 0.0
+rate_limit_lock = threading.Lock()
+
+def set_rate_limit(requests_per_second: float | None) -> None:
+    '''
+    Limits the number of requests per second made by GET. None removes the
+    limit. Responses served from the HTTP cache or archive are not limited.
+    '''
+    assert requests_per_second is None or requests_per_second > 0, \
+        'Rate limit must be greater than 0 requests per second.'
+    global min_request_interval
+    min_request_interval = (0.0 if requests_per_second is None
+                            else 1 / requests_per_second)
+
+def wait_for_rate_limit() -> None:
+    '''
+    Sleeps until the next request is allowed by the rate limit.
+    '''
+    global next_request_time
+    if min_request_interval == 0.0:
+        return
+    with rate_limit_lock:
+        now = time.monotonic()
+        wait = next_request_time - now
+        next_request_time = max(now, next_request_time) + min_request_interval
+    if wait > 0:
+        time.sleep(wait)
+
 ###############################################################################
 # GET with error handling
 ###############################################################################
 
+# Timeout of a request in seconds, shortened to the time left of a deadline.
+REQUEST_TIMEOUT_SECONDS = 15
+
+def make_response(url: str, status_code: int, headers: dict[str, str],
+                  body: bytes) -> requests.models.Response:
+    '''
+    Builds a response object from a stored body, so that responses served from
+    a cache look the same to the callers of GET as downloaded ones.
+    '''
+    response = requests.models.Response()
+    response.url = url
+    response.status_code = status_code
+    response.headers.update(headers)
+    response._content = body
+    return response
+
+def get_cached_response(url: str, entry: dict
+                        ) -> requests.models.Response | None:
+    '''
+    Returns the stored response of a HTTP cache entry, or None if its body is
+    no longer on disk.
+    '''
+    body = read_cached_http_body(url, entry)
+    if body is None:
+        return None
+    headers = dict()
+    if entry['content_type'] is not None:
+        headers['Content-Type'] = entry['content_type']
+    return make_response(url, 200, headers, body)
+
+def make_request(url: str, headers: dict[str, str], timeout: float):
+    '''
+    Returns a function that waits for the rate limit and makes a GET request,
+    which send_request calls once more if it hedges the request (see
+    hedging.py).
+    '''
+    def request() -> requests.models.Response:
+        wait_for_rate_limit()
+        return requests.get(url, headers=headers, timeout=timeout)
+    return request
+
+def fetch(url: str) -> tuple[requests.models.Response | None, str]:
+    '''
+    Gets the response for a URL through the HTTP cache. A fresh stored response
+    is returned without a request, and a stale one is revalidated with a
+    conditional request and returned if the server answers 304 Not Modified.
+    Responses with status code 200 are stored in the cache.
+
+    Requests to the network are hedged if hedging is on (see hedging.py).
+
+    Also returns where the response came from: 'fresh', 'revalidated' or
+    'network'. If a request is needed after the deadline of the retrieval
+    (see deadline.py), returns None and 'deadline' without a request, and if
+    the circuit of the host is open (see circuit_breaker.py), returns None and
+    'host_unavailable'.
+    '''
+    entry = get_cached_http_response(url)
+    if entry is not None and is_http_response_fresh(url, entry):
+        cached_response = get_cached_response(url, entry)
+        if cached_response is not None:
+            return cached_response, 'fresh'
+        entry = None
+    headers = get_conditional_headers(entry) if entry is not None else dict()
+    timeout = get_request_timeout(REQUEST_TIMEOUT_SECONDS)
+    if timeout is None:
+        return None, 'deadline'
+    if not allow_request(url):
+        return None, 'host_unavailable'
+    response = send_request(url, make_request(url, headers, timeout))
+    if response.status_code == 304 and entry is not None:
+        cached_response = get_cached_response(url, entry)
+        if cached_response is not None:
+            mark_http_response_revalidated(url)
+            return cached_response, 'revalidated'
+        # the stored body is gone, download it again. The host did answer,
+        # which closes its circuit if this was the probe, so that the
+        # download is let through.
+        record_request_success(url)
+        timeout = get_request_timeout(REQUEST_TIMEOUT_SECONDS)
+        if timeout is None:
+            return None, 'deadline'
+        if not allow_request(url):
+            return None, 'host_unavailable'
+        response = send_request(url, make_request(url, dict(), timeout))
+    if response.status_code == 200:
+        add_http_response_to_cache(url, response.headers, response.content)
+    return response, 'network'
+
+def record_host_failure(url: str, debug: bool) -> None:
+    '''
+    Records a failed request in the circuit breaker, and an error if it opened
+    the circuit of the host.
+    '''
+    if record_request_failure(url):
+        record_error('circuit_opened', 
+                     f'Circuit opened after repeated failures: {url}', debug)
+
 def GET(url: str, debug: bool) -> requests.models.Response | None:
     '''
     Performs a GET request to a URL and returns the response. If the status
     code is not 200, prints an error message and returns None. If there is a
-    timeout, prints an error message and returns None.
+    timeout, a connection error or another request error, prints an error
+    message and returns None.
+
+    Responses are served from the HTTP cache when possible (see fetch). When
+    recording, every response is added to the HTTP archive, and when
+    replaying, responses are served from the archive without any request.
+
+    Timeouts, connection errors, other request errors and server errors count
+    towards opening the circuit of the host, after which GET returns None
+    immediately until the host answers a probe again (see circuit_breaker.py).
     '''
-    try:
-        response = requests.get(url, timeout=15)
-        if response.status_code != 200:
-            if debug: print(f'Status code {response.status_code} for {url}')
+    start = time.perf_counter()
+    if is_replaying():
+        replayed = get_replayed_http_response(url)
+        if replayed is None:
+            record_error('not_in_http_archive', 
+                         f'Not in the HTTP archive: {url}', debug)
+            return None
+        response = make_response(url, replayed['status'], 
+                                 replayed['headers'], replayed['body'])
+        source = 'replay'
+    else:
+        try:
+            response, source = fetch(url)
+        except requests.exceptions.Timeout as e:
+            record_http_request(url, 'network', None, 0, 
+                                time.perf_counter() - start)
+            record_error('http_timeout', f'Timeout for {url}: {e}', debug)
+            record_host_failure(url, debug)
+            return None
+        except requests.exceptions.ConnectionError as e:
+            record_http_request(url, 'network', None, 0, 
+                                time.perf_counter() - start)
+            record_error('http_connection', 
+                         f'Connection error for {url}: {e}', debug)
+            record_host_failure(url, debug)
+            return None
+        except requests.exceptions.RequestException as e:
+            # any other failure of the request, which must still end the
+            # probe of an open circuit
+            record_http_request(url, 'network', None, 0, 
+                                time.perf_counter() - start)
+            record_error('http_request', f'Request failed for {url}: {e}',
+                         debug)
+            record_host_failure(url, debug)
+            return None
+        if response is None and source == 'host_unavailable':
+            record_error('host_unavailable', 
+                         f'Host unavailable, not requested: {url}', debug)
             return None
-    except requests.exceptions.Timeout as e:
-        if debug: print(f'Timeout for {url}: {e}')
+        if response is None:
+            record_error('deadline', f'Deadline reached before {url}', debug)
+            return None
+        if source in ('network', 'revalidated'):
+            if response.status_code >= 500:
+                record_host_failure(url, debug)
+            else:
+                record_request_success(url)
+        if is_recording():
+            record_http_response(url, response.status_code, response.headers,
+                                 response.content)
+    record_http_request(url, source, response.status_code, 
+                        len(response.content), time.perf_counter() - start)
+    if response.status_code != 200:
+        record_error('http_status', 
+                     f'Status code {response.status_code} for {url}', debug)
         return None
     return response
         
@@ -171,14 +377,3 @@ def avg50(splits: dict[str, str]) -> str | None:
     avg_fifty = sum(in_seconds)/len(in_seconds)
     avg_fifty = round(avg_fifty, 2)
     return str(avg_fifty)
-
-###############################################################################
-# Timing function
-###############################################################################
-
-def time_function(func, *args):
-    start = time.time()
-    return_val = func(*args)
-    end = time.time()
-    print(f'Time taken: {end-start} seconds')
-    return return_val
@@ -0,0 +1,262 @@
+'''
+This file contains the functions that save and load the session model (see
+session_model.py).
+
+The session is saved in a compact binary file (session_data.bin) that
+render-only runs load, and exported as JSON (session_data.json) for reading
+and editing by hand. Both hold the same data, so a session survives any
+round trip between them.
+
+The binary file looks like this:
+
+    MAGIC                   8 bytes
+    format version          2 bytes, little endian
+    header length           4 bytes, little endian
+    header                  zlib compressed JSON of
+                            [meet_name, session_number,
+                             [[number, name, offset, length], ...]]
+    event payloads          zlib compressed JSON of
+                            [[heat number, [[lane, name, born, club,
+                                             best swim tuple], ...]], ...]
+
+JSON keeps the files readable by any version of Python, which marshal does
+not promise. The format version changes whenever the fields of the model do,
+such as BestSwim.degraded in version 2, and files of another version are not
+loaded.
+
+The offsets of the event payloads are relative to the end of the header.
+load_session only decodes the header, and the heats of an event are decoded
+when they are first accessed.
+
+Session files of older versions of the application (session_data.json with
+string keys such as '(3, 100m frisim)') are imported by import_session_json.
+'''
+
+import json
+import struct
+import zlib
+from dataclasses import asdict
+
+from session_model.session_model import (Session,
+                                         Event,
+                                         Heat,
+                                         LaneEntry,
+                                         BestSwim)
+
+SESSION_BINARY_PATH = 'session_data.bin'
+SESSION_JSON_PATH = 'session_data.json'
+
+MAGIC = b'SWIMSESS'
+FORMAT_VERSION = 2
+
+# format version and header length
+PREAMBLE = struct.Struct('<HI')
+
+# keys of the best swim dictionaries in old session files
+LEGACY_ERROR_KEY = 'Error'
+
+###############################################################################
+# Binary format
+###############################################################################
+
+def encode_payload(value) -> bytes:
+    '''
+    Returns the compressed JSON of a header or an event payload.
+    '''
+    return zlib.compress(json.dumps(value, ensure_ascii=False,
+                                    separators=(',', ':')).encode('utf-8'))
+
+def decode_payload(payload):
+    '''
+    Returns the value of a payload returned by encode_payload.
+    '''
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+def encode_heats(heats: list[Heat]) -> bytes:
+    '''
+    Returns the payload of an event.
+    '''
+    return encode_payload(
+        [(heat.number,
+          [(entry.lane, entry.name, entry.born, entry.club,
+            entry.best_swim.to_tuple()) for entry in heat.lanes])
+         for heat in heats])
+
+def decode_heats(payload) -> list[Heat]:
+    '''
+    Returns the heats of an event payload.
+    '''
+    return [Heat(heat_number,
+                 [LaneEntry(lane, name, born, club,
+                            BestSwim.from_tuple(best_swim))
+                  for lane, name, born, club, best_swim in lanes])
+            for heat_number, lanes in decode_payload(payload)]
+
+def save_session(session: Session, path: str) -> None:
+    '''
+    Saves the session to a binary session file.
+    '''
+    payloads = []
+    event_table = []
+    offset = 0
+    for event in session.events:
+        payload = encode_heats(event.heats)
+        event_table.append((event.number, event.name, offset, len(payload)))
+        payloads.append(payload)
+        offset += len(payload)
+    header = encode_payload(
+        (session.meet_name, session.session_number, event_table))
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(PREAMBLE.pack(FORMAT_VERSION, len(header)))
+        file.write(header)
+        for payload in payloads:
+            file.write(payload)
+
+def load_session(path: str) -> Session | None:
+    '''
+    Loads a binary session file. The heats of each event are decoded on first
+    access. Returns None if the file does not exist or is not a session file
+    of this format version.
+    '''
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+    preamble_end = len(MAGIC) + PREAMBLE.size
+    if len(data) < preamble_end or data[:len(MAGIC)] != MAGIC:
+        return None
+    version, header_length = PREAMBLE.unpack(data[len(MAGIC):preamble_end])
+    if version != FORMAT_VERSION:
+        return None
+    view = memoryview(data)
+    payloads_start = preamble_end + header_length
+    meet_name, session_number, event_table = decode_payload(
+        view[preamble_end:payloads_start])
+    events = []
+    for number, name, offset, length in event_table:
+        start = payloads_start + offset
+        payload = view[start:start + length]
+        events.append(Event(number, name,
+                            heats_loader=lambda payload=payload:
+                                decode_heats(payload)))
+    return Session(meet_name, session_number, events)
+
+###############################################################################
+# JSON export and import
+###############################################################################
+
+def session_to_dict(session: Session) -> dict:
+    '''
+    Returns the session as a dictionary of JSON types, with every field of the
+    model.
+    '''
+    return {
+        'meet_name': session.meet_name,
+        'session_number': session.session_number,
+        'events': [{
+            'number': event.number,
+            'name': event.name,
+            'heats': [{
+                'number': heat.number,
+                'lanes': [{
+                    'lane': entry.lane,
+                    'name': entry.name,
+                    'born': entry.born,
+                    'club': entry.club,
+                    'best_swim': asdict(entry.best_swim)
+                } for entry in heat.lanes]
+            } for heat in event.heats]
+        } for event in session.events]
+    }
+
+def session_from_dict(data: dict) -> Session:
+    '''
+    Returns the session of a dictionary returned by session_to_dict.
+    '''
+    return Session(data['meet_name'], data['session_number'], [
+        Event(event['number'], event['name'], heats=[
+            Heat(heat['number'], [
+                LaneEntry(entry['lane'], entry['name'], entry['born'],
+                          entry['club'], BestSwim(**entry['best_swim']))
+                for entry in heat['lanes']])
+            for heat in event['heats']])
+        for event in data['events']])
+
+def parse_legacy_key(key: str) -> tuple[int, str]:
+    '''
+    Returns the number and name of a key of the format '(number, name)'.
+    '''
+    number, name = key[1:-1].split(', ', 1)
+    return int(number), name
+
+def session_from_legacy_dict(data: dict) -> Session | None:
+    '''
+    Returns the session of an old session_data.json, whose events, heats and
+    swimmers are dictionaries with string keys. Born and club were not saved
+    by older versions and are left empty. Returns None if the old file holds
+    an error instead of a session.
+    '''
+    if LEGACY_ERROR_KEY in data:
+        return None
+    events = []
+    for event_key, heats in data['events'].items():
+        event_number, event_name = parse_legacy_key(event_key)
+        event_heats = []
+        for heat_number, swimmers in heats.items():
+            lanes = []
+            for swimmer_key, best_swim in swimmers.items():
+                lane, name = parse_legacy_key(swimmer_key)
+                best_swim = dict(best_swim)
+                error = best_swim.pop(LEGACY_ERROR_KEY, None)
+                lanes.append(LaneEntry(lane, name, '', '',
+                                       BestSwim(**best_swim, error=error)))
+            event_heats.append(Heat(int(heat_number), lanes))
+        event_heats.sort(key=lambda heat: heat.number)
+        events.append(Event(event_number, event_name, heats=event_heats))
+    # old files were saved with sorted keys, which put '(10, ...)' first
+    events.sort(key=lambda event: event.number)
+    return Session(data['meet_name'], data['session_number'], events)
+
+def export_session_json(session: Session, path: str) -> None:
+    '''
+    Exports the session to a JSON file.
+    '''
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(session_to_dict(session), file, indent=4, ensure_ascii=False)
+
+def import_session_json(path: str) -> Session | None:
+    '''
+    Imports a session from a JSON file exported by export_session_json or
+    saved by an older version of the application. Returns None if the file
+    does not exist or holds no session.
+    '''
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return None
+    if isinstance(data.get('events'), list):
+        return session_from_dict(data)
+    return session_from_legacy_dict(data)
+
+###############################################################################
+
+def save_session_data(session: Session) -> None:
+    '''
+    Saves the session to session_data.bin and exports it to session_data.json.
+    '''
+    save_session(session, SESSION_BINARY_PATH)
+    export_session_json(session, SESSION_JSON_PATH)
+
+def load_session_data() -> Session | None:
+    '''
+    Loads the session from session_data.bin, or imports it from
+    session_data.json if there is no binary file yet (e.g. a session file of an
+    older version). Returns None if neither holds a session.
+    '''
+    session = load_session(SESSION_BINARY_PATH)
+    if session is None:
+        session = import_session_json(SESSION_JSON_PATH)
+    return session
@@ -0,0 +1,136 @@
+'''
+This file contains the typed session model that retrieve_data produces and
+populate_html renders:
+
+Session
+ |  meet_name, session_number
+ V
+Event                   (one per individual event in the session)
+ |  number, name
+ V
+Heat                    (the heats within NUM_HEATS of the last one)
+ |  number
+ V
+LaneEntry               (one per swimmer in the heat)
+ |  lane, name, born, club
+ V
+BestSwim                (the swimmer's best swim, or an error)
+
+The heats of an Event can be loaded lazily (see serialization.py), so that
+reading a session file only decodes the events that are used.
+'''
+
+from dataclasses import dataclass, field, fields
+from typing import Callable
+
+@dataclass
+class BestSwim:
+    '''
+    The best swim of a swimmer in an event. Any field can be None if it could
+    not be retrieved. If error is not None, the other fields hold as much as
+    was retrieved before the error.
+
+    degraded is set when parts of the best swim were skipped to finish before
+    the deadline of the retrieval: 'splits' if the splits were skipped and
+    final_time is the one shown in Tempus, 'skipped' if nothing was looked up.
+    '''
+    meet_name: str | None = None
+    meet_date: str | None = None
+    meet_location: str | None = None
+    result_url: str | None = None
+    final_time: str | None = None
+    avg50: str | None = None
+    # { '50m': 'time', '100m': 'time (last 50 time)', ... }
+    splits: dict[str, str] | None = None
+    all_times_url: str | None = None
+    all_events_url: str | None = None
+    error: str | None = None
+    # added after the other fields, so that older tuples still load
+    degraded: str | None = None
+
+    def to_tuple(self) -> tuple:
+        '''
+        Returns the fields as a tuple, in declaration order.
+        '''
+        return tuple(getattr(self, f.name) for f in fields(self))
+
+    @classmethod
+    def from_tuple(cls, values: tuple) -> 'BestSwim':
+        '''
+        Creates a BestSwim from a tuple returned by to_tuple.
+        '''
+        return cls(*values)
+
+@dataclass
+class LaneEntry:
+    '''
+    A swimmer in a lane of a heat.
+    '''
+    lane: int
+    name: str
+    born: str
+    club: str
+    best_swim: BestSwim
+
+@dataclass
+class Heat:
+    '''
+    A heat of an event with its lanes.
+    '''
+    number: int
+    lanes: list[LaneEntry] = field(default_factory=list)
+
+class Event:
+    '''
+    An event of a session with its heats. The heats are either given directly
+    or loaded by the heats_loader on first access.
+    '''
+    def __init__(self, number: int, name: str,
+                 heats: list[Heat] | None = None,
+                 heats_loader: Callable[[], list[Heat]] | None = None
+                 ) -> None:
+        assert (heats is None) != (heats_loader is None), \
+            'Give either heats or heats_loader.'
+        self.number = number
+        self.name = name
+        self._heats = heats
+        self._heats_loader = heats_loader
+
+    @property
+    def heats(self) -> list[Heat]:
+        if self._heats is None:
+            self._heats = self._heats_loader()
+            self._heats_loader = None
+        return self._heats
+
+    @heats.setter
+    def heats(self, heats: list[Heat]) -> None:
+        self._heats = heats
+        self._heats_loader = None
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Event):
+            return NotImplemented
+        return ((self.number, self.name, self.heats) ==
+                (other.number, other.name, other.heats))
+
+    def __repr__(self) -> str:
+        return f'Event(number={self.number!r}, name={self.name!r})'
+
+@dataclass
+class Session:
+    '''
+    A session of a meet with the best swims of its swimmers, in program order.
+    '''
+    meet_name: str
+    session_number: str
+    events: list[Event] = field(default_factory=list)
+
+    def get_event(self, number: int) -> Event | None:
+        '''
+        Returns the event with the given number, or None.
+        '''
+        for event in self.events:
+            if event.number == number:
+                return event
+        return None
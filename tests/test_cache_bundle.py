@@ -0,0 +1,85 @@
+'''
+Tests of exporting and merging cache bundles in cache_bundle.py.
+'''
+import cache.cache_paths as cache_paths
+from cache.cache_bundle import (BUNDLED_CACHES,
+                                write_cache_manifest,
+                                export_cache_bundle,
+                                import_cache_bundle)
+
+def make_caches(monkeypatch, directory, caches: dict[str, dict]) -> None:
+    '''
+    Makes directory the cache directory and stores the given entries of each
+    bundled cache in it. The other bundled caches are stored empty.
+    '''
+    monkeypatch.setattr(cache_paths, 'cache_directory', str(directory))
+    for cache_name, _, save, module, dict_name in BUNDLED_CACHES:
+        monkeypatch.setattr(module, dict_name,
+                            dict(caches.get(cache_name, dict())))
+        monkeypatch.setattr(module, dict_name + '_access', dict())
+        save()
+
+def get_cache(cache_name: str) -> dict:
+    '''
+    Returns the in-memory entries of a bundled cache.
+    '''
+    for name, _, _, module, dict_name in BUNDLED_CACHES:
+        if name == cache_name:
+            return getattr(module, dict_name)
+
+MACHINE_A = {
+    'swimmer_id': {'Åsa Öberg|2010|SK Neptun': '101',
+                   'Bo Ek|2011|Väsby SS': '102',
+                   'Cia Lind|2009|Linköpings Ass': '103'},
+    'meet_program': {'1000': [[1, '3', ['3', '100m Frisim Damer']]]}
+}
+MACHINE_B = {
+    'swimmer_id': {'Åsa Öberg|2010|SK Neptun': '101',
+                   'Cia Lind|2009|Linköpings Ass': '999'}
+}
+
+def test_import_merge_counts(monkeypatch, tmp_path):
+    bundle = tmp_path / 'bundle.zip'
+    make_caches(monkeypatch, tmp_path / 'a', MACHINE_A)
+    assert export_cache_bundle(str(bundle)) == {
+        'swimmer_id': 3, 'meet_id_and_location': 0, 'meet_results': 0,
+        'meet_program': 1}
+    make_caches(monkeypatch, tmp_path / 'b', MACHINE_B)
+    counts = import_cache_bundle(str(bundle))
+    assert counts['swimmer_id'] == {'added': 1, 'unchanged': 1,
+                                    'conflicting': 1}
+    assert counts['meet_program'] == {'added': 1, 'unchanged': 0,
+                                      'conflicting': 0}
+    assert counts['meet_results'] == {'added': 0, 'unchanged': 0,
+                                      'conflicting': 0}
+    # the conflicting entry is kept as it is locally
+    assert get_cache('swimmer_id') == {
+        'Åsa Öberg|2010|SK Neptun': '101',
+        'Bo Ek|2011|Väsby SS': '102',
+        'Cia Lind|2009|Linköpings Ass': '999'}
+    # importing again adds nothing
+    counts = import_cache_bundle(str(bundle))
+    assert counts['swimmer_id'] == {'added': 0, 'unchanged': 2,
+                                    'conflicting': 1}
+    assert counts['meet_program'] == {'added': 0, 'unchanged': 1,
+                                      'conflicting': 0}
+
+def test_export_against_manifest(monkeypatch, tmp_path):
+    manifest = tmp_path / 'manifest.json'
+    bundle = tmp_path / 'bundle.zip'
+    make_caches(monkeypatch, tmp_path / 'b', MACHINE_B)
+    write_cache_manifest(str(manifest))
+    make_caches(monkeypatch, tmp_path / 'a', MACHINE_A)
+    # only the entries B does not have with the same content
+    assert export_cache_bundle(str(bundle), str(manifest)) == {
+        'swimmer_id': 2, 'meet_id_and_location': 0, 'meet_results': 0,
+        'meet_program': 1}
+    assert export_cache_bundle(str(bundle), str(tmp_path / 'missing')) \
+        is None
+
+def test_import_not_a_bundle(monkeypatch, tmp_path):
+    make_caches(monkeypatch, tmp_path, MACHINE_B)
+    manifest = tmp_path / 'manifest.json'
+    write_cache_manifest(str(manifest))
+    assert import_cache_bundle(str(manifest)) is None
+    assert import_cache_bundle(str(tmp_path / 'missing.zip')) is None
@@ -0,0 +1,84 @@
+'''
+Tests of the per-host circuit breaker in circuit_breaker.py.
+'''
+from types import SimpleNamespace
+
+import pytest
+
+import retrieve_data.circuit_breaker as circuit_breaker
+from retrieve_data.circuit_breaker import (FAILURE_THRESHOLD,
+                                           OPEN_SECONDS,
+                                           MAX_OPEN_SECONDS,
+                                           reset_circuit_breakers,
+                                           allow_request,
+                                           record_request_success,
+                                           record_request_failure,
+                                           is_host_unavailable)
+
+URL = 'https://www.tempusopen.se/index.php?r=swimmer'
+OTHER_URL = 'https://livetiming.se/index.php?cid=1000'
+HOST = 'www.tempusopen.se'
+
+@pytest.fixture
+def clock(monkeypatch):
+    '''
+    Closes all circuits and replaces the clock of the circuit breaker with
+    one that only moves when the test sets clock.now.
+    '''
+    reset_circuit_breakers()
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(circuit_breaker, 'time',
+                        SimpleNamespace(monotonic=lambda: clock.now))
+    yield clock
+    reset_circuit_breakers()
+
+def open_circuit() -> None:
+    '''
+    Fails requests to URL until its circuit opens.
+    '''
+    for _ in range(FAILURE_THRESHOLD - 1):
+        assert not record_request_failure(URL)
+    assert record_request_failure(URL)
+
+def test_opens_after_failures_in_a_row(clock):
+    for _ in range(FAILURE_THRESHOLD - 1):
+        record_request_failure(URL)
+    # a success in between starts the count over
+    record_request_success(URL)
+    for _ in range(FAILURE_THRESHOLD - 1):
+        assert not record_request_failure(URL)
+    assert allow_request(URL)
+    assert record_request_failure(URL)
+    assert is_host_unavailable(HOST)
+    assert not allow_request(URL)
+    # the circuits of other hosts are independent
+    assert allow_request(OTHER_URL)
+
+def test_probe_closes_circuit(clock):
+    open_circuit()
+    clock.now += OPEN_SECONDS - 1
+    assert not allow_request(URL)
+    clock.now += 1
+    assert allow_request(URL)
+    # only one probe at a time
+    assert not allow_request(URL)
+    record_request_success(URL)
+    assert not is_host_unavailable(HOST)
+    assert allow_request(URL)
+    assert allow_request(URL)
+
+def test_failed_probe_doubles_open_time(clock):
+    open_circuit()
+    open_seconds = OPEN_SECONDS
+    # 30, 60, 120, 240 and then at most 300 seconds
+    for _ in range(5):
+        clock.now += open_seconds - 1
+        assert not allow_request(URL)
+        clock.now += 1
+        assert allow_request(URL)
+        assert not record_request_failure(URL)
+        assert is_host_unavailable(HOST)
+        open_seconds = min(open_seconds * 2, MAX_OPEN_SECONDS)
+    assert open_seconds == MAX_OPEN_SECONDS
+    clock.now += MAX_OPEN_SECONDS
+    assert allow_request(URL)
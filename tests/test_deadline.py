@@ -0,0 +1,75 @@
+'''
+Tests of the degradation levels and request timeouts in deadline.py.
+'''
+from types import SimpleNamespace
+
+import pytest
+
+import retrieve_data.deadline as deadline
+from retrieve_data.deadline import (LEVEL_FULL,
+                                    LEVEL_SKIP_SPLITS,
+                                    LEVEL_SKIP_HEATS,
+                                    LEVEL_SKIP_ALL,
+                                    FINISH_RESERVE_SECONDS,
+                                    set_deadline,
+                                    has_deadline,
+                                    set_work_total,
+                                    set_work_unit_progress,
+                                    finish_work_unit,
+                                    get_degradation_level,
+                                    get_request_timeout)
+
+@pytest.fixture
+def clock(monkeypatch):
+    '''
+    Replaces the clock of the deadline with one that only moves when the
+    test sets clock.now, and removes the deadline afterwards.
+    '''
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(deadline, 'time',
+                        SimpleNamespace(monotonic=lambda: clock.now))
+    yield clock
+    set_deadline(None)
+    set_work_total(0)
+
+def test_no_deadline(clock):
+    set_deadline(None)
+    assert not has_deadline()
+    assert get_degradation_level() == LEVEL_FULL
+    assert get_request_timeout(10) == 10
+
+def test_deadline_must_exceed_finish_reserve(clock):
+    with pytest.raises(AssertionError):
+        set_deadline(FINISH_RESERVE_SECONDS)
+
+def test_levels_follow_the_pace(clock):
+    # a budget of 100 seconds for 10 events
+    set_deadline(100 + FINISH_RESERVE_SECONDS)
+    set_work_total(10)
+    assert get_degradation_level() == LEVEL_FULL
+    for _ in range(5):
+        finish_work_unit()
+    clock.now = 50
+    assert get_degradation_level() == LEVEL_FULL
+    # behind the pace: 44% of the time left for 50% of the work
+    clock.now = 56
+    assert get_degradation_level() == LEVEL_SKIP_SPLITS
+    clock.now = 76
+    assert get_degradation_level() == LEVEL_SKIP_HEATS
+    # progress within the current event counts too
+    set_work_unit_progress(0.9)
+    assert get_degradation_level() == LEVEL_SKIP_SPLITS
+    finish_work_unit()
+    for _ in range(4):
+        finish_work_unit()
+    assert get_degradation_level() == LEVEL_FULL
+
+def test_deadline_reached(clock):
+    set_deadline(100 + FINISH_RESERVE_SECONDS)
+    set_work_total(10)
+    clock.now = 95
+    assert get_request_timeout(10) == 5
+    assert get_request_timeout(2) == 2
+    clock.now = 100
+    assert get_degradation_level() == LEVEL_SKIP_ALL
+    assert get_request_timeout(10) is None
@@ -0,0 +1,79 @@
+'''
+Tests of the heat list parser and the start list cache in heat_list.py.
+'''
+import cache.start_list_cache as start_list_cache_module
+from retrieve_data.heat_list import (StartList,
+                                     StartListEntry,
+                                     get_start_list,
+                                     get_last_start_list)
+
+URL = 'https://livetiming.se/startlist.php?cid=1000&session=1&event=3'
+
+def make_row(*cells: str) -> str:
+    '''
+    Returns a table row with the cells on lines of their own, like the rows
+    of a LiveTiming heat list.
+    '''
+    return ('<tr>\n' + '\n'.join(f'<td>{cell}</td>' for cell in cells)
+            + '\n</tr>\n')
+
+def make_heat_list(lanes_by_heat: list[list[tuple]]) -> bytes:
+    '''
+    Returns a heat list page of 100m Frisim Damer with the given lanes
+    (lane, name, born, club, seed time) in each heat.
+    '''
+    rows = ['<tr><th>Heatlista</th></tr>\n', make_row('Bassäng: 25m')]
+    for heat_number, lanes in enumerate(lanes_by_heat, start=1):
+        rows.append(make_row(f'Gren 3 100m Frisim Damer Heat {heat_number} '
+                             f'({len(lanes_by_heat)})'))
+        for lane in lanes:
+            rows.append(make_row(*lane))
+    return f'<html><body><table>{"".join(rows)}</table></body></html>' \
+        .encode('utf-8')
+
+HEAT_LIST = make_heat_list([
+    [('1', 'Åsa Öberg', '2010', 'SK NEPTUN', '1:05.10'),
+     ('2', 'Bo Ek', '2011', 'Väsby SS', '-')],
+    [('3', 'Cia Lind', '2009', 'Linköpings ASS', '1:01.00')]
+])
+
+def test_get_start_list(monkeypatch):
+    monkeypatch.setattr(start_list_cache_module, 'start_list_cache', dict())
+    start_list = get_start_list(URL, HEAT_LIST)
+    assert start_list.event_name == '100m Frisim Damer'
+    assert start_list.pool == '25m'
+    assert start_list.total_heats == 2
+    assert [heat.number for heat in start_list.heats] == [1, 2]
+    assert start_list.heats[0].entries == [
+        StartListEntry(1, 'Åsa Öberg', '2010', 'SK Neptun'),
+        StartListEntry(2, 'Bo Ek', '2011', 'Väsby SS')]
+    assert start_list.heats[1].entries == [
+        StartListEntry(3, 'Cia Lind', '2009', 'Linköpings Ass')]
+    assert [heat.number for heat in start_list.get_included_heats(1)] == [2]
+
+def test_get_start_list_uses_the_cache(monkeypatch):
+    monkeypatch.setattr(start_list_cache_module, 'start_list_cache', dict())
+    start_list = get_start_list(URL, HEAT_LIST)
+    # an unchanged page is not parsed again
+    monkeypatch.setattr('retrieve_data.heat_list.parse_start_list', None)
+    assert get_start_list(URL, HEAT_LIST) == start_list
+
+def test_get_start_list_changed_page(monkeypatch):
+    monkeypatch.setattr(start_list_cache_module, 'start_list_cache', dict())
+    get_start_list(URL, HEAT_LIST)
+    changed = make_heat_list([
+        [('4', 'Dan Berg', '2010', 'Väsby SS', '1:03.00')]])
+    start_list = get_start_list(URL, changed)
+    assert start_list.total_heats == 1
+    assert start_list.heats[0].entries[0].name == 'Dan Berg'
+    assert get_last_start_list(URL) == start_list
+    assert get_last_start_list(URL + '&heat=2') is None
+
+def test_get_start_list_without_heats(monkeypatch):
+    monkeypatch.setattr(start_list_cache_module, 'start_list_cache', dict())
+    assert get_start_list(URL, make_heat_list([])) is None
+    assert get_last_start_list(URL) is None
+
+def test_start_list_tuple_round_trip():
+    start_list = StartList('100m Frisim Damer', '25m', 1)
+    assert StartList.from_tuple(start_list.to_tuple()) == start_list
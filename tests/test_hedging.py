@@ -0,0 +1,78 @@
+'''
+Tests of the hedged requests in hedging.py.
+'''
+import threading
+from collections import deque
+
+import pytest
+
+import retrieve_data.hedging as hedging
+from retrieve_data.hedging import (MIN_LATENCY_SAMPLES,
+                                   MAX_HEDGED_FRACTION,
+                                   set_hedging,
+                                   observe_latency,
+                                   get_hedge_delay,
+                                   reserve_hedge,
+                                   send_request)
+
+URL = 'https://www.tempusopen.se/index.php?r=swimmer'
+
+@pytest.fixture(autouse=True)
+def reset_hedging(monkeypatch):
+    '''
+    Starts every test with hedging off, no observed latencies and no counted
+    requests.
+    '''
+    monkeypatch.setattr(hedging, 'host_latencies', dict())
+    monkeypatch.setattr(hedging, 'num_requests', 0)
+    monkeypatch.setattr(hedging, 'num_hedged_requests', 0)
+    yield
+    set_hedging(False)
+
+def test_reserve_hedge_keeps_to_the_fraction(monkeypatch):
+    assert not reserve_hedge()
+    requests = round(10 / MAX_HEDGED_FRACTION)
+    monkeypatch.setattr(hedging, 'num_requests', requests)
+    assert all(reserve_hedge() for _ in range(10))
+    assert not reserve_hedge()
+    assert hedging.num_hedged_requests == 10
+    monkeypatch.setattr(hedging, 'num_requests',
+                        requests + round(1 / MAX_HEDGED_FRACTION))
+    assert reserve_hedge()
+    assert not reserve_hedge()
+
+def test_hedge_delay_is_the_percentile():
+    for i in range(MIN_LATENCY_SAMPLES - 1):
+        observe_latency(URL, 0.01 * (i + 1))
+    assert get_hedge_delay(URL) is None
+    observe_latency(URL, 0.2)
+    # the 95th percentile of 20 latencies is the 19th smallest
+    assert get_hedge_delay(URL) == 0.19
+    assert get_hedge_delay('https://livetiming.se/index.php') is None
+
+def test_send_request_without_hedging():
+    for _ in range(MIN_LATENCY_SAMPLES):
+        observe_latency(URL, 0.001)
+    assert send_request(URL, lambda: 'response') == 'response'
+    assert hedging.num_requests == 1
+    assert len(hedging.host_latencies['www.tempusopen.se']) == \
+        MIN_LATENCY_SAMPLES + 1
+
+def test_send_request_hedges_slow_request(monkeypatch):
+    set_hedging(True)
+    monkeypatch.setattr(hedging, 'num_requests', 100)
+    hedging.host_latencies['www.tempusopen.se'] = deque(
+        [0.01] * MIN_LATENCY_SAMPLES)
+    release = threading.Event()
+    calls = []
+    def request():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            # the first request hangs until the hedged one has answered
+            release.wait(5)
+            return 'first'
+        return 'hedge'
+    assert send_request(URL, request) == 'hedge'
+    release.set()
+    assert len(calls) == 2
+    assert hedging.num_hedged_requests == 1
@@ -0,0 +1,53 @@
+'''
+Tests of the indexed meet matching in meet_matcher.py.
+'''
+from retrieve_data.meet_matcher import (build_meet_index,
+                                        find_meet,
+                                        jaccard_similarity,
+                                        meet_names_match)
+
+ARCHIVE_ROWS = [
+    ('Stockholm Open Sprint', '2024-03-01', '101', 'Eriksdalsbadet'),
+    ('Sundsvall Sim 2023', '2023-11-10', '102', 'Sundsvall'),
+    ('Ungdoms GP Långbana', '2024-06-08', '103', 'Malmö'),
+    ('Ungdoms GP Kortbana', '2024-11-16', '104', 'Malmö'),
+    ('Västerås Simsällskaps Vårtävling', '2024-04-20', '105',
+     'Västerås')
+]
+
+def test_jaccard_similarity():
+    assert jaccard_similarity(frozenset('ab'), frozenset('ab')) == 1.0
+    assert jaccard_similarity(frozenset('ab'), frozenset('bc')) == 1 / 3
+    assert jaccard_similarity(frozenset('a'), frozenset('b')) == 0.0
+    assert jaccard_similarity(frozenset(), frozenset()) == 0.0
+
+def test_find_meet_exact_matches():
+    index = build_meet_index(ARCHIVE_ROWS)
+    assert find_meet(index, 'stockholm open sprint', '2024-03-01')[2] == '101'
+    assert find_meet(index, 'Sundsvall-Sim (2023)', '2023-11-10')[2] == '102'
+    # the same signature through the abbreviations
+    assert find_meet(index, 'UGP 50', '2024-06-08')[2] == '103'
+    assert find_meet(index, 'UGP 25', '2024-11-16')[2] == '104'
+
+def test_find_meet_near_match():
+    index = build_meet_index(ARCHIVE_ROWS)
+    row = find_meet(index, 'Västerås Simsällskaps Stora Vårtävling',
+                    '2024-04-20')
+    assert row[2] == '105'
+    # the pool length must agree, so the long course meet is the near match
+    assert find_meet(index, 'Ungdoms GP Långbana Höst', '2024-11-16')[2] \
+        == '103'
+
+def test_find_meet_no_match():
+    index = build_meet_index(ARCHIVE_ROWS)
+    # a different meet at the same venue is not a near match
+    assert find_meet(index, 'Stockholm Open Distans', '2024-03-01') is None
+    # only meets of the same year are considered
+    assert find_meet(index, 'Stockholm Open Sprinten', '2025-03-01') is None
+
+def test_find_meet_agrees_with_meet_names_match():
+    index = build_meet_index(ARCHIVE_ROWS)
+    for name, date, meet_id, _ in ARCHIVE_ROWS:
+        row = find_meet(index, name, date)
+        assert row[2] == meet_id
+        assert meet_names_match(name, date, row[0], row[1])
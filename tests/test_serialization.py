@@ -0,0 +1,88 @@
+'''
+Tests of saving and loading the session model in serialization.py.
+'''
+import json
+
+from session_model.session_model import (Session,
+                                         Event,
+                                         Heat,
+                                         LaneEntry,
+                                         BestSwim)
+from session_model.serialization import (MAGIC,
+                                         PREAMBLE,
+                                         FORMAT_VERSION,
+                                         save_session,
+                                         load_session,
+                                         export_session_json,
+                                         import_session_json)
+
+def make_session() -> Session:
+    '''
+    Returns a small session with a full best swim, an error and a degraded
+    best swim.
+    '''
+    best_swim = BestSwim('Sundsvall Sim', '2023-11-10', 'Sundsvall',
+                         'https://example.com/result', '1:02.34', '31.17',
+                         {'50m': '30.01', '100m': '1:02.34 (32.33)'},
+                         'https://example.com/times',
+                         'https://example.com/events')
+    return Session('Stockholm Open', '2', [
+        Event(1, '100m Frisim Damer', heats=[
+            Heat(1, [LaneEntry(3, 'Åsa Öberg', '2010', 'SK Neptun',
+                               best_swim),
+                     LaneEntry(4, 'Bo Ek', '2011', 'Väsby SS',
+                               BestSwim(error='No swims found'))])]),
+        Event(3, '200m Ryggsim Herrar', heats=[
+            Heat(2, [LaneEntry(1, 'Cia Lind', '2009', 'Linköpings ASS',
+                               BestSwim(final_time='2:20.00',
+                                        degraded='splits'))]),
+            Heat(3, [])])])
+
+def test_binary_round_trip(tmp_path):
+    session = make_session()
+    path = tmp_path / 'session_data.bin'
+    save_session(session, path)
+    assert load_session(path) == session
+
+def test_binary_heats_are_loaded_lazily(tmp_path):
+    path = tmp_path / 'session_data.bin'
+    save_session(make_session(), path)
+    event = load_session(path).get_event(3)
+    assert event.name == '200m Ryggsim Herrar'
+    assert event.heats[0].lanes[0].best_swim.degraded == 'splits'
+
+def test_binary_other_version_is_not_loaded(tmp_path):
+    path = tmp_path / 'session_data.bin'
+    save_session(make_session(), path)
+    data = path.read_bytes()
+    preamble = data[len(MAGIC):len(MAGIC) + PREAMBLE.size]
+    _, header_length = PREAMBLE.unpack(preamble)
+    path.write_bytes(MAGIC + PREAMBLE.pack(FORMAT_VERSION - 1, header_length)
+                     + data[len(MAGIC) + PREAMBLE.size:])
+    assert load_session(path) is None
+    assert load_session(tmp_path / 'missing.bin') is None
+
+def test_json_round_trip(tmp_path):
+    session = make_session()
+    path = tmp_path / 'session_data.json'
+    export_session_json(session, path)
+    assert import_session_json(path) == session
+
+def test_legacy_json_import(tmp_path):
+    path = tmp_path / 'session_data.json'
+    path.write_text(json.dumps({
+        'meet_name': 'Stockholm Open',
+        'session_number': '2',
+        'events': {
+            '(10, 50m Fjärilsim Damer)': {'1': {
+                '(5, Åsa Öberg)': {'final_time': '29.50'}}},
+            '(3, 100m Frisim Damer)': {'1': {
+                '(4, Bo Ek)': {'Error': 'No swims found'}}}
+        }
+    }), encoding='utf-8')
+    session = import_session_json(path)
+    assert [event.number for event in session.events] == [3, 10]
+    assert session.get_event(3).heats[0].lanes[0] == \
+        LaneEntry(4, 'Bo Ek', '', '', BestSwim(error='No swims found'))
+    assert session.get_event(10).heats[0].lanes[0].best_swim.final_time == \
+        '29.50'
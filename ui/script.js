@@ -9,145 +9,429 @@ window.addEventListener('click', event => {
         handleHeatContainerClick(element);
     } else if (element.classList.contains('swimmer-container')) {
         handleSwimmerContainerClick(element);
-    } 
+    } else if (element.classList.contains('search-result')) {
+        handleSearchResultClick(element);
+    }
+    if (!element.closest('.search')) {
+        hideSearchResults();
+    }
 });
 
+// The selected elements are tracked, so that a click only touches the
+// elements it changes instead of every element of the page.
+let selectedEventItem = null;
+let shownRightColumn = null;
+let selectedHeatContainer = null;
+
+// Layout reads and writes are batched into the next animation frame, where
+// all reads run before all writes, so that a click forces at most one layout.
+const layoutJobs = [];
+let layoutFrame = null;
+
+function scheduleLayout(read, write) {
+    // write is called with the result of read
+    layoutJobs.push([read, write]);
+    if (layoutFrame === null) {
+        layoutFrame = requestAnimationFrame(flushLayout);
+    }
+}
+
+function flushLayout() {
+    layoutFrame = null;
+    const jobs = layoutJobs.splice(0);
+    const results = jobs.map(([read]) => read());
+    jobs.forEach(([, write], index) => write(results[index]));
+}
+
+// The vertical paddings of the rules in style.css, looked up once.
+const cssPaddings = new Map();
+
+function getCssVerticalPadding(selector) {
+    if (!cssPaddings.has(selector)) {
+        const cssRules = document.styleSheets[0].cssRules;
+        const rule = Array.from(cssRules)
+            .find(rule => rule.selectorText === selector);
+        cssPaddings.set(selector, parseInt(rule.style.paddingTop) +
+                                  parseInt(rule.style.paddingBottom));
+    }
+    return cssPaddings.get(selector);
+}
+
 
 function handleEventItemClick(element) {
     // clicked on the selected event-item
-    if (element.classList.contains('event-selected')) {
+    if (element === selectedEventItem) {
         element.classList.remove('event-selected');
-        const allRightColumns = document.querySelectorAll('.right-column');
-        allRightColumns.forEach(column => {
-            column.classList.add('hidden');
-        });    
+        selectedEventItem = null;
+        if (shownRightColumn) {
+            shownRightColumn.classList.add('hidden');
+            shownRightColumn = null;
+        }
         return;
     }
 
     // switch the selected event-item
-    const allEventItems = document.querySelectorAll('.event-item');
-    allEventItems.forEach(item => {
-        item.classList.remove('event-selected');
-    });
+    if (selectedEventItem) {
+        selectedEventItem.classList.remove('event-selected');
+    }
     element.classList.add('event-selected');
+    selectedEventItem = element;
 
     // switch shown right column
-    const allRightColumns = document.querySelectorAll('.right-column');
-    allRightColumns.forEach(column => {
-        column.classList.add('hidden');
-    });
+    if (shownRightColumn) {
+        shownRightColumn.classList.add('hidden');
+    }
     const numericId = element.id.replace('event-item-', '');
-    const thisRightColumn = document
-        .querySelector(`#right-column-${numericId}`);
-    thisRightColumn.classList.remove('hidden');
+    shownRightColumn = document.getElementById(`right-column-${numericId}`);
+    shownRightColumn.classList.remove('hidden');
 }
 
 function getHeatContentHeight(element) {
-    // get padding of heat-content
-    const cssRules = document.styleSheets[0].cssRules;
-    const heatContentIndex = Object.keys(cssRules).find(
-        key => cssRules[key].selectorText === '.heat-content');
-    const paddingTop = cssRules[heatContentIndex].style.paddingTop;
-    const paddingBottom = cssRules[heatContentIndex].style.paddingBottom;
-    const padding = parseInt(paddingTop) + parseInt(paddingBottom);
-    
     const heatContent = element.querySelector('.heat-content');
-    newHeight = parseInt(heatContent.scrollHeight) + padding;
-    return newHeight;
+    return heatContent.scrollHeight + getCssVerticalPadding('.heat-content');
 }
 
 function openHeatContent(element) {
     const heatContent = element.querySelector('.heat-content');
-    heatContent.style.maxHeight = getHeatContentHeight(element).toString() + 
-                                  "px";
+    scheduleLayout(() => getHeatContentHeight(element), height => {
+        // the heat may have been closed before the frame
+        if (!element.classList.contains('heat-selected')) {
+            return;
+        }
+        heatContent.style.maxHeight = height.toString() + "px";
+        heatContent.classList.remove('hidden');
+    });
 }
 
 function closeHeatContent(element) {
     const heatContent = element.querySelector('.heat-content');
+    heatContent.classList.add('hidden');
     heatContent.style.maxHeight = null;
 }
 
 function handleHeatContainerClick(element) {
     // clicked on the selected heat-container
-    if (element.classList.contains('heat-selected')) {
+    if (element === selectedHeatContainer) {
         element.classList.remove('heat-selected');
-        element.querySelector('.heat-content').classList.add('hidden');
         closeHeatContent(element);
+        selectedHeatContainer = null;
         return;
     }
 
-    // switch the selected heat-container
-    const allHeatContainers = document.querySelectorAll('.heat-container');
-    allHeatContainers.forEach(container => {
-        container.classList.remove('heat-selected');
-    });
-    element.classList.add('heat-selected');
-
-    // switch shown heat-content
-    console.log("closing all other heat-content");
-    allHeatContainers.forEach(container => {
-        const heatContent = container.querySelector('.heat-content');
-        if (!heatContent.classList.contains('hidden')) {
-            heatContent.classList.add('hidden');
-            closeHeatContent(container);    
-        }
-    });
-    console.log("opening clicked heat-content");
-    if (element.querySelector('.heat-content').classList.contains('hidden')) {
-        openHeatContent(element);
-        element.querySelector('.heat-content').classList.remove('hidden');
+    // switch the selected heat-container, closing the heat-content of the
+    // previous one
+    if (selectedHeatContainer) {
+        selectedHeatContainer.classList.remove('heat-selected');
+        closeHeatContent(selectedHeatContainer);
     }
+    element.classList.add('heat-selected');
+    selectedHeatContainer = element;
+    openHeatContent(element);
 }
 
 function getSwimmerContentHeight(element) {
-    // get padding of swimmer-content
-    const cssRules = document.styleSheets[0].cssRules;
-    const swimmerContentIndex = Object.keys(cssRules).find(
-        key => cssRules[key].selectorText === '.swimmer-content');
-    const paddingTop = cssRules[swimmerContentIndex].style.paddingTop;
-    const paddingBottom = cssRules[swimmerContentIndex].style.paddingBottom;
-    const padding = parseInt(paddingTop) + parseInt(paddingBottom);
-
     const swimmerContent = element.querySelector('.swimmer-content');
-    newHeight = parseInt(swimmerContent.scrollHeight) + padding;
-    return newHeight;
+    return swimmerContent.scrollHeight + 
+           getCssVerticalPadding('.swimmer-content');
 }
 
 function openSwimmerContent(element) {
+    // opens the swimmer-content and makes room for it in the heat-content
     const swimmerContent = element.querySelector('.swimmer-content');
-    swimmerContent.style.maxHeight = getSwimmerContentHeight(element)
+    const heatContent = element.closest('.heat-content');
+    const heatContainer = heatContent.closest('.heat-container');
+    scheduleLayout(() => [getSwimmerContentHeight(element),
+                          getHeatContentHeight(heatContainer)],
+                   ([swimmerHeight, heatHeight]) => {
+        // the swimmer may have been closed before the frame
+        if (!element.classList.contains('swimmer-selected')) {
+            return;
+        }
+        swimmerContent.style.maxHeight = swimmerHeight.toString() + "px";
+        heatContent.style.maxHeight = (heatHeight + swimmerHeight)
                                         .toString() + "px";
+        swimmerContent.classList.remove('hidden');
+    });
 }
 
 function closeSwimmerContent(element) {
     const swimmerContent = element.querySelector('.swimmer-content');
+    swimmerContent.classList.add('hidden');
     swimmerContent.style.maxHeight = null;
 }
 
-function adjustHeatContentHeight(element, swimmerContentHeight) {
-    const heatContent = element.closest('.heat-content');
-    const heatContainer = heatContent.closest('.heat-container');
-    const newHeight = getHeatContentHeight(heatContainer) + 
-                      swimmerContentHeight;
-    heatContent.style.maxHeight = newHeight.toString() + "px";
-}
-
 function handleSwimmerContainerClick(element) {
     // clicked on the selected swimmer-container
     if (element.classList.contains('swimmer-selected')) {
         element.classList.remove('swimmer-selected');
-        element.querySelector('.swimmer-content').classList.add('hidden');
         closeSwimmerContent(element);
         return;
     }
 
-    // show the selected swimmer-container
+    // show the selected swimmer-container and its swimmer-content
     element.classList.add('swimmer-selected');
+    openSwimmerContent(element);
+}
 
-    // show swimmer-content
-    if (element.querySelector('.swimmer-content').classList.contains('hidden')) {
-        openSwimmerContent(element);
-        adjustHeatContentHeight(element, getSwimmerContentHeight(element));
-        element.querySelector('.swimmer-content').classList.remove('hidden');
+// Watch mode: the UI server pushes the changed events as server-sent events.
+// When the page is not served by it (e.g. Live Server), the stream fails once
+// and is not retried.
+if (location.protocol.startsWith('http')) {
+    const eventSource = new EventSource('/events');
+    eventSource.addEventListener('event-update', message => {
+        handleEventUpdate(JSON.parse(message.data));
+    });
+    eventSource.addEventListener('event-remove', message => {
+        handleEventRemove(JSON.parse(message.data));
+    });
+}
+
+function handleEventUpdate(update) {
+    // replace the right column, keeping it shown if it was shown
+    const newRightColumn = createElementFromHTML(update.right_column);
+    const oldRightColumn = document
+        .querySelector(`#right-column-${update.event_number}`);
+    if (oldRightColumn) {
+        if (!oldRightColumn.classList.contains('hidden')) {
+            newRightColumn.classList.remove('hidden');
+        }
+        if (oldRightColumn === shownRightColumn) {
+            shownRightColumn = newRightColumn;
+        }
+        if (oldRightColumn.contains(selectedHeatContainer)) {
+            selectedHeatContainer = null;
+        }
+        oldRightColumn.replaceWith(newRightColumn);
+    } else {
+        document.querySelector('.two-columns').appendChild(newRightColumn);
+    }
+
+    // replace the part of the search index of the event
+    if (update.search_index) {
+        searchIndex[update.event_number] = update.search_index;
+        searchWords.delete(update.event_number);
+    }
+
+    // add the event-item if the event is new, or replace it if it was loading
+    const oldEventItem = document
+        .querySelector(`#event-item-${update.event_number}`);
+    if (!oldEventItem) {
+        document.querySelector('.event-menu')
+            .appendChild(createElementFromHTML(update.event_item));
+    } else if (oldEventItem.classList.contains('loading')) {
+        const newEventItem = createElementFromHTML(update.event_item);
+        if (oldEventItem === selectedEventItem) {
+            newEventItem.classList.add('event-selected');
+            selectedEventItem = newEventItem;
+        }
+        oldEventItem.replaceWith(newEventItem);
     }
-}
\ No newline at end of file
+}
+
+function handleEventRemove(update) {
+    // remove an event that was shown as loading but has no start list
+    const eventItem = document
+        .querySelector(`#event-item-${update.event_number}`);
+    if (eventItem) {
+        if (eventItem === selectedEventItem) {
+            selectedEventItem = null;
+        }
+        eventItem.remove();
+    }
+    const rightColumn = document
+        .querySelector(`#right-column-${update.event_number}`);
+    if (rightColumn) {
+        if (rightColumn === shownRightColumn) {
+            shownRightColumn = null;
+        }
+        if (rightColumn.contains(selectedHeatContainer)) {
+            selectedHeatContainer = null;
+        }
+        rightColumn.remove();
+    }
+    delete searchIndex[update.event_number];
+    searchWords.delete(update.event_number);
+}
+
+function createElementFromHTML(html) {
+    const template = document.createElement('template');
+    template.innerHTML = html.trim();
+    return template.content.firstElementChild;
+}
+
+
+// Search: populate_html embeds a search index of the swimmers and clubs in
+// the page (see search_index.py), so searching never walks the page. The
+// index maps the first SEARCH_PREFIX_LENGTH characters of every normalized
+// word to the entries of each event.
+const SEARCH_PREFIX_LENGTH = 2;
+const MAX_SEARCH_RESULTS = 30;
+const searchIndex = JSON.parse(
+    document.querySelector('#search-index')?.textContent || '{}');
+// the normalized words of the entries of each event, made when first searched
+const searchWords = new Map();
+const searchInput = document.querySelector('.search-input');
+const searchResults = document.querySelector('.search-results');
+let searchFrame = null;
+// the swimmer-container of the last chosen search result
+let foundSwimmerContainer = null;
+
+if (searchInput) {
+    searchInput.addEventListener('input', () => {
+        // search at most once per frame while typing
+        if (searchFrame === null) {
+            searchFrame = requestAnimationFrame(() => {
+                searchFrame = null;
+                showSearchResults(search(searchInput.value));
+            });
+        }
+    });
+    searchInput.addEventListener('keydown', event => {
+        if (event.key === 'Escape') {
+            searchInput.value = '';
+            hideSearchResults();
+        } else if (event.key === 'Enter') {
+            const firstResult = searchResults.querySelector('.search-result');
+            if (firstResult) {
+                handleSearchResultClick(firstResult);
+            }
+        }
+    });
+    searchInput.addEventListener('focus', () => {
+        if (searchInput.value) {
+            showSearchResults(search(searchInput.value));
+        }
+    });
+}
+
+function normalizeSearchText(text) {
+    // the same normalization as normalize_search_text in search_index.py
+    return text.normalize('NFKD').replace(/\p{M}/gu, '').toLowerCase();
+}
+
+function getSearchWords(text) {
+    return normalizeSearchText(text).replace(/-/g, ' ').split(/\s+/)
+        .filter(word => word !== '');
+}
+
+function getEventSearchWords(eventNumber) {
+    if (!searchWords.has(eventNumber)) {
+        searchWords.set(eventNumber, searchIndex[eventNumber].entries
+            .map(entry => getSearchWords(`${entry[0]} ${entry[1]}`)));
+    }
+    return searchWords.get(eventNumber);
+}
+
+function getCandidateEntries(eventIndex, word) {
+    if (word.length >= SEARCH_PREFIX_LENGTH) {
+        return eventIndex.prefixes[word.slice(0, SEARCH_PREFIX_LENGTH)] || [];
+    }
+    // a shorter word matches every prefix starting with it
+    const candidates = new Set();
+    for (const prefix in eventIndex.prefixes) {
+        if (prefix.startsWith(word)) {
+            eventIndex.prefixes[prefix].forEach(index => candidates.add(index));
+        }
+    }
+    return [...candidates].sort((a, b) => a - b);
+}
+
+function search(query) {
+    // returns the entries where every word of the query starts a word of the
+    // name or the club, in program order
+    const queryWords = getSearchWords(query);
+    const results = [];
+    if (queryWords.length === 0) {
+        return results;
+    }
+    for (const eventNumber of Object.keys(searchIndex)) {
+        const eventIndex = searchIndex[eventNumber];
+        const entryWords = getEventSearchWords(eventNumber);
+        for (const index of getCandidateEntries(eventIndex, queryWords[0])) {
+            const words = entryWords[index];
+            const matches = queryWords.every(
+                queryWord => words.some(word => word.startsWith(queryWord)));
+            if (matches) {
+                results.push([eventNumber, eventIndex.name,
+                              eventIndex.entries[index]]);
+                if (results.length === MAX_SEARCH_RESULTS) {
+                    return results;
+                }
+            }
+        }
+    }
+    return results;
+}
+
+function escapeHTML(text) {
+    return String(text).replace(/&/g, '&amp;').replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+}
+
+function showSearchResults(results) {
+    if (!searchInput.value.trim()) {
+        hideSearchResults();
+        return;
+    }
+    if (results.length === 0) {
+        searchResults.innerHTML = 
+            '<p class="search-empty pt14-gray3">Inga träffar</p>';
+    } else {
+        searchResults.innerHTML = results.map(
+            ([eventNumber, eventName, [name, club, heat, lane, best]]) => `
+            <div class="search-result" data-event="${eventNumber}" 
+                 data-heat="${heat}" data-lane="${lane}">
+                <p class="pt14-gray1">${escapeHTML(name)}</p>
+                <p class="pt12-gray3">${escapeHTML(club)} · Gren 
+                    ${eventNumber} ${escapeHTML(eventName)}, Heat ${heat}, 
+                    Bana ${lane}${best ? ` · ${escapeHTML(best)}` : ''}</p>
+            </div>`).join('');
+    }
+    searchResults.classList.remove('hidden');
+}
+
+function hideSearchResults() {
+    if (searchResults) {
+        searchResults.classList.add('hidden');
+    }
+}
+
+function handleSearchResultClick(element) {
+    if (!element.dataset.event) {
+        return;
+    }
+    hideSearchResults();
+    // show the event
+    const eventItem = document
+        .querySelector(`#event-item-${element.dataset.event}`);
+    if (!eventItem) {
+        return;
+    }
+    if (eventItem !== selectedEventItem) {
+        handleEventItemClick(eventItem);
+    }
+    // open the heat
+    const heatContainer = document.querySelector(
+        `#right-column-${element.dataset.event} ` +
+        `.heat-container[data-heat="${element.dataset.heat}"]`);
+    if (!heatContainer) {
+        return;
+    }
+    if (heatContainer !== selectedHeatContainer) {
+        handleHeatContainerClick(heatContainer);
+    }
+    // mark the swimmer
+    if (foundSwimmerContainer) {
+        foundSwimmerContainer.classList.remove('search-found');
+    }
+    foundSwimmerContainer = heatContainer.querySelector(
+        `.swimmer-container[data-lane="${element.dataset.lane}"]`);
+    if (foundSwimmerContainer) {
+        foundSwimmerContainer.classList.add('search-found');
+        // scroll after the heat-content is opened in the next frame
+        const swimmerContainer = foundSwimmerContainer;
+        scheduleLayout(() => null, () => {
+            swimmerContainer.scrollIntoView({block: 'center'});
+        });
+    }
+}
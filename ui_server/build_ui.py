@@ -0,0 +1,107 @@
+'''
+This file contains the build step of the UI. build_ui copies the generated UI
+from ui/ to ui/build/ with
+    - minified index.html and style.css,
+    - content-hashed names for style.css and script.js, so that they can be
+      cached as immutable by the browsers,
+    - the images under their own names, since the HTML snippets that are
+      pushed to open pages (see html_snippet_templates.py) refer to them,
+    - precompressed gzip (and brotli, if the brotli package is installed)
+      versions of every file next to it.
+The UI server then serves the smallest version a browser accepts.
+'''
+
+import gzip
+import hashlib
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+UI_DIRECTORY = 'ui'
+BUILD_DIRECTORY = 'ui/build'
+
+# The files of ui/ that index.html needs, relative to ui/.
+HASHED_ASSETS = ['style.css', 'script.js']
+# The files of ui/ that the pushed HTML snippets also refer to, which keep
+# their names and are revalidated like index.html.
+UNHASHED_ASSETS = ['images/chevron.svg']
+
+###############################################################################
+# Helper functions for build_ui
+###############################################################################
+
+def minify_html(html: str) -> str:
+    '''
+    Removes the whitespace between tags. Every container in the UI is a flex
+    box, where whitespace between elements is not rendered, and there are no
+    pre elements. Whitespace next to text, such as the space before the last
+    50m span of a split, is kept.
+    '''
+    return re.sub(r'>\s+<', '><', html).strip()
+
+def minify_css(css: str) -> str:
+    '''
+    Removes comments and the whitespace that is not needed in style.css.
+    Whitespace before ':' is kept, since it is a descendant combinator in
+    selectors such as '.swimmer-selected :not(...)'.
+    '''
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+def get_hashed_name(name: str, content: bytes) -> str:
+    '''
+    Adds the first 10 hex digits of the content hash to a file name, e.g.
+    'style.css' -> 'style.1a2b3c4d5e.css'.
+    '''
+    content_hash = hashlib.sha256(content).hexdigest()[:10]
+    root, extension = os.path.splitext(name)
+    return f'{root}.{content_hash}{extension}'
+
+def write_with_compressed_versions(path: str, content: bytes) -> None:
+    '''
+    Writes a file and its precompressed .gz and .br versions.
+    '''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(content)
+    with open(path + '.gz', 'wb') as file:
+        file.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as file:
+            file.write(brotli.compress(content))
+
+###############################################################################
+
+def build_ui() -> None:
+    '''
+    Builds ui/build/ from ui/index.html and the assets it uses. Called after
+    index.html has been populated.
+    '''
+    shutil.rmtree(BUILD_DIRECTORY, ignore_errors=True)
+    with open(os.path.join(UI_DIRECTORY, 'index.html'), 'r',
+              encoding='utf-8') as file:
+        html = file.read()
+    for name in HASHED_ASSETS:
+        with open(os.path.join(UI_DIRECTORY, name), 'rb') as file:
+            content = file.read()
+        if name.endswith('.css'):
+            content = minify_css(content.decode('utf-8')).encode('utf-8')
+        hashed_name = get_hashed_name(name, content)
+        write_with_compressed_versions(
+            os.path.join(BUILD_DIRECTORY, hashed_name), content)
+        html = html.replace(f'"{name}"', f'"{hashed_name}"')
+    for name in UNHASHED_ASSETS:
+        with open(os.path.join(UI_DIRECTORY, name), 'rb') as file:
+            content = file.read()
+        write_with_compressed_versions(os.path.join(BUILD_DIRECTORY, name),
+                                       content)
+    write_with_compressed_versions(
+        os.path.join(BUILD_DIRECTORY, 'index.html'),
+        minify_html(html).encode('utf-8'))
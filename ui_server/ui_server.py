@@ -0,0 +1,194 @@
+'''
+This file contains a local HTTP server for the UI. It serves the built UI in
+ui/build/ (see build_ui.py) and an /events endpoint that pushes updates to
+open pages with server-sent events. script.js listens to /events and patches
+the page when an 'event-update' or an 'event-remove' arrives.
+
+Every file is served in the smallest precompressed version the browser
+accepts, with a strong ETag. The content-hashed assets are cached as immutable,
+and index.html and the images are revalidated on every load, which is answered
+with 304 Not Modified while they have not changed.
+'''
+
+import hashlib
+import json
+import mimetypes
+import os
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ui_server.build_ui import BUILD_DIRECTORY, UNHASHED_ASSETS
+
+# Seconds between keep-alive comments on idle event streams.
+EVENT_STREAM_HEARTBEAT_SECONDS = 15
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Content encodings in order of preference, with the file name suffixes of
+# their precompressed versions.
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# one queue of pending messages per connected page
+event_stream_clients: list[queue.Queue] = []
+event_stream_clients_lock = threading.Lock()
+
+# { '/path' : { 'content_type': str, 'cache_control': str,
+#               'versions': { 'encoding': (etag, body) } } }
+ui_assets: dict[str, dict] = dict()
+
+def publish_event(event_type: str, data: dict) -> None:
+    '''
+    Sends a server-sent event with JSON data to every connected page.
+    '''
+    message = f'event: {event_type}\ndata: {json.dumps(data)}\n\n'
+    with event_stream_clients_lock:
+        for client in event_stream_clients:
+            client.put(message)
+
+def load_ui_assets() -> None:
+    '''
+    Loads every file of ui/build/ with its precompressed versions into memory.
+    Called when the server starts and after every rebuild of the UI.
+    '''
+    assets = dict()
+    for directory, _, file_names in os.walk(BUILD_DIRECTORY):
+        for file_name in file_names:
+            if file_name.endswith(('.gz', '.br')):
+                continue
+            path = os.path.join(directory, file_name)
+            name = os.path.relpath(path, BUILD_DIRECTORY).replace(os.sep, '/')
+            url_path = '/' + name
+            versions = dict()
+            for encoding, suffix in [('identity', '')] + ENCODINGS:
+                if not os.path.exists(path + suffix):
+                    continue
+                with open(path + suffix, 'rb') as file:
+                    body = file.read()
+                etag = hashlib.sha256(body).hexdigest()[:20]
+                versions[encoding] = (f'"{etag}"', body)
+            content_type = mimetypes.guess_type(file_name)[0]
+            if content_type is None:
+                content_type = 'application/octet-stream'
+            if content_type.startswith('text/') or 'javascript' in content_type:
+                content_type += '; charset=utf-8'
+            assets[url_path] = {
+                'content_type': content_type,
+                'cache_control': (REVALIDATE_CACHE_CONTROL
+                                  if name == 'index.html'
+                                  or name in UNHASHED_ASSETS
+                                  else IMMUTABLE_CACHE_CONTROL),
+                'versions': versions
+            }
+    global ui_assets
+    ui_assets = assets
+
+class UIRequestHandler(BaseHTTPRequestHandler):
+    '''
+    Serves the built UI files and the /events stream.
+    '''
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        path = self.path.split('?')[0]
+        if path == '/events':
+            self.stream_events()
+            return
+        if path == '/':
+            path = '/index.html'
+        asset = ui_assets.get(path)
+        if asset is None:
+            self.send_error(404)
+            return
+        encoding = self.choose_encoding(asset['versions'])
+        etag, body = asset['versions'][encoding]
+        if etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', asset['cache_control'])
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', asset['content_type'])
+        self.send_header('Content-Length', str(len(body)))
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', asset['cache_control'])
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def choose_encoding(self, versions: dict) -> str:
+        '''
+        Returns the preferred encoding that both the browser accepts and the
+        asset has a precompressed version for.
+        '''
+        accepted = {token.split(';')[0].strip() for token in
+                    self.headers.get('Accept-Encoding', '').split(',')}
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in versions:
+                return encoding
+        return 'identity'
+
+    def stream_events(self) -> None:
+        '''
+        Keeps the connection open and writes every published event to it
+        until the page is closed.
+        '''
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        client = queue.Queue()
+        with event_stream_clients_lock:
+            event_stream_clients.append(client)
+        try:
+            while True:
+                try:
+                    message = client.get(
+                        timeout=EVENT_STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    message = ': keep-alive\n\n'
+                self.wfile.write(message.encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with event_stream_clients_lock:
+                event_stream_clients.remove(client)
+
+    def log_message(self, format, *args) -> None:
+        # keep the terminal free for the watch output
+        pass
+
+def start_ui_server(port: int) -> ThreadingHTTPServer:
+    '''
+    Loads the built UI and starts the UI server on the given port in a
+    background thread. Returns the server.
+    '''
+    load_ui_assets()
+    server = ThreadingHTTPServer(('', port), UIRequestHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def wait_for_interrupt(server: ThreadingHTTPServer) -> None:
+    '''
+    Keeps a started UI server running until interrupted with Ctrl+C.
+    '''
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+def serve_ui(port: int) -> None:
+    '''
+    Serves the UI until interrupted with Ctrl+C.
+    '''
+    server = start_ui_server(port)
+    print(f'Serving the UI at http://localhost:{port}/. Stop with Ctrl+C.')
+    wait_for_interrupt(server)
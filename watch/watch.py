@@ -0,0 +1,186 @@
+'''
+This file contains the watch mode. Start lists change during a meet (scratches,
+lane reshuffles), so watch_session keeps polling the heat lists of the session
+and updates the session files, index.html and every open page when they do.
+
+Heat lists are fetched with conditional requests through the HTTP cache, and a
+heat list whose content has not changed since the last poll is not parsed
+again. For a changed heat list, only the lanes with a new swimmer are looked up
+again. Swimmers who only moved to another lane or heat keep their best swim.
+The right column of every changed event is pushed to open pages as a
+server-sent event, and script.js swaps it in without reloading the page.
+'''
+
+import hashlib
+import time
+
+# external libraries
+from bs4 import BeautifulSoup
+
+# helper functions
+from retrieve_data.utilities import GET
+from retrieve_data.heat_list import (StartList,
+                                     get_start_list,
+                                     get_session_heat_list_urls,
+                                     is_skipped_event)
+from retrieve_data.retrieve_data import get_best_swim_for_swimmer, DEBUG
+from retrieve_data.metrics import record_error
+from populate_html.populate_html import populate_html, get_event_fragments
+from session_model.session_model import Session, Event, Heat, LaneEntry
+from session_model.serialization import save_session_data, load_session_data
+from ui_server.ui_server import (start_ui_server, 
+                                 publish_event, 
+                                 load_ui_assets)
+from ui_server.build_ui import build_ui
+
+# cache functions
+from cache.swimmer_id_cache import (load_stored_swimmer_id_cache,
+                                    save_swimmer_id_cache)
+from cache.meet_id_cache import (load_stored_meet_id_and_location_cache,
+                                 save_meet_id_and_location_cache)
+from cache.meet_results_cache import (load_stored_meet_results_cache,
+                                      save_meet_results_cache)
+from cache.start_list_cache import (load_stored_start_list_cache,
+                                    save_start_list_cache)
+from cache.meet_program_cache import (load_stored_meet_program_cache,
+                                      save_meet_program_cache)
+from cache.http_cache import load_stored_http_cache, save_http_cache
+
+
+###############################################################################
+# Helper functions for poll_session
+###############################################################################
+
+def update_event(session: Session, event_number: int,
+                 start_list: StartList, num_heats: int) -> Event | None:
+    '''
+    Updates the heats of an event in the session from its start list.
+    Swimmers who were in the event before keep their best swim, and only new
+    swimmers are looked up. A swimmer is the same swimmer when the name, the
+    year of birth and the club all match, and a best swim that was degraded
+    to finish before a deadline is looked up again. An event that is new to
+    the session is added in program order. Returns the event if it changed,
+    otherwise None.
+    '''
+    event_name = start_list.event_name
+    event = session.get_event(event_number)
+    old_heats = event.heats if event is not None else []
+    # { ('name', 'born', 'club') : BestSwim }
+    old_best_swims = {(entry.name, entry.born, entry.club): entry.best_swim
+                      for heat in old_heats for entry in heat.lanes
+                      if entry.best_swim is not None
+                      and entry.best_swim.degraded is None}
+    new_heats = []
+    for heat in start_list.get_included_heats(num_heats):
+        new_lanes = []
+        for entry in heat.entries:
+            best_swim = old_best_swims.get((entry.name, entry.born,
+                                            entry.club))
+            if best_swim is None:
+                best_swim = get_best_swim_for_swimmer(entry.get_swimmer_data(),
+                                                      event_name,
+                                                      start_list.pool)
+            new_lanes.append(LaneEntry(entry.lane, entry.name, entry.born,
+                                       entry.club, best_swim))
+        new_heats.append(Heat(heat.number, new_lanes))
+    if event is None:
+        event = Event(event_number, event_name, heats=new_heats)
+        session.events.append(event)
+        session.events.sort(key=lambda event: event.number)
+        return event
+    if new_heats == old_heats and event.name == event_name:
+        return None
+    event.name = event_name
+    event.heats = new_heats
+    return event
+
+def poll_session(session_url: str, num_heats: int, session: Session,
+                 heat_list_hashes: dict[str, str]) -> list[Event]:
+    '''
+    Fetches the session program and every heat list of the session once and
+    updates the session. Heat lists with the same content hash as in the last
+    poll are skipped. Returns the changed events.
+    '''
+    session_page = GET(session_url, debug=DEBUG)
+    if session_page is None:
+        record_error('session_page',
+                     f'Error getting session page: {session_url}',
+                     debug=DEBUG)
+        return []
+    session_soup = BeautifulSoup(session_page.content, 'html.parser')
+    changed_events = []
+    heat_list_urls = get_session_heat_list_urls(session_soup)
+    for event_number, heat_list_url in heat_list_urls:
+        heat_list_page = GET(heat_list_url, debug=DEBUG)
+        if heat_list_page is None:
+            record_error('heat_list_page',
+                         f'Error getting event heat list page: '
+                         f'{heat_list_url}', debug=DEBUG)
+            continue
+        content_hash = hashlib.sha1(heat_list_page.content).hexdigest()
+        if heat_list_hashes.get(heat_list_url) == content_hash:
+            continue
+        heat_list_hashes[heat_list_url] = content_hash
+        start_list = get_start_list(heat_list_url, heat_list_page.content)
+        if start_list is None or is_skipped_event(start_list.event_name):
+            continue
+        event = update_event(session, int(event_number), start_list, 
+                             num_heats)
+        if event is not None:
+            changed_events.append(event)
+    return changed_events
+
+def save_caches() -> None:
+    '''
+    Saves all caches to their files.
+    '''
+    save_swimmer_id_cache()
+    save_meet_id_and_location_cache()
+    save_meet_results_cache()
+    save_start_list_cache()
+    save_meet_program_cache()
+    save_http_cache()
+
+###############################################################################
+
+def watch_session(session_url: str, num_heats: int, poll_seconds: float,
+                  port: int) -> None:
+    '''
+    The function called by main.py in watch mode. Serves the UI on the given
+    port and polls the session every poll_seconds seconds until interrupted
+    with Ctrl+C. Starts from the saved session (see serialization.py).
+    '''
+    load_stored_swimmer_id_cache()
+    load_stored_meet_id_and_location_cache()
+    load_stored_meet_results_cache()
+    load_stored_start_list_cache()
+    load_stored_meet_program_cache()
+    load_stored_http_cache()
+    session = load_session_data()
+    if session is None:
+        print('No saved session to watch. Retrieve the session first.')
+        return
+
+    start_ui_server(port)
+    print(f'Watching {session_url}. Open http://localhost:{port}/index.html '
+          f'to view. Stop with Ctrl+C.')
+    heat_list_hashes = dict()
+    try:
+        while True:
+            changed_events = poll_session(session_url, num_heats,
+                                          session, heat_list_hashes)
+            if changed_events:
+                save_session_data(session)
+                save_caches()
+                populate_html(session)
+                build_ui()
+                load_ui_assets()
+                for event in changed_events:
+                    publish_event('event-update', get_event_fragments(event))
+                event_names = ', '.join(f'{event.number} {event.name}'
+                                        for event in changed_events)
+                print(f'{time.strftime("%H:%M:%S")} Updated events: '
+                      f'{event_names}')
+            time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        save_caches()